@@ -0,0 +1,477 @@
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+from adb_shell import ADBShellSession
+
+
+class ADBProtocolError(ConnectionError):
+    """adb server返回FAIL或者响应不符合协议"""
+
+
+class ADBSyncError(ADBProtocolError):
+    """sync操作被设备拒绝（如文件不存在、没有权限）"""
+
+
+class ADBConnection:
+    """
+    与adb server之间的一条TCP连接，封装smart-socket协议的收发
+    请求格式: 4位十六进制长度 + 请求内容；响应: "OKAY" 或 "FAIL" + 4位十六进制长度 + 错误信息
+    """
+
+    def __init__(self, host="127.0.0.1", port=5037, timeout=10):
+        """
+        参数:
+            host: adb server地址
+            port: adb server端口，默认5037
+            timeout: socket超时时间(秒)
+        """
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def send_request(self, request):
+        """
+        发送一个请求并等待OKAY
+
+        参数:
+            request: 请求字符串，如 "host:version"、"shell:ls"
+        """
+        payload = request.encode("utf-8")
+        self.send(b"%04x" % len(payload) + payload)
+        self.read_status(request)
+
+    def read_status(self, request=""):
+        """
+        读取4字节状态，FAIL时读取错误信息并抛出异常
+        """
+        status = self.read_exact(4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            message = self.read_length_prefixed().decode("utf-8", errors="replace")
+            raise ADBProtocolError(f"adb请求失败 {request}: {message}")
+        raise ADBProtocolError(f"adb响应无效 {request}: {status!r}")
+
+    def read_length_prefixed(self):
+        """
+        读取 4位十六进制长度 + 数据 格式的响应
+        """
+        length = int(self.read_exact(4), 16)
+        return self.read_exact(length)
+
+    def send(self, data):
+        self.sock.sendall(data)
+        self.bytes_sent += len(data)
+
+    def read_exact(self, size):
+        """
+        读取恰好size个字节，连接提前关闭时抛出异常
+        """
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            count = self.sock.recv_into(view[received:], size - received)
+            if count == 0:
+                raise ADBProtocolError(f"连接被关闭，已读取{received}/{size}字节")
+            received += count
+        self.bytes_received += size
+        return bytes(buffer)
+
+    def read_all(self):
+        """
+        读取数据直到对端关闭连接，用于shell:/exec:等流式服务
+        """
+        chunks = []
+        while True:
+            chunk = self.sock.recv(256 * 1024)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            self.bytes_received += len(chunk)
+        return b"".join(chunks)
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class ADBClient:
+    """
+    纯Python实现的adb server客户端，直接通过5037端口与adb server通信，不再调用adb可执行文件
+    支持 host:*、host:transport、shell:、exec: 和 sync: 请求，并为每个设备维护sync连接池
+    """
+
+    # sync协议单个DATA块的最大长度
+    SYNC_DATA_MAX = 64 * 1024
+
+    def __init__(self, host="127.0.0.1", port=5037, timeout=10, pool_size=2):
+        """
+        初始化客户端
+
+        参数:
+            host: adb server地址
+            port: adb server端口，默认5037
+            timeout: socket超时时间(秒)
+            pool_size: 每个设备最多保留的空闲sync连接数
+        """
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._sync_pool = {}
+        self._pool_lock = threading.Lock()
+        # 最近一次请求的耗时信息
+        self.last_timing = None
+
+    def _connect(self):
+        return ADBConnection(self.host, self.port, self.timeout)
+
+    def _record_timing(self, request, start, connected, conn):
+        end = time.perf_counter()
+        self.last_timing = {
+            "request": request,
+            "connect_ms": (connected - start) * 1000,
+            "total_ms": (end - start) * 1000,
+            "bytes_sent": conn.bytes_sent,
+            "bytes_received": conn.bytes_received,
+        }
+
+    def _host_request(self, request, has_response=True):
+        """
+        执行host:*请求
+
+        参数:
+            request: 请求字符串
+            has_response: 是否在OKAY之后读取长度前缀的响应
+        """
+        start = time.perf_counter()
+        conn = self._connect()
+        connected = time.perf_counter()
+        try:
+            conn.send_request(request)
+            result = conn.read_length_prefixed() if has_response else b""
+            self._record_timing(request, start, connected, conn)
+            return result.decode("utf-8", errors="replace")
+        finally:
+            conn.close()
+
+    def version(self):
+        """
+        返回:
+            int: adb server的协议版本
+        """
+        return int(self._host_request("host:version"), 16)
+
+    def devices(self):
+        """
+        返回:
+            list: [(序列号, 状态), ...]
+        """
+        output = self._host_request("host:devices")
+        devices = []
+        for line in output.strip().splitlines():
+            parts = line.split("\t")
+            if len(parts) >= 2:
+                devices.append((parts[0], parts[1]))
+        return devices
+
+    def connect(self, address):
+        """
+        让adb server连接到远程设备，相当于 adb connect
+
+        返回:
+            str: adb server返回的信息
+        """
+        return self._host_request(f"host:connect:{address}")
+
+    def _open_transport(self, serial):
+        """
+        打开一条已切换到指定设备的连接，serial为None时使用唯一连接的设备
+        """
+        conn = self._connect()
+        try:
+            conn.send_request(
+                f"host:transport:{serial}" if serial else "host:transport-any"
+            )
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def _stream_request(self, serial, request):
+        """
+        在设备上执行流式服务（shell:/exec:），读取全部输出直到连接关闭
+        """
+        start = time.perf_counter()
+        conn = self._open_transport(serial)
+        connected = time.perf_counter()
+        try:
+            conn.send_request(request)
+            data = conn.read_all()
+            self._record_timing(request, start, connected, conn)
+            return data
+        finally:
+            conn.close()
+
+    def shell(self, serial, command):
+        """
+        执行shell命令（shell:服务，标准错误会合并到输出中）
+
+        返回:
+            bytes: 命令输出
+        """
+        return self._stream_request(serial, f"shell:{command}")
+
+    def exec_out(self, serial, command):
+        """
+        执行命令并读取未经转换的二进制输出（exec:服务），用于screencap等
+
+        返回:
+            bytes: 命令的原始输出
+        """
+        return self._stream_request(serial, f"exec:{command}")
+
+    def open_exec(self, serial, command):
+        """
+        打开一个双向的exec:流，调用方负责关闭返回的连接
+
+        返回:
+            ADBConnection: 已经进入exec:服务的连接
+        """
+        conn = self._open_transport(serial)
+        try:
+            conn.send_request(f"exec:{command}")
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def _acquire_sync(self, serial):
+        """
+        从连接池取出一条sync连接，没有空闲连接时新建
+
+        返回:
+            tuple: (连接, 是否来自连接池)
+        """
+        with self._pool_lock:
+            pool = self._sync_pool.get(serial)
+            if pool:
+                return pool.popleft(), True
+        conn = self._open_transport(serial)
+        try:
+            conn.send_request("sync:")
+        except Exception:
+            conn.close()
+            raise
+        return conn, False
+
+    def _release_sync(self, serial, conn):
+        """
+        归还sync连接，池满时关闭
+        """
+        with self._pool_lock:
+            pool = self._sync_pool.setdefault(serial, deque())
+            if len(pool) < self.pool_size:
+                pool.append(conn)
+                return
+        self._quit_sync(conn)
+
+    @staticmethod
+    def _quit_sync(conn):
+        try:
+            conn.send(b"QUIT" + struct.pack("<I", 0))
+        except OSError:
+            pass
+        conn.close()
+
+    def _sync_call(self, serial, request, operation):
+        """
+        在池中的sync连接上执行一次操作，出错时丢弃该连接
+        """
+        start = time.perf_counter()
+        conn, reused = self._acquire_sync(serial)
+        connected = time.perf_counter()
+        sent, received = conn.bytes_sent, conn.bytes_received
+        try:
+            result = operation(conn)
+        except (OSError, ADBProtocolError) as e:
+            conn.close()
+            if not reused or isinstance(e, ADBSyncError):
+                raise
+            # 池中的连接可能已被adb server关闭，换一条新连接重试一次
+            conn, _ = self._acquire_sync(serial)
+            sent, received = 0, 0
+            try:
+                result = operation(conn)
+            except Exception:
+                conn.close()
+                raise
+        except Exception:
+            conn.close()
+            raise
+        end = time.perf_counter()
+        self.last_timing = {
+            "request": request,
+            "connect_ms": (connected - start) * 1000,
+            "total_ms": (end - start) * 1000,
+            "bytes_sent": conn.bytes_sent - sent,
+            "bytes_received": conn.bytes_received - received,
+        }
+        self._release_sync(serial, conn)
+        return result
+
+    @staticmethod
+    def _send_sync_request(conn, command_id, path):
+        data = path.encode("utf-8")
+        conn.send(command_id + struct.pack("<I", len(data)) + data)
+
+    @staticmethod
+    def _raise_sync_fail(conn, path):
+        length = struct.unpack("<I", conn.read_exact(4))[0]
+        message = conn.read_exact(length).decode("utf-8", errors="replace")
+        raise ADBSyncError(f"sync操作失败 {path}: {message}")
+
+    def stat(self, serial, remote_path):
+        """
+        获取设备文件信息
+
+        返回:
+            tuple: (mode, size, mtime)，文件不存在时mode为0
+        """
+
+        def operation(conn):
+            self._send_sync_request(conn, b"STAT", remote_path)
+            response = conn.read_exact(16)
+            if response[:4] != b"STAT":
+                raise ADBProtocolError(f"sync STAT响应无效: {response[:4]!r}")
+            return struct.unpack("<III", response[4:])
+
+        return self._sync_call(serial, f"sync:STAT {remote_path}", operation)
+
+    def pull_bytes(self, serial, remote_path):
+        """
+        读取设备文件内容
+
+        返回:
+            bytes: 文件内容
+        """
+
+        def operation(conn):
+            self._send_sync_request(conn, b"RECV", remote_path)
+            chunks = []
+            while True:
+                header = conn.read_exact(8)
+                command_id = header[:4]
+                length = struct.unpack("<I", header[4:])[0]
+                if command_id == b"DATA":
+                    chunks.append(conn.read_exact(length))
+                elif command_id == b"DONE":
+                    return b"".join(chunks)
+                elif command_id == b"FAIL":
+                    message = conn.read_exact(length).decode("utf-8", errors="replace")
+                    raise ADBSyncError(f"sync操作失败 {remote_path}: {message}")
+                else:
+                    raise ADBProtocolError(f"sync RECV响应无效: {command_id!r}")
+
+        return self._sync_call(serial, f"sync:RECV {remote_path}", operation)
+
+    def pull(self, serial, remote_path, local_path):
+        """
+        将设备文件保存到本地
+        """
+        data = self.pull_bytes(serial, remote_path)
+        with open(local_path, "wb") as f:
+            f.write(data)
+        return local_path
+
+    def push_bytes(self, serial, data, remote_path, mode=0o644, mtime=None):
+        """
+        将数据写入设备文件
+        """
+        mtime = int(time.time()) if mtime is None else int(mtime)
+
+        def operation(conn):
+            self._send_sync_request(conn, b"SEND", f"{remote_path},{mode}")
+            view = memoryview(data)
+            for offset in range(0, len(view), self.SYNC_DATA_MAX):
+                chunk = view[offset : offset + self.SYNC_DATA_MAX]
+                conn.send(b"DATA" + struct.pack("<I", len(chunk)) + bytes(chunk))
+            conn.send(b"DONE" + struct.pack("<I", mtime))
+            response = conn.read_exact(4)
+            if response == b"FAIL":
+                self._raise_sync_fail(conn, remote_path)
+            if response != b"OKAY":
+                raise ADBProtocolError(f"sync SEND响应无效: {response!r}")
+            conn.read_exact(4)
+
+        return self._sync_call(serial, f"sync:SEND {remote_path}", operation)
+
+    def push(self, serial, local_path, remote_path, mode=0o644):
+        """
+        将本地文件推送到设备
+        """
+        with open(local_path, "rb") as f:
+            data = f.read()
+        return self.push_bytes(
+            serial, data, remote_path, mode, mtime=os.path.getmtime(local_path)
+        )
+
+    def close(self):
+        """
+        关闭连接池中的所有连接
+        """
+        with self._pool_lock:
+            pools, self._sync_pool = self._sync_pool, {}
+        for pool in pools.values():
+            for conn in pool:
+                self._quit_sync(conn)
+
+
+class SocketShellSession(ADBShellSession):
+    """
+    基于adb server socket的常驻shell会话
+    使用exec:sh服务（不分配pty，不回显输入），复用ADBShellSession的哨兵协议
+    """
+
+    def __init__(self, client, device_id, timeout=15):
+        super().__init__(device_id=device_id, timeout=timeout)
+        self.client = client
+        self._conn = None
+
+    def start(self):
+        self._conn = self.client.open_exec(self.device_id, "sh")
+        # 读取不设超时，由命令级别的超时控制
+        self._conn.sock.settimeout(None)
+        self._lines = queue.Queue()
+        self._eof = threading.Event()
+        reader = threading.Thread(
+            target=self._read_output,
+            args=(self._conn.sock.makefile("rb"), self._lines, self._eof),
+            daemon=True,
+        )
+        reader.start()
+
+    def _write(self, data):
+        self._conn.send(data)
+
+    def is_alive(self):
+        # 设备关闭了连接时写入半关闭的socket不会报错，需要看读取线程是否已读到EOF
+        return self._conn is not None and not self._eof.is_set()
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            conn.close()
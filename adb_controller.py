@@ -1,8 +1,24 @@
 import os
 import time
+import struct
 import subprocess
+import tempfile
 from pathlib import Path
 
+import cv2
+import numpy as np
+
+from adb_client import ADBClient, SocketShellSession
+from adb_metrics import ADBMetrics, command_kind, timed_action
+from adb_shell import ADBShellSession
+from device_profile import DeviceProfile, DeviceProfileStore, detect_rotation
+from gesture import GestureEngine
+from gesture_macro import MACRO_DIR, GestureMacro, macro_remote_path
+from input_batch import InputBatch
+
+# raw截图头部的前12字节为 (宽, 高, 像素格式)，12字节和16字节的头部相同
+RAW_HEADER_PREFIX = 12
+
 
 class ADBController:
     """
@@ -10,17 +26,69 @@ class ADBController:
     专门针对远程端口连接方式(127.0.0.1:16384)设计
     """
 
-    def __init__(self, device_id="127.0.0.1:16384", adb_path="adb"):
+    def __init__(
+        self,
+        device_id="127.0.0.1:16384",
+        adb_path="adb",
+        persistent_shell=True,
+        transport="cli",
+        adb_client=None,
+        profile_store=None,
+        metrics=None,
+    ):
         """
-        初始化ADB控制器
+        初始化ADB控制器（不会立即连接设备，第一次执行命令时才建立连接）
 
         参数:
             device_id: 设备连接地址，默认为"127.0.0.1:16384"用于远程端口连接
             adb_path: adb可执行文件路径，默认为"adb"（假设adb已在环境变量中）
+            persistent_shell: 是否通过常驻的adb shell会话执行shell命令，
+                避免每条命令都启动一个新的adb进程，默认为True
+            transport: "cli" 调用adb可执行文件；"socket" 直接通过5037端口与adb server通信，
+                不再启动adb进程
+            adb_client: transport为"socket"时使用的ADBClient实例，为None时连接本机默认端口
+            profile_store: 设备信息缓存(DeviceProfileStore)，为None时使用默认缓存文件
+            metrics: 耗时统计(ADBMetrics)，为None时新建；多个控制器可以共用一个
         """
         self.device_id = device_id
         self.adb_path = adb_path
-        self._check_connection()
+        self.client = None
+        if transport == "socket":
+            self.client = adb_client if adb_client else ADBClient()
+        elif transport != "cli":
+            raise ValueError(f"不支持的传输方式: {transport}")
+
+        if not persistent_shell:
+            self._shell_session = None
+        elif self.client is not None:
+            self._shell_session = SocketShellSession(self.client, device_id)
+        else:
+            self._shell_session = ADBShellSession(adb_path, device_id)
+        self._input_queue = InputBatch(self)
+        self.gestures = GestureEngine(self)
+        self._gesture_engine_available = True
+        # 最近一次输入操作完成的时间，用于判断截图是否反映了输入之后的画面
+        self.last_input_time = 0
+        self.profile_store = profile_store if profile_store else DeviceProfileStore()
+        self._profile = None
+        self._connected = False
+        self.metrics = metrics if metrics else ADBMetrics()
+        # 本次会话中已确认存在于设备上的手势宏脚本
+        self._uploaded_macros = set()
+
+    def _ensure_connected(self):
+        """
+        第一次执行命令前连接设备；连接出错后的下一次命令会重新连接
+        """
+        if self._connected:
+            return
+        # 先置为True，避免_check_connection内部执行命令时递归
+        self._connected = True
+        try:
+            self._check_connection()
+        except Exception:
+            self._connected = False
+            raise
 
     def _check_connection(self):
         """
@@ -31,11 +99,14 @@ class ADBController:
         """
         try:
             # 连接到指定端口
-            subprocess.run(
-                [self.adb_path, "connect", self.device_id],
-                check=True,
-                capture_output=True,
-            )
+            if self.client is not None:
+                self.client.connect(self.device_id)
+            else:
+                subprocess.run(
+                    [self.adb_path, "connect", self.device_id],
+                    check=True,
+                    capture_output=True,
+                )
 
             # 检查设备列表
             devices = self._execute_command("devices")
@@ -62,6 +133,37 @@ class ADBController:
         返回:
             str: 命令执行结果
         """
+        self._ensure_connected()
+
+        started = time.perf_counter()
+        output = None
+        try:
+            output = self._run_command(command)
+            return output
+        finally:
+            self.metrics.record_command(
+                command_kind(command),
+                time.perf_counter() - started,
+                output is None,
+                len(command),
+                len(output) if output else 0,
+            )
+
+    def _run_command(self, command):
+        if self._shell_session is not None and command.startswith("shell "):
+            try:
+                return self._shell_session.run(command[len("shell ") :])
+            except subprocess.CalledProcessError as e:
+                print(f"ADB命令执行错误: {e}")
+                print(f"错误输出: {e.stderr}")
+                raise
+            except (ConnectionError, TimeoutError):
+                self._connected = False
+                raise
+
+        if self.client is not None:
+            return self._execute_socket_command(command)
+
         cmd = [self.adb_path]
         if self.device_id:
             cmd.extend(["-s", self.device_id])
@@ -75,8 +177,100 @@ class ADBController:
         except subprocess.CalledProcessError as e:
             print(f"ADB命令执行错误: {e}")
             print(f"错误输出: {e.stderr}")
+            self._connected = False
             raise
 
+    def _execute_socket_command(self, command):
+        """
+        通过adb server socket执行与命令行等价的ADB命令
+
+        参数:
+            command: 要执行的ADB命令（不包含adb前缀），支持 shell/exec-out/devices/pull/push
+
+        返回:
+            str: 命令执行结果
+        """
+        name, _, args = command.partition(" ")
+        if name == "shell":
+            return self.client.shell(self.device_id, args).decode(
+                "utf-8", errors="replace"
+            )
+        if name == "exec-out":
+            return self.client.exec_out(self.device_id, args).decode(
+                "utf-8", errors="replace"
+            )
+        if name == "devices":
+            lines = ["List of devices attached"]
+            lines += [f"{serial}\t{state}" for serial, state in self.client.devices()]
+            return "\n".join(lines) + "\n"
+        if name == "pull":
+            remote_path, local_path = args.split()
+            self.client.pull(self.device_id, remote_path, local_path)
+            return ""
+        if name == "push":
+            local_path, remote_path = args.split()
+            self.client.push(self.device_id, local_path, remote_path)
+            return ""
+        raise ValueError(f"socket传输不支持的命令: {command}")
+
+    def _execute_binary(self, command):
+        """
+        执行ADB命令并以字节形式返回标准输出，用于exec-out等二进制输出
+
+        参数:
+            command: 要执行的ADB命令（不包含adb前缀）
+
+        返回:
+            bytes: 命令的原始输出
+        """
+        self._ensure_connected()
+
+        started = time.perf_counter()
+        output = None
+        try:
+            output = self._run_binary(command)
+            return output
+        finally:
+            self.metrics.record_command(
+                command_kind(command),
+                time.perf_counter() - started,
+                output is None,
+                len(command),
+                len(output) if output else 0,
+            )
+
+    def _run_binary(self, command):
+        if self.client is not None:
+            name, _, args = command.partition(" ")
+            if name != "exec-out":
+                raise ValueError(f"socket传输不支持的二进制命令: {command}")
+            return self.client.exec_out(self.device_id, args)
+
+        cmd = [self.adb_path]
+        if self.device_id:
+            cmd.extend(["-s", self.device_id])
+
+        cmd.extend(command.split())
+
+        try:
+            result = subprocess.run(cmd, capture_output=True, check=True)
+            return result.stdout
+        except subprocess.CalledProcessError as e:
+            print(f"ADB命令执行错误: {e}")
+            print(f"错误输出: {e.stderr.decode('utf-8', errors='replace')}")
+            self._connected = False
+            raise
+
+    def close(self):
+        """
+        关闭常驻的adb shell会话和socket连接池
+        """
+        if self._shell_session is not None:
+            self._shell_session.close()
+        if self.client is not None:
+            self.client.close()
+
+    @timed_action("screenshot")
     def screenshot(self, output_path="screen.png"):
         """
         截取手机屏幕并保存到本地
@@ -110,6 +304,120 @@ class ADBController:
             print(f"截图失败: {str(e)}")
             raise
 
+    @timed_action("screenshot_array")
+    def screenshot_array(self, fmt="raw"):
+        """
+        通过exec-out直接读取screencap输出到内存，不经过设备存储和本地磁盘
+
+        参数:
+            fmt: "raw" 读取未压缩的原始像素（设备端无需PNG编码，最快），
+                 "png" 读取PNG数据并在本地解码
+
+        返回:
+            numpy.ndarray: raw格式返回(高, 宽, 4)的RGBA数组，直接引用读取到的字节，不复制；
+                           png格式返回BGR数组
+        """
+        try:
+            if fmt == "raw":
+                data = self._execute_binary("exec-out screencap")
+                return parse_raw_screencap(data)
+            elif fmt == "png":
+                data = self._execute_binary("exec-out screencap -p")
+                image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+                if image is None:
+                    raise ValueError("无法解码PNG截图数据")
+                return image
+            else:
+                raise ValueError(f"不支持的截图格式: {fmt}")
+        except Exception as e:
+            print(f"截图失败: {str(e)}")
+            # 分辨率或截图格式可能已经变化，下次使用时重新探测设备信息
+            self.invalidate_profile()
+            raise
+
+    @timed_action("screenshot_region")
+    def screenshot_region(self, x, y, width, height):
+        """
+        只截取屏幕上的一个矩形区域：在设备端用tail/head截出区域所在的行，
+        只传输这些行的原始像素，再在本地裁剪出列，不做任何颜色转换；
+        同时传回截图头部，尺寸与缓存的设备信息不一致（屏幕旋转、分辨率变化）时重新探测后再截一次
+
+        参数:
+            x: 区域左上角横坐标
+            y: 区域左上角纵坐标
+            width: 区域宽度
+            height: 区域高度
+
+        返回:
+            numpy.ndarray: (高, 宽, 通道数)的RGBA/RGB数组，超出屏幕的部分会被裁掉
+        """
+        profile = self.get_profile()
+        if profile.raw_width is None:
+            # 旧版本缓存的设备信息没有记录raw截图尺寸
+            profile = self.get_profile(refresh=True)
+
+        for attempt in range(2):
+            if profile.capture_format != "raw":
+                raise ValueError("设备不支持raw截图，无法按区域截图")
+            rows = self._read_region_rows(profile, x, y, width, height)
+            if rows is not None:
+                return rows
+            if attempt == 0:
+                # 屏幕旋转或分辨率变化后缓存的截图尺寸已失效，重新探测后再截一次
+                print("区域截图的尺寸与缓存的设备信息不一致，重新探测设备信息")
+                profile = self.get_profile(refresh=True)
+        raise ValueError("区域截图的尺寸与重新探测的设备信息仍不一致")
+
+    def _read_region_rows(self, profile, x, y, width, height):
+        """
+        按设备信息中的raw截图布局截取区域所在的行，并用同一次截图的头部校验截图尺寸
+
+        返回:
+            numpy.ndarray: 区域的像素，截图尺寸与设备信息不一致时返回None
+        """
+        frame_width, frame_height = profile.raw_width, profile.raw_height
+        left, top = max(0, x), max(0, y)
+        right, bottom = min(frame_width, x + width), min(frame_height, y + height)
+        if right <= left or bottom <= top:
+            raise ValueError(f"截图区域超出屏幕: ({x}, {y}, {width}, {height})")
+
+        channels = profile.bytes_per_pixel
+        row_bytes = frame_width * channels
+        offset = profile.raw_header_size + top * row_bytes
+        length = (bottom - top) * row_bytes
+        try:
+            # 先原样输出头部的前12字节（宽、高、像素格式，12和16字节的头部都以此开头），
+            # 再用tail -c +N 从第N个字节(从1开始，相对头部之后)输出区域所在的行
+            data = self._execute_binary(
+                f"exec-out screencap | {{ dd bs={RAW_HEADER_PREFIX} count=1 2>/dev/null; "
+                f"tail -c +{offset - RAW_HEADER_PREFIX + 1} | head -c {length}; }}"
+            )
+            if len(data) < RAW_HEADER_PREFIX:
+                raise ValueError(f"区域截图数据过短: {len(data)}字节")
+        except Exception as e:
+            print(f"区域截图失败: {str(e)}")
+            # 屏幕方向或分辨率可能已经变化，下次使用时重新探测设备信息
+            self.invalidate_profile()
+            raise
+
+        header_width, header_height, _ = struct.unpack_from("<III", data, 0)
+        if (header_width, header_height) != (frame_width, frame_height):
+            print(
+                f"截图尺寸{header_width}x{header_height}与缓存的{frame_width}x{frame_height}不一致"
+            )
+            return None
+        if len(data) - RAW_HEADER_PREFIX != length:
+            self.invalidate_profile()
+            raise ValueError(
+                f"区域截图数据长度不符: {len(data) - RAW_HEADER_PREFIX}/{length}字节"
+            )
+
+        rows = np.frombuffer(data, dtype=np.uint8, offset=RAW_HEADER_PREFIX).reshape(
+            bottom - top, frame_width, channels
+        )
+        return rows[:, left:right]
+
+    @timed_action("tap")
     def tap(self, x, y):
         """
         模拟点击指定位置
@@ -123,12 +431,14 @@ class ADBController:
         """
         try:
             self._execute_command(f"shell input tap {x} {y}")
+            self.last_input_time = time.time()
             print(f"点击位置: ({x}, {y})")
             return True
         except Exception as e:
             print(f"点击失败: {str(e)}")
             return False
 
+    @timed_action("swipe")
     def swipe(self, start_x, start_y, end_x, end_y, duration=300, steps=10):
         """
         模拟从一个位置滑动到另一个位置
@@ -149,6 +459,7 @@ class ADBController:
             self._execute_command(
                 f"shell input swipe {start_x} {start_y} {end_x} {end_y} {duration}"
             )
+            self.last_input_time = time.time()
 
             print(
                 f"滑动: ({start_x}, {start_y}) -> ({end_x}, {end_y}), 持续时间: {duration}ms"
@@ -158,6 +469,136 @@ class ADBController:
             print(f"滑动失败: {str(e)}")
             return False
 
+    def batch(self):
+        """
+        创建一个批量输入队列，在with语句结束时一次性执行所有操作
+
+        返回:
+            InputBatch: 支持tap/swipe/sleep的批量输入队列
+        """
+        return InputBatch(self)
+
+    def enqueue_tap(self, x, y):
+        """
+        将点击操作加入内部队列，调用flush()时统一执行
+        """
+        self._input_queue.tap(x, y)
+
+    def enqueue_swipe(self, start_x, start_y, end_x, end_y, duration=300):
+        """
+        将滑动操作加入内部队列，调用flush()时统一执行
+        """
+        self._input_queue.swipe(start_x, start_y, end_x, end_y, duration)
+
+    def enqueue_sleep(self, seconds):
+        """
+        在内部队列中加入设备端等待
+        """
+        self._input_queue.sleep(seconds)
+
+    @timed_action("flush")
+    def flush(self):
+        """
+        一次往返执行内部队列中的所有输入操作
+
+        返回:
+            bool: 操作是否成功
+        """
+        return self._input_queue.flush()
+
+    def macro(self, name, origin=None):
+        """
+        创建一个手势宏，添加好操作后用run_macro执行
+
+        参数:
+            name: 宏名称
+            origin: 坐标的参照点 (x, y)；坐标取决于匹配结果时指定，脚本只保存相对偏移，
+                不同位置执行时不必重新上传
+
+        返回:
+            GestureMacro: 支持tap/swipe/sleep/pinch/gesture的手势宏
+        """
+        return GestureMacro(name, origin)
+
+    @timed_action("run_macro")
+    def run_macro(self, macro):
+        """
+        执行手势宏：脚本按内容哈希上传到设备（已上传过则跳过），然后一条命令执行
+
+        参数:
+            macro: GestureMacro实例
+
+        返回:
+            bool: 操作是否成功
+        """
+        try:
+            script = macro.compile(self.gestures)
+            remote_path = macro_remote_path(macro.name, script)
+            if remote_path not in self._uploaded_macros:
+                self._upload_macro(macro.name, script, remote_path)
+            arguments = "".join(f" {value}" for value in macro.arguments())
+            self._execute_command(f"shell sh {remote_path}{arguments}")
+            self.last_input_time = time.time()
+            print(f"执行手势宏: {macro.name}, {len(macro)}步")
+            return True
+        except Exception as e:
+            print(f"执行手势宏失败: {str(e)}")
+            return False
+
+    def _upload_macro(self, name, script, remote_path):
+        """
+        上传手势宏脚本；设备上已有相同内容的脚本（之前的会话上传过）时不再上传
+        """
+        existing = self._execute_command(
+            f"shell mkdir -p {MACRO_DIR}; ls {MACRO_DIR}"
+        ).split()
+
+        file_name = remote_path.rsplit("/", 1)[1]
+        if file_name not in existing:
+            # 删除同名宏的旧版本脚本
+            stale = [
+                f"{MACRO_DIR}/{item}"
+                for item in existing
+                if item.startswith(f"{name}_") and item != file_name
+            ]
+            if stale:
+                self._execute_command(f"shell rm -f {' '.join(stale)}")
+            self._push_bytes(script.encode("utf-8"), remote_path)
+            print(f"手势宏已上传: {remote_path}")
+        self._uploaded_macros.add(remote_path)
+
+    def _push_bytes(self, data, remote_path):
+        """
+        将数据写入设备文件（adb server会自动创建上级目录）
+        """
+        self._ensure_connected()
+        started = time.perf_counter()
+        failed = True
+        try:
+            if self.client is not None:
+                self.client.push_bytes(self.device_id, data, remote_path, mode=0o755)
+            else:
+                self._push_bytes_cli(data, remote_path)
+            failed = False
+        finally:
+            self.metrics.record_command(
+                "push", time.perf_counter() - started, failed, len(data), 0
+            )
+
+    def _push_bytes_cli(self, data, remote_path):
+        # 本地临时路径可能包含空格，直接传参给adb，不经过_execute_command的按空格拆分
+        fd, local_path = tempfile.mkstemp(suffix=".sh")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            cmd = [self.adb_path]
+            if self.device_id:
+                cmd.extend(["-s", self.device_id])
+            cmd.extend(["push", local_path, remote_path])
+            subprocess.run(cmd, capture_output=True, check=True)
+        finally:
+            os.remove(local_path)
+
     def swipe_relative(self, x, y, dx, dy, duration=300):
         """
         模拟从指定位置拖拽相对距离
@@ -174,6 +615,26 @@ class ADBController:
         """
         return self.swipe(x, y, x + dx, y + dy, duration)
 
+    def _inject_pinch(self, center_x, center_y, start_distance, end_distance, duration):
+        """
+        通过多指手势引擎一次注入真正的双指缩放
+
+        返回:
+            bool: 是否注入成功，失败时调用方改用旧的模拟方式
+        """
+        if not self._gesture_engine_available:
+            return False
+        try:
+            return self.gestures.pinch(
+                center_x, center_y, start_distance, end_distance, duration
+            )
+        except Exception as e:
+            # 设备不支持或没有权限写入input节点，之后不再尝试
+            print(f"多指手势注入失败，改用input命令模拟: {str(e)}")
+            self._gesture_engine_available = False
+            return False
+
+    @timed_action("pinch_zoom")
     def pinch_zoom(
         self, center_x, center_y, start_distance, end_distance, duration=300
     ):
@@ -190,6 +651,15 @@ class ADBController:
         返回:
             bool: 操作是否成功
         """
+        action = "放大" if end_distance > start_distance else "缩小"
+        if self._inject_pinch(
+            center_x, center_y, start_distance, end_distance, duration
+        ):
+            print(
+                f"{action}手势: 从距离{start_distance}像素到{end_distance}像素, 中心点: ({center_x}, {center_y})"
+            )
+            return True
+
         try:
             # 计算两指的起始和结束位置
             half_start = start_distance / 2
@@ -216,8 +686,8 @@ class ADBController:
             self._execute_command(
                 f"shell input swipe {finger2_start_x} {finger2_start_y} {finger2_end_x} {finger2_end_y} {duration}"
             )
+            self.last_input_time = time.time()
 
-            action = "放大" if end_distance > start_distance else "缩小"
             print(
                 f"{action}手势: 从距离{start_distance}像素到{end_distance}像素, 中心点: ({center_x}, {center_y})"
             )
@@ -244,6 +714,7 @@ class ADBController:
             center_x, center_y, base_distance, base_distance * scale, duration
         )
 
+    @timed_action("zoom_out")
     def zoom_out(self, center_x, center_y, scale=2, duration=500, steps=10):
         """
         使用高级触摸屏命令模拟双指缩小手势
@@ -278,6 +749,15 @@ class ADBController:
 
             print(f"执行缩小: 从{distance}到{end_distance}, 缩小{scale}倍")
 
+            # 优先一次注入完整的双指轨迹
+            if self._inject_pinch(
+                center_x, center_y, distance * 2, end_distance, duration
+            ):
+                print(
+                    f"缩小手势完成: 从距离{distance}像素到{end_distance}像素, 中心点: ({center_x}, {center_y})"
+                )
+                return True
+
             # 计算每步延迟
             delay = duration_sec / steps
 
@@ -307,6 +787,7 @@ class ADBController:
             self._execute_command(f"shell input touchscreen up {x1_end} {y1_end} 1")
             self._execute_command(f"shell input touchscreen up {x2_end} {y2_end} 2")
             self._execute_command("shell input touchscreen commit")
+            self.last_input_time = time.time()
 
             print(
                 f"缩小手势完成: 从距离{distance}像素到{end_distance}像素, 中心点: ({center_x}, {center_y})"
@@ -317,26 +798,94 @@ class ADBController:
             print(f"高级触摸缩小操作失败: {str(e)}")
             return False
 
+    def get_profile(self, refresh=False):
+        """
+        获取设备信息：优先使用内存和磁盘缓存，缓存不存在或过期时才探测设备
+
+        参数:
+            refresh: 是否强制重新探测
+
+        返回:
+            DeviceProfile: 设备信息
+        """
+        if self._profile is None and not refresh:
+            self._profile = self.profile_store.load(self.device_id)
+        if self._profile is None or refresh:
+            self._profile = self._probe_profile()
+            self.profile_store.save(self._profile)
+            print(
+                f"设备信息已更新: {self._profile.width}x{self._profile.height}, "
+                f"密度{self._profile.density}, 旋转{self._profile.rotation}, "
+                f"截图格式{self._profile.capture_format}"
+            )
+        return self._profile
+
+    def invalidate_profile(self):
+        """
+        丢弃缓存的设备信息，下次使用时重新探测
+        """
+        self._profile = None
+        self.profile_store.invalidate(self.device_id)
+
+    def _probe_profile(self):
+        """
+        通过ADB查询设备信息
+
+        返回:
+            DeviceProfile: 探测到的设备信息
+        """
+        profile = DeviceProfile(
+            self.device_id, transport="socket" if self.client is not None else "cli"
+        )
+
+        output = self._execute_command("shell wm size")
+        # 输出格式如: Physical size: 1080x2340
+        if "Physical size:" not in output:
+            raise ValueError("无法解析屏幕尺寸")
+        size_part = output.split("Physical size:")[1].strip().split()[0]
+        profile.width, profile.height = map(int, size_part.split("x"))
+
+        try:
+            output = self._execute_command("shell wm density")
+            if "Physical density:" in output:
+                profile.density = int(
+                    output.split("Physical density:")[1].strip().split()[0]
+                )
+        except Exception as e:
+            print(f"获取屏幕密度失败: {str(e)}")
+
+        profile.rotation = detect_rotation(self)
+
+        # 截取一帧确认raw格式可用，并记录头部长度和像素字节数
+        try:
+            data = self._execute_binary("exec-out screencap")
+            (
+                profile.raw_width,
+                profile.raw_height,
+                profile.raw_header_size,
+                profile.bytes_per_pixel,
+            ) = raw_screencap_layout(data)
+            profile.capture_format = "raw"
+        except Exception as e:
+            print(f"raw截图不可用，改用png: {str(e)}")
+            profile.capture_format = "png"
+
+        return profile
+
     def get_screen_size(self):
         """
-        获取屏幕尺寸
+        获取屏幕尺寸（来自缓存的设备信息，不会每次都查询设备）
 
         返回:
             tuple: (宽度, 高度) 屏幕尺寸
         """
         try:
-            output = self._execute_command("shell wm size")
-            # 输出格式如: Physical size: 1080x2340
-            if "Physical size:" in output:
-                size_part = output.split("Physical size:")[1].strip()
-                width, height = map(int, size_part.split("x"))
-                return width, height
-            else:
-                raise ValueError("无法解析屏幕尺寸")
+            return self.get_profile().screen_size
         except Exception as e:
             print(f"获取屏幕尺寸失败: {str(e)}")
             raise
 
+    @timed_action("input_text")
     def input_text(self, text):
         """
         输入文本
@@ -351,6 +900,7 @@ class ADBController:
             # 转义特殊字符
             escaped_text = text.replace(" ", "%s").replace("'", "'").replace('"', '"')
             self._execute_command(f'shell input text "{escaped_text}"')
+            self.last_input_time = time.time()
             print(f"输入文本: {text}")
             return True
         except Exception as e:
@@ -358,6 +908,55 @@ class ADBController:
             return False
 
 
+def raw_screencap_layout(data):
+    """
+    解析screencap原始输出（不带-p参数）的头部
+
+    输出格式为小端序的头部 (宽, 高, 像素格式[, 色彩空间]) 紧跟像素数据。
+    Android 9 之前头部为12字节，之后增加了色彩空间字段变为16字节。
+
+    参数:
+        data: screencap输出的字节数据
+
+    返回:
+        tuple: (宽, 高, 头部长度, 每像素字节数)
+    """
+    if len(data) < 12:
+        raise ValueError(f"screencap原始数据过短: {len(data)}字节")
+
+    width, height, pixel_format = struct.unpack_from("<III", data, 0)
+    pixel_count = width * height
+    if pixel_count == 0:
+        raise ValueError(f"无效的截图尺寸: {width}x{height}")
+
+    for header_size in (16, 12):
+        payload = len(data) - header_size
+        if payload > 0 and payload % pixel_count == 0:
+            channels = payload // pixel_count
+            if channels in (3, 4):
+                return width, height, header_size, channels
+
+    raise ValueError(
+        f"无法解析screencap原始数据: 尺寸{width}x{height}, 格式{pixel_format}, 长度{len(data)}"
+    )
+
+
+def parse_raw_screencap(data):
+    """
+    解析screencap原始输出（不带-p参数）
+
+    参数:
+        data: screencap输出的字节数据
+
+    返回:
+        numpy.ndarray: (高, 宽, 通道数)的uint8数组，直接引用data中的像素字节，不复制
+    """
+    width, height, header_size, channels = raw_screencap_layout(data)
+    return np.frombuffer(
+        data, dtype=np.uint8, count=width * height * channels, offset=header_size
+    ).reshape(height, width, channels)
+
+
 # 使用示例
 if __name__ == "__main__":
     try:
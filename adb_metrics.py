@@ -0,0 +1,324 @@
+import functools
+import json
+import re
+import threading
+import time
+
+# 耗时以微秒为单位记录；每个2的幂区间再细分为 2**(PRECISION_BITS-1) 个子桶，
+# 相对误差约为 2**(1-PRECISION_BITS)，即默认约3%
+PRECISION_BITS = 6
+
+# 输出汇总时使用的分位数
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class LatencyHistogram:
+    """
+    HDR风格的对数分桶直方图
+    桶的宽度随数值按指数增长，内存占用只与出现过的数量级有关，
+    记录一次只需几次整数运算，可以常驻生产环境
+    """
+
+    def __init__(self, precision_bits=PRECISION_BITS):
+        """
+        参数:
+            precision_bits: 每个数量级的精度位数，越大越精确，桶也越多
+        """
+        self.precision_bits = precision_bits
+        self._sub_count = 1 << precision_bits
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _bucket_index(self, value):
+        if value < self._sub_count:
+            return value
+        shift = value.bit_length() - self.precision_bits
+        return shift * (self._sub_count >> 1) + (value >> shift)
+
+    def _bucket_range(self, index):
+        """
+        返回:
+            tuple: 桶覆盖的数值范围 (下限, 上限)，均包含
+        """
+        if index < self._sub_count:
+            return index, index
+        half = self._sub_count >> 1
+        shift = (index - self._sub_count) // half + 1
+        mantissa = index - shift * half
+        return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+    def record(self, value):
+        """
+        参数:
+            value: 非负整数（微秒）
+        """
+        index = self._bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, quantile):
+        """
+        参数:
+            quantile: 0到1之间的分位数
+
+        返回:
+            int: 该分位数所在桶的上限（不超过记录到的最大值），没有数据时返回0
+        """
+        if self.count == 0:
+            return 0
+        target = max(1, quantile * self.count)
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._bucket_range(index)[1], self.max)
+        return self.max
+
+    def buckets(self):
+        """
+        返回:
+            list: 非空桶 [(上限, 数量), ...]，按上限升序
+        """
+        return [
+            (self._bucket_range(index)[1], self.counts[index])
+            for index in sorted(self.counts)
+        ]
+
+
+class CommandStats:
+    """
+    一类命令或操作的统计：耗时直方图、失败次数和传输字节数
+    """
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.failures = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def to_dict(self):
+        latency = self.latency
+        result = {
+            "count": latency.count,
+            "failures": self.failures,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "total_ms": latency.total / 1000,
+            "mean_ms": latency.total / latency.count / 1000 if latency.count else 0.0,
+            "min_ms": (latency.min or 0) / 1000,
+            "max_ms": (latency.max or 0) / 1000,
+        }
+        for quantile in QUANTILES:
+            result[f"p{quantile * 100:g}_ms"] = latency.percentile(quantile) / 1000
+        return result
+
+
+class ADBMetrics:
+    """
+    ADBController的耗时统计
+    分为两类：commands 按adb命令类型统计（如 "shell input"、"exec-out screencap"），
+    actions 按公开操作统计（如 tap、swipe、screenshot_array）
+
+    使用示例:
+        print(adb.metrics.to_json())
+        adb.metrics.print_summary()
+    """
+
+    def __init__(self, enabled=True):
+        """
+        参数:
+            enabled: 是否记录，关闭后record不做任何事
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.commands = {}
+        self.actions = {}
+
+    def _record(self, table, name, seconds, failed, bytes_sent, bytes_received):
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = table.get(name)
+            if stats is None:
+                stats = table[name] = CommandStats()
+            stats.latency.record(int(seconds * 1_000_000))
+            if failed:
+                stats.failures += 1
+            stats.bytes_sent += bytes_sent
+            stats.bytes_received += bytes_received
+
+    def record_command(self, kind, seconds, failed=False, bytes_sent=0, bytes_received=0):
+        """
+        记录一次adb命令
+
+        参数:
+            kind: 命令类型，见command_kind
+            seconds: 耗时(秒)
+            failed: 是否失败
+            bytes_sent: 发送的字节数
+            bytes_received: 收到的字节数
+        """
+        self._record(self.commands, kind, seconds, failed, bytes_sent, bytes_received)
+
+    def record_action(self, name, seconds, failed=False):
+        """
+        记录一次公开操作（一次操作可能包含多条adb命令）
+        """
+        self._record(self.actions, name, seconds, failed, 0, 0)
+
+    def reset(self):
+        with self._lock:
+            self.commands = {}
+            self.actions = {}
+            self.started_at = time.time()
+
+    def snapshot(self):
+        """
+        返回:
+            dict: {"uptime_seconds", "commands": {类型: 统计}, "actions": {名称: 统计}}
+        """
+        with self._lock:
+            return {
+                "uptime_seconds": time.time() - self.started_at,
+                "commands": {
+                    name: stats.to_dict() for name, stats in sorted(self.commands.items())
+                },
+                "actions": {
+                    name: stats.to_dict() for name, stats in sorted(self.actions.items())
+                },
+            }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=indent)
+
+    def to_prometheus(self, prefix="adb", labels=None):
+        """
+        生成Prometheus文本格式的指标，耗时按非空的对数桶输出为histogram
+
+        参数:
+            prefix: 指标名前缀
+            labels: 附加到每个指标上的标签，如 {"device": "127.0.0.1:16384"}
+
+        返回:
+            str: Prometheus文本格式
+        """
+        base_labels = "".join(
+            f'{key}="{_escape_label(value)}",' for key, value in (labels or {}).items()
+        )
+        lines = []
+        with self._lock:
+            for family, table in (("command", self.commands), ("action", self.actions)):
+                metric = f"{prefix}_{family}_duration_seconds"
+                lines.append(f"# HELP {metric} ADB {family} latency")
+                lines.append(f"# TYPE {metric} histogram")
+                for name, stats in sorted(table.items()):
+                    label = f'{base_labels}{family}="{_escape_label(name)}"'
+                    cumulative = 0
+                    for upper, count in stats.latency.buckets():
+                        cumulative += count
+                        lines.append(
+                            f'{metric}_bucket{{{label},le="{upper / 1_000_000:.6g}"}} {cumulative}'
+                        )
+                    lines.append(f'{metric}_bucket{{{label},le="+Inf"}} {stats.latency.count}')
+                    lines.append(f"{metric}_sum{{{label}}} {stats.latency.total / 1_000_000:.6f}")
+                    lines.append(f"{metric}_count{{{label}}} {stats.latency.count}")
+
+                metric = f"{prefix}_{family}_failures_total"
+                lines.append(f"# TYPE {metric} counter")
+                for name, stats in sorted(table.items()):
+                    lines.append(
+                        f'{metric}{{{base_labels}{family}="{_escape_label(name)}"}} {stats.failures}'
+                    )
+
+            metric = f"{prefix}_command_bytes_total"
+            lines.append(f"# TYPE {metric} counter")
+            for name, stats in sorted(self.commands.items()):
+                label = f'{base_labels}command="{_escape_label(name)}"'
+                lines.append(f'{metric}{{{label},direction="sent"}} {stats.bytes_sent}')
+                lines.append(
+                    f'{metric}{{{label},direction="received"}} {stats.bytes_received}'
+                )
+        return "\n".join(lines) + "\n"
+
+    def print_summary(self):
+        """
+        按总耗时从高到低打印各类命令和操作的统计
+        """
+        snapshot = self.snapshot()
+        print(f"=== ADB耗时统计 (运行 {snapshot['uptime_seconds']:.1f}秒) ===")
+        for family, title in (("commands", "命令"), ("actions", "操作")):
+            rows = sorted(
+                snapshot[family].items(), key=lambda item: item[1]["total_ms"], reverse=True
+            )
+            if not rows:
+                continue
+            print(f"[{title}]")
+            for name, stats in rows:
+                line = (
+                    f"  {name}: {stats['count']}次, 失败{stats['failures']}, "
+                    f"合计{stats['total_ms']:.0f}ms, 平均{stats['mean_ms']:.1f}ms, "
+                    f"p50 {stats['p50_ms']:.1f}ms, p99 {stats['p99_ms']:.1f}ms"
+                )
+                if family == "commands":
+                    line += f", 接收{stats['bytes_received']}字节"
+                print(line)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_WORD_PATTERN = re.compile(r"[A-Za-z0-9_.-]+")
+
+
+def command_kind(command):
+    """
+    把adb命令归类，用作统计的键
+
+    例如 "shell input tap 1 2" -> "shell input"，"exec-out screencap -p" -> "exec-out screencap"，
+    "pull /sdcard/a.png a.png" -> "pull"；无法识别的shell脚本归为 "shell script"
+
+    返回:
+        str: 命令类型
+    """
+    name, _, args = command.partition(" ")
+    if name not in ("shell", "exec-out"):
+        return name
+    args = args.lstrip()
+    match = _WORD_PATTERN.match(args)
+    # 第一个词后面不是空白或分号时（如 "e(){ ..."）不是普通命令
+    if match is None or args[match.end() : match.end() + 1] not in ("", " ", ";", "\n"):
+        return f"{name} script"
+    return f"{name} {match.group(0)}"
+
+
+def timed_action(name):
+    """
+    装饰ADBController的公开方法，把每次调用的耗时记录到self.metrics的actions中
+    方法抛出异常或返回False都记为失败
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            started = time.perf_counter()
+            failed = True
+            try:
+                result = method(self, *args, **kwargs)
+                failed = result is False
+                return result
+            finally:
+                self.metrics.record_action(name, time.perf_counter() - started, failed)
+
+        return wrapper
+
+    return decorator
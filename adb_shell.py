@@ -0,0 +1,187 @@
+import queue
+import subprocess
+import threading
+import time
+import uuid
+
+
+class ADBShellSession:
+    """
+    常驻的adb shell会话
+    命令写入同一个adb shell进程的标准输入，通过哨兵标记读取输出和退出码，
+    避免每条命令都重新启动一个adb进程。会话断开时自动重连。
+    """
+
+    def __init__(self, adb_path="adb", device_id=None, timeout=15):
+        """
+        初始化shell会话（不会立即启动进程，第一次执行命令时才启动）
+
+        参数:
+            adb_path: adb可执行文件路径
+            device_id: 设备连接地址，为None时使用adb默认设备
+            timeout: 单条命令的默认超时时间(秒)
+        """
+        self.adb_path = adb_path
+        self.device_id = device_id
+        self.timeout = timeout
+        self._process = None
+        self._lines = None
+        # 读取线程读到EOF时设置，说明会话已被对方关闭
+        self._eof = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        启动adb shell进程以及读取输出的后台线程
+        """
+        cmd = [self.adb_path]
+        if self.device_id:
+            cmd.extend(["-s", self.device_id])
+        cmd.append("shell")
+
+        self._process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            bufsize=0,
+        )
+        # 每个进程使用独立的队列和EOF标记，避免旧进程的残留输出混入新会话
+        self._lines = queue.Queue()
+        self._eof = threading.Event()
+        reader = threading.Thread(
+            target=self._read_output,
+            args=(self._process.stdout, self._lines, self._eof),
+            daemon=True,
+        )
+        reader.start()
+
+    @staticmethod
+    def _read_output(stream, lines, eof):
+        """
+        后台线程：逐行读取shell输出并放入队列，读到EOF时放入None并设置eof
+        """
+        try:
+            for line in iter(stream.readline, b""):
+                lines.put(line)
+        except (OSError, ValueError):
+            pass
+        eof.set()
+        lines.put(None)
+
+    def _write(self, data):
+        """
+        向shell的标准输入写入数据
+        """
+        self._process.stdin.write(data)
+        self._process.stdin.flush()
+
+    def is_alive(self):
+        """
+        返回:
+            bool: shell进程是否仍在运行
+        """
+        return (
+            self._process is not None
+            and self._process.poll() is None
+            and not self._eof.is_set()
+        )
+
+    def close(self):
+        """
+        关闭shell会话
+        """
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            if process.poll() is None:
+                process.stdin.write(b"exit\n")
+                process.stdin.flush()
+                process.wait(timeout=1)
+        except Exception:
+            pass
+        finally:
+            if process.poll() is None:
+                process.kill()
+
+    def run(self, command, timeout=None):
+        """
+        在常驻shell中执行一条命令
+
+        参数:
+            command: 设备端shell命令（不包含"adb shell"前缀）
+            timeout: 超时时间(秒)，为None时使用默认值
+
+        返回:
+            str: 命令输出
+
+        异常:
+            subprocess.CalledProcessError: 命令退出码不为0
+            ConnectionError: shell会话断开且重连失败
+            TimeoutError: 命令执行超时
+        """
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            try:
+                return self._run_locked(command, timeout)
+            except _SessionDropped:
+                # 命令没能写入会话，说明命令没有执行，重连后重试一次；
+                # 写入成功后再断开时命令可能已经执行（如没有输出的input tap），不能重试
+                print("ADB shell会话已断开，正在重新连接...")
+                self.close()
+                try:
+                    return self._run_locked(command, timeout)
+                except _SessionDropped:
+                    self.close()
+                    raise ConnectionError("ADB shell会话重连失败")
+
+    def _run_locked(self, command, timeout):
+        if not self.is_alive():
+            # 空闲时被关闭的会话在写入命令之前重新启动，不会重复执行已发送的命令
+            self.close()
+            self.start()
+
+        marker = f"__ADB_CMD_END_{uuid.uuid4().hex}__"
+        # 先输出一个换行，保证即使命令输出末尾没有换行，哨兵也独占一行
+        script = f"{command}\n__rc=$?; echo; echo {marker} $__rc\n"
+        try:
+            self._write(script.encode("utf-8"))
+        except (BrokenPipeError, OSError):
+            raise _SessionDropped()
+
+        output = []
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                line = self._lines.get(timeout=max(remaining, 0))
+            except queue.Empty:
+                # 无法确定命令状态，丢弃当前会话，下次调用时重新启动
+                self.close()
+                raise TimeoutError(f"ADB shell命令超时({timeout}秒): {command}")
+
+            if line is None:
+                self.close()
+                raise ConnectionError(f"ADB shell会话在执行命令时断开: {command}")
+
+            text = line.decode("utf-8", errors="replace")
+            if text.startswith(marker):
+                return_code = int(text[len(marker):].strip() or 0)
+                break
+            output.append(text)
+
+        # 去掉哨兵前额外输出的那个换行
+        result = "".join(output).replace("\r\n", "\n")
+        if result.endswith("\n"):
+            result = result[:-1]
+
+        if return_code != 0:
+            raise subprocess.CalledProcessError(
+                return_code, command, output=result, stderr=result
+            )
+        return result
+
+
+class _SessionDropped(Exception):
+    """命令写入shell会话失败（命令没有执行）"""
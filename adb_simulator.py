@@ -0,0 +1,795 @@
+import argparse
+import json
+import re
+import shlex
+import socket
+import socketserver
+import struct
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import cv2
+
+# 模拟设备默认的序列号，与ADBController的默认设备地址一致
+DEFAULT_SERIAL = "127.0.0.1:16384"
+
+# 各类命令的默认模拟耗时(秒)
+DEFAULT_LATENCY = {
+    "transport": 0.0,
+    "screencap": 0.0,
+    "input": 0.0,
+    "shell": 0.0,
+}
+
+
+class Scenario:
+    """
+    模拟场景：若干个画面(状态)，每个画面对应一张或几张录制的截图，
+    点击画面中定义的区域会切换到另一个画面
+
+    场景文件格式(JSON)，图片路径相对于场景文件:
+        {
+            "start": "home",
+            "latency": {"screencap": 0.05, "input": 0.01, "shell": 0.002, "transport": 0.001},
+            "bytes_per_second": 100000000,
+            "screens": {
+                "home": {
+                    "image": "frames/home.png",
+                    "regions": [{"rect": [100, 200, 300, 260], "goto": "battle", "delay": 0.5}]
+                },
+                "battle": {"images": ["frames/battle1.png", "frames/battle2.png"],
+                           "after": 3.0, "next": "home"}
+            }
+        }
+    images为多张时每次截图依次返回下一张；after/next表示进入画面若干秒后自动切换
+    """
+
+    def __init__(self, screens, start, latency=None, bytes_per_second=None, density=320):
+        """
+        参数:
+            screens: {画面名称: 画面定义}，画面定义中的image/images为BGR数组或图片路径
+            start: 初始画面名称
+            latency: 各类命令的模拟耗时(秒)，见DEFAULT_LATENCY
+            bytes_per_second: 模拟的传输带宽，为None时不限制
+            density: wm density返回的像素密度
+        """
+        if start not in screens:
+            raise ValueError(f"初始画面不存在: {start}")
+        self.screens = {}
+        for name, screen in screens.items():
+            images = screen.get("images") or [screen["image"]]
+            frames = [_load_frame(image) for image in images]
+            for region in screen.get("regions", []):
+                if region["goto"] not in screens:
+                    raise ValueError(f"画面 {name} 的区域指向不存在的画面: {region['goto']}")
+            if screen.get("next") is not None:
+                if screen["next"] not in screens:
+                    raise ValueError(f"画面 {name} 自动切换到不存在的画面: {screen['next']}")
+                if not screen.get("after", 0) > 0:
+                    raise ValueError(f"画面 {name} 的自动切换时间after必须大于0")
+            self.screens[name] = {
+                "frames": frames,
+                "regions": screen.get("regions", []),
+                "after": screen.get("after"),
+                "next": screen.get("next"),
+            }
+        self.start = start
+        self.latency = dict(DEFAULT_LATENCY, **(latency or {}))
+        self.bytes_per_second = bytes_per_second
+        self.density = density
+
+        height, width = self.screens[start]["frames"][0]["image"].shape[:2]
+        self.size = (width, height)
+        for name, screen in self.screens.items():
+            for frame in screen["frames"]:
+                if frame["image"].shape[:2] != (height, width):
+                    raise ValueError(f"画面 {name} 的截图尺寸与初始画面不一致")
+
+    @classmethod
+    def load(cls, path):
+        """
+        从JSON场景文件读取场景
+
+        返回:
+            Scenario: 场景对象
+        """
+        path = Path(path)
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        screens = {}
+        for name, screen in config["screens"].items():
+            screen = dict(screen)
+            if "image" in screen:
+                screen["image"] = str(path.parent / screen["image"])
+            if "images" in screen:
+                screen["images"] = [str(path.parent / image) for image in screen["images"]]
+            screens[name] = screen
+        return cls(
+            screens,
+            config["start"],
+            config.get("latency"),
+            config.get("bytes_per_second"),
+            config.get("density", 320),
+        )
+
+
+def _load_frame(image):
+    """
+    读取一帧截图，并预先生成raw和png两种screencap输出
+    """
+    if isinstance(image, (str, Path)):
+        path = image
+        image = cv2.imread(str(path))
+        if image is None:
+            raise ValueError(f"无法读取截图: {path}")
+    height, width = image.shape[:2]
+    rgba = cv2.cvtColor(image, cv2.COLOR_BGR2RGBA)
+    # raw格式: 宽、高、像素格式(1=RGBA_8888)、色彩空间 + 像素数据
+    raw = struct.pack("<IIII", width, height, 1, 0) + rgba.tobytes()
+    ok, png = cv2.imencode(".png", image)
+    if not ok:
+        raise ValueError("无法编码PNG截图")
+    return {"image": image, "raw": raw, "png": png.tobytes()}
+
+
+def _split_top_level(text, separator):
+    """
+    按分隔符拆分命令，不拆分命令组 { ... } 内部
+    """
+    parts = []
+    depth = 0
+    current = []
+    for char in text:
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+        if char == separator and depth == 0:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    parts.append("".join(current))
+    return parts
+
+
+class SimulatedDevice:
+    """
+    按场景响应adb命令的模拟设备
+    支持screencap、input tap/swipe/text/touchscreen、wm size/density、dumpsys input、
+    getevent、sleep、echo、rm、mkdir、ls、sh 脚本文件(含位置参数)、head/tail -c、dd、cat、
+    管道、共用标准输入的命令组 { ...; } 和整数运算 $((...))，以及sync协议读写的内存文件
+    """
+
+    def __init__(self, scenario, serial=DEFAULT_SERIAL):
+        """
+        参数:
+            scenario: Scenario实例
+            serial: 设备序列号
+        """
+        self.scenario = scenario
+        self.serial = serial
+        self.files = {}
+        self.directories = set()
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        """
+        回到初始画面并清空统计
+        """
+        with self._lock:
+            self._screen = self.scenario.start
+            self._entered_at = time.time()
+            self._pending = None  # (切换时间, 目标画面)
+            self._frame_index = 0
+            self.stats = {"commands": 0, "captures": 0, "taps": 0, "transitions": 0}
+
+    def _enter(self, screen):
+        self._screen = screen
+        self._entered_at = time.time()
+        self._frame_index = 0
+        self.stats["transitions"] += 1
+
+    @property
+    def screen(self):
+        """
+        返回:
+            str: 当前画面名称（会先处理到期的延迟切换和自动切换）
+        """
+        with self._lock:
+            now = time.time()
+            while True:
+                if self._pending is not None and now >= self._pending[0]:
+                    target = self._pending[1]
+                    self._pending = None
+                    self._enter(target)
+                    continue
+                current = self.scenario.screens[self._screen]
+                if (
+                    self._pending is None
+                    and current["next"] is not None
+                    and now - self._entered_at >= current["after"]
+                ):
+                    self._enter(current["next"])
+                    continue
+                return self._screen
+
+    def tap(self, x, y):
+        """
+        在当前画面点击，命中区域时切换画面
+        """
+        with self._lock:
+            screen = self.screen
+            self.stats["taps"] += 1
+            for region in self.scenario.screens[screen]["regions"]:
+                x1, y1, x2, y2 = region["rect"]
+                if x1 <= x <= x2 and y1 <= y <= y2:
+                    delay = region.get("delay", 0)
+                    if delay > 0:
+                        self._pending = (time.time() + delay, region["goto"])
+                    else:
+                        self._enter(region["goto"])
+                    return True
+            return False
+
+    def capture(self, fmt="raw"):
+        """
+        返回:
+            bytes: 当前画面的screencap输出，fmt为 "raw" 或 "png"
+        """
+        with self._lock:
+            frames = self.scenario.screens[self.screen]["frames"]
+            frame = frames[self._frame_index % len(frames)]
+            self._frame_index += 1
+            self.stats["captures"] += 1
+        return frame[fmt]
+
+    def _delay(self, kind):
+        seconds = self.scenario.latency.get(kind, 0)
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def run_script(self, script, shell_vars=None):
+        """
+        执行shell脚本（按行和分号拆分的简单命令序列）
+
+        参数:
+            script: 脚本内容
+            shell_vars: 会话变量，常驻shell会话中跨行保留
+
+        返回:
+            tuple: (输出字节, 最后一条命令的退出码)
+        """
+        shell_vars = {} if shell_vars is None else shell_vars
+        output = []
+        for line in script.split("\n"):
+            output.append(self._run_line(line, shell_vars))
+        return b"".join(output), shell_vars.get("?", 0)
+
+    def _run_line(self, line, shell_vars):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            return b""
+        # 函数定义（如手势脚本中的 e(){ sendevent ...; }）只记录名称，调用时不做任何事
+        match = re.match(r"^(\w+)\s*\(\)\s*\{.*\}$", line)
+        if match:
+            shell_vars.setdefault("()", set()).add(match.group(1))
+            shell_vars["?"] = 0
+            return b""
+
+        output = []
+        for statement in _split_top_level(line, ";"):
+            statement = statement.strip()
+            if statement:
+                output.append(self._run_statement(statement, shell_vars))
+        return b"".join(output)
+
+    def _run_group(self, body, stdin, shell_vars):
+        """
+        执行命令组 { ...; }：组内的命令依次读取同一个标准输入，dd只读取自己的块，其他命令读完剩余部分
+        """
+        output = []
+        for statement in _split_top_level(body, ";"):
+            statement = statement.strip()
+            if not statement:
+                continue
+            consumed = len(stdin or b"")
+            match = re.match(r"^dd\s+bs=(\d+)\s+count=(\d+)", statement)
+            if match:
+                consumed = min(consumed, int(match.group(1)) * int(match.group(2)))
+            output.append(self._run_statement(statement, shell_vars, stdin))
+            stdin = (stdin or b"")[consumed:]
+        return b"".join(output), shell_vars.get("?", 0)
+
+    def _run_statement(self, statement, shell_vars, stdin=None):
+        group = re.match(r"^(.*?)\|?\s*\{(.*)\}$", statement)
+        if group and "{" not in group.group(1):
+            # 前面的管道输出作为命令组的标准输入
+            output = self._run_statement(group.group(1), shell_vars) if group.group(1) else stdin
+            output, rc = self._run_group(group.group(2), output, shell_vars)
+            shell_vars["?"] = rc
+            return output
+        statement = re.sub(
+            r"\$(\?|\w+)",
+            lambda m: str(shell_vars.get(m.group(1), "")),
+            statement,
+        )
+        statement = re.sub(
+            r"\$\(\(([-+*/%\d\s()]+)\)\)",
+            lambda m: str(int(eval(m.group(1).replace("/", "//"), {"__builtins__": {}}))),
+            statement,
+        )
+        output = stdin
+        rc = 0
+        # 管道: 前一条命令的输出作为后一条命令的输入
+        for stage in re.split(r"(?<!\|)\|(?!\|)", statement):
+            try:
+                argv = shlex.split(stage)
+            except ValueError:
+                argv = stage.split()
+            if not argv:
+                continue
+
+            assignment = re.match(r"^(\w+)=(.*)$", argv[0])
+            if assignment and len(argv) == 1:
+                shell_vars[assignment.group(1)] = assignment.group(2)
+                output, rc = b"", 0
+                continue
+
+            with self._lock:
+                self.stats["commands"] += 1
+            # 忽略重定向（如 2>/dev/null）
+            argv = [arg for arg in argv if not re.match(r"^\d*>", arg)]
+            if argv[0] in shell_vars.get("()", ()):
+                output, rc = b"", 0
+                continue
+            output, rc = self.execute(argv, output)
+        shell_vars["?"] = rc
+        return output or b""
+
+    def execute(self, argv, stdin=None):
+        """
+        执行一条设备端命令
+
+        参数:
+            argv: 命令及参数列表
+            stdin: 管道输入的字节，没有时为None
+
+        返回:
+            tuple: (输出字节, 退出码)
+        """
+        name, args = argv[0], argv[1:]
+
+        if name == "screencap":
+            self._delay("screencap")
+            fmt = "png" if "-p" in args else "raw"
+            data = self.capture(fmt)
+            paths = [arg for arg in args if not arg.startswith("-")]
+            if paths:
+                self.files[paths[0]] = data
+                return b"", 0
+            return data, 0
+
+        if name == "input":
+            self._delay("input")
+            return self._input(args)
+
+        self._delay("shell")
+        if name == "wm" and args[:1] == ["size"]:
+            width, height = self.scenario.size
+            return f"Physical size: {width}x{height}\n".encode(), 0
+        if name == "wm" and args[:1] == ["density"]:
+            return f"Physical density: {self.scenario.density}\n".encode(), 0
+        if name == "dumpsys":
+            return b"SurfaceOrientation: 0\n", 0
+        if name == "getevent":
+            # 不提供多点触控设备，手势会退回input命令
+            return b"", 0
+        if name == "sleep":
+            time.sleep(float(args[0]) if args else 0)
+            return b"", 0
+        if name == "echo":
+            return (" ".join(args) + "\n").encode(), 0
+        if name == "rm":
+            for path in args:
+                if not path.startswith("-"):
+                    self.files.pop(path, None)
+            return b"", 0
+        if name in ("head", "tail") and len(args) == 2 and args[0] == "-c":
+            data = stdin or b""
+            count = args[1]
+            if name == "head":
+                return data[: int(count)], 0
+            # tail -c +N 从第N个字节开始输出，tail -c N 输出最后N个字节
+            if count.startswith("+"):
+                return data[int(count) - 1 :], 0
+            return data[-int(count) :] if int(count) else b"", 0
+        if name == "dd":
+            options = dict(arg.split("=", 1) for arg in args if "=" in arg)
+            size = int(options.get("bs", 512)) * int(options.get("count", 1 << 30))
+            return (stdin or b"")[:size], 0
+        if name == "cat" and not args:
+            return stdin or b"", 0
+        if name == "sh" and args:
+            script = self.files.get(args[0])
+            if script is None:
+                return f"sh: {args[0]}: No such file or directory\n".encode(), 127
+            # 位置参数 $1 $2 ...
+            positional = {str(i): value for i, value in enumerate(args[1:], 1)}
+            return self.run_script(script.decode("utf-8", errors="replace"), positional)
+        if name == "mkdir":
+            self.directories.update(arg.rstrip("/") for arg in args if not arg.startswith("-"))
+            return b"", 0
+        if name == "ls" and len(args) == 1:
+            prefix = args[0].rstrip("/") + "/"
+            names = sorted(
+                path[len(prefix) :]
+                for path in self.files
+                if path.startswith(prefix) and "/" not in path[len(prefix) :]
+            )
+            if not names and args[0].rstrip("/") not in self.directories:
+                return f"ls: {args[0]}: No such file or directory\n".encode(), 1
+            return "".join(f"{item}\n" for item in names).encode(), 0
+        if name in ("true", "sendevent"):
+            return b"", 0
+        return f"sh: {name}: not found\n".encode(), 127
+
+    def _input(self, args):
+        if args[:1] == ["touchscreen"]:
+            args = args[1:]
+        if not args:
+            return b"usage: input [<source>] <command> [<arg>...]\n", 1
+        command, values = args[0], args[1:]
+        try:
+            if command == "tap":
+                self.tap(int(float(values[0])), int(float(values[1])))
+            elif command == "swipe":
+                # 起点和终点几乎重合的滑动等同于长按，按点击处理
+                x1, y1, x2, y2 = (int(float(v)) for v in values[:4])
+                if abs(x2 - x1) <= 10 and abs(y2 - y1) <= 10:
+                    self.tap(x1, y1)
+            elif command not in ("text", "keyevent", "down", "move", "up", "commit"):
+                return f"Error: Unknown command: {command}\n".encode(), 1
+        except (IndexError, ValueError):
+            return f"Error: Invalid arguments for command: {command}\n".encode(), 1
+        return b"", 0
+
+
+class _ADBServerHandler(socketserver.BaseRequestHandler):
+    """
+    处理一条adb server连接，实现smart-socket协议中ADBClient用到的部分
+    """
+
+    def setup(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.stream = self.request.makefile("rb")
+
+    def read_exact(self, size):
+        data = self.stream.read(size)
+        if len(data) < size:
+            raise EOFError
+        return data
+
+    def okay(self, payload=None):
+        if payload is None:
+            self.request.sendall(b"OKAY")
+        else:
+            payload = payload.encode("utf-8")
+            self.request.sendall(b"OKAY%04x" % len(payload) + payload)
+
+    def fail(self, message):
+        message = message.encode("utf-8")
+        self.request.sendall(b"FAIL%04x" % len(message) + message)
+
+    def send_stream(self, device, data):
+        bytes_per_second = device.scenario.bytes_per_second
+        if bytes_per_second and data:
+            time.sleep(len(data) / bytes_per_second)
+        self.request.sendall(data)
+
+    def handle(self):
+        server = self.server
+        device = None
+        try:
+            while True:
+                length = int(self.read_exact(4), 16)
+                request = self.read_exact(length).decode("utf-8")
+
+                if request == "host:version":
+                    self.okay("0029")
+                    return
+                if request == "host:devices":
+                    self.okay("".join(f"{serial}\tdevice\n" for serial in server.devices))
+                    return
+                if request.startswith("host:connect:"):
+                    address = request[len("host:connect:") :]
+                    if address in server.devices:
+                        self.okay(f"already connected to {address}")
+                    else:
+                        self.okay(f"failed to connect to {address}")
+                    return
+                if request.startswith("host:transport"):
+                    if request == "host:transport-any" and len(server.devices) == 1:
+                        device = next(iter(server.devices.values()))
+                    else:
+                        device = server.devices.get(request.split(":", 2)[-1])
+                    if device is None:
+                        self.fail("device not found")
+                        return
+                    device._delay("transport")
+                    self.okay()
+                    continue
+
+                if device is None:
+                    self.fail(f"unknown host service: {request}")
+                    return
+                service, _, command = request.partition(":")
+                if service in ("shell", "exec"):
+                    self.okay()
+                    if command in ("", "sh"):
+                        self._interactive_shell(device)
+                    else:
+                        output, _ = device.run_script(command)
+                        self.send_stream(device, output)
+                    return
+                if request == "sync:":
+                    self.okay()
+                    self._sync(device)
+                    return
+                self.fail(f"unknown service: {request}")
+                return
+        except (EOFError, ConnectionError):
+            pass
+
+    def _interactive_shell(self, device):
+        """
+        常驻shell：逐行读取并执行命令，直到对端关闭连接
+        """
+        shell_vars = {}
+        for line in iter(self.stream.readline, b""):
+            output = device._run_line(line.decode("utf-8", errors="replace"), shell_vars)
+            if output:
+                self.send_stream(device, output)
+
+    def _sync(self, device):
+        while True:
+            header = self.read_exact(8)
+            command_id = header[:4]
+            length = struct.unpack("<I", header[4:])[0]
+            if command_id == b"QUIT":
+                return
+            path = self.read_exact(length).decode("utf-8")
+
+            if command_id == b"STAT":
+                data = device.files.get(path)
+                if data is None:
+                    self.request.sendall(b"STAT" + bytes(12))
+                else:
+                    self.request.sendall(
+                        b"STAT" + struct.pack("<III", 0o100644, len(data), int(time.time()))
+                    )
+            elif command_id == b"RECV":
+                data = device.files.get(path)
+                if data is None:
+                    message = b"No such file or directory"
+                    self.request.sendall(b"FAIL" + struct.pack("<I", len(message)) + message)
+                    continue
+                chunks = [
+                    b"DATA" + struct.pack("<I", len(data[i : i + 65536])) + data[i : i + 65536]
+                    for i in range(0, len(data), 65536)
+                ]
+                self.send_stream(device, b"".join(chunks) + b"DONE" + bytes(4))
+            elif command_id == b"SEND":
+                remote_path = path.rsplit(",", 1)[0]
+                chunks = []
+                while True:
+                    header = self.read_exact(8)
+                    size = struct.unpack("<I", header[4:])[0]
+                    if header[:4] == b"DONE":
+                        break
+                    chunks.append(self.read_exact(size))
+                device.files[remote_path] = b"".join(chunks)
+                self.request.sendall(b"OKAY" + bytes(4))
+            else:
+                message = b"unknown sync command"
+                self.request.sendall(b"FAIL" + struct.pack("<I", len(message)) + message)
+                return
+
+
+class ADBServerSimulator(socketserver.ThreadingTCPServer):
+    """
+    模拟的adb server，ADBController/AsyncADBController使用socket传输时可以直接连接
+    不需要adb可执行文件和模拟器，用于离线压测和CI
+
+    使用示例:
+        device = SimulatedDevice(Scenario.load("scenario.json"))
+        with ADBServerSimulator([device]) as server:
+            server.start()
+            adb = ADBController(device.serial, transport="socket",
+                                adb_client=ADBClient(port=server.port))
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, devices, host="127.0.0.1", port=0):
+        """
+        参数:
+            devices: SimulatedDevice列表
+            host: 监听地址
+            port: 监听端口，0表示自动分配
+        """
+        super().__init__((host, port), _ADBServerHandler)
+        self.devices = {device.serial: device for device in devices}
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        """
+        在后台线程中运行
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"模拟adb server已启动: {self.server_address[0]}:{self.port}")
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __exit__(self, *args):
+        if self._thread is not None:
+            self.stop()
+        else:
+            self.server_close()
+
+
+def run_benchmark(scenario_path, templates, iterations=50, threshold=0.8):
+    """
+    在模拟设备上压测 截图->匹配->点击 循环
+
+    参数:
+        scenario_path: 场景文件路径
+        templates: 每轮依次查找并点击的模板图片路径，为空时每轮只截图并点击屏幕中心
+        iterations: 轮数
+        threshold: 匹配阈值
+
+    返回:
+        dict: 总耗时、每秒轮数、模拟设备的统计和ADB耗时统计
+    """
+    from adb_client import ADBClient
+    from adb_controller import ADBController
+    from device_profile import DeviceProfileStore
+    from template_matcher import TemplateMatcher
+
+    device = SimulatedDevice(Scenario.load(scenario_path))
+    with ADBServerSimulator([device]) as server, tempfile.TemporaryDirectory() as cache:
+        server.start()
+        adb = ADBController(
+            device.serial,
+            transport="socket",
+            adb_client=ADBClient(port=server.port),
+            profile_store=DeviceProfileStore(Path(cache) / "profiles.json"),
+        )
+        # 模拟画面上学到的历史位置不能写入真实设备使用的缓存文件
+        matcher = TemplateMatcher(adb, spatial_priors=False)
+        width, height = device.scenario.size
+
+        matched = 0
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            if not templates:
+                matcher.take_screenshot(force_new=True)
+                adb.tap(width // 2, height // 2)
+                continue
+            for template in templates:
+                if matcher.find_and_tap(template, threshold, force_new_screenshot=True):
+                    matched += 1
+        elapsed = time.perf_counter() - start_time
+        adb.close()
+
+    result = {
+        "iterations": iterations,
+        "seconds": elapsed,
+        "iterations_per_second": iterations / elapsed if elapsed > 0 else 0.0,
+        "matched": matched,
+        "device": dict(device.stats),
+        "final_screen": device.screen,
+        "metrics": adb.metrics.snapshot(),
+    }
+    print(
+        f"压测完成: {iterations}轮, 耗时{elapsed:.2f}秒, "
+        f"每秒{result['iterations_per_second']:.1f}轮, 匹配成功{matched}次, "
+        f"最终画面{result['final_screen']}"
+    )
+    adb.metrics.print_summary()
+    return result
+
+
+def record_screen(scenario_dir, name, device_id=DEFAULT_SERIAL):
+    """
+    从真实设备截取当前画面，保存为场景中的一个画面（区域需要手动编辑场景文件添加）
+
+    参数:
+        scenario_dir: 场景目录，场景文件为其中的scenario.json
+        name: 画面名称
+        device_id: 设备地址
+    """
+    from adb_controller import ADBController
+
+    scenario_dir = Path(scenario_dir)
+    scenario_path = scenario_dir / "scenario.json"
+    frame_path = scenario_dir / "frames" / f"{name}.png"
+    frame_path.parent.mkdir(parents=True, exist_ok=True)
+
+    adb = ADBController(device_id)
+    try:
+        image = adb.screenshot_array("png")
+    finally:
+        adb.close()
+    cv2.imwrite(str(frame_path), image)
+
+    if scenario_path.exists():
+        with open(scenario_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    else:
+        config = {"start": name, "latency": dict(DEFAULT_LATENCY), "screens": {}}
+    screen = config["screens"].setdefault(name, {"regions": []})
+    screen["image"] = f"frames/{name}.png"
+    with open(scenario_path, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+    print(f"画面 {name} 已保存到: {frame_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模拟adb设备，用于离线压测和CI")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve = subparsers.add_parser("serve", help="启动模拟adb server")
+    serve.add_argument("scenario", help="场景文件(JSON)")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=5038, help="监听端口")
+    serve.add_argument("--serial", default=DEFAULT_SERIAL, help="模拟设备序列号")
+
+    bench = subparsers.add_parser("bench", help="压测 截图->匹配->点击 循环")
+    bench.add_argument("scenario", help="场景文件(JSON)")
+    bench.add_argument("--template", "-t", action="append", default=[], help="模板图片，可多次指定")
+    bench.add_argument("--iterations", "-n", type=int, default=50)
+    bench.add_argument("--threshold", type=float, default=0.8)
+    bench.add_argument("--json", help="把结果保存为JSON文件")
+
+    record = subparsers.add_parser("record", help="从真实设备录制一个画面")
+    record.add_argument("scenario_dir", help="场景目录")
+    record.add_argument("name", help="画面名称")
+    record.add_argument("--device", default=DEFAULT_SERIAL, help="设备地址")
+
+    args = parser.parse_args()
+    if args.command == "serve":
+        device = SimulatedDevice(Scenario.load(args.scenario), args.serial)
+        with ADBServerSimulator([device], args.host, args.port) as server:
+            print(f"模拟adb server: {args.host}:{server.port}, 设备 {args.serial}")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+    elif args.command == "bench":
+        result = run_benchmark(args.scenario, args.template, args.iterations, args.threshold)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+    else:
+        record_screen(args.scenario_dir, args.name, args.device)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,257 @@
+import asyncio
+import subprocess
+import time
+
+import cv2
+import numpy as np
+
+from adb_controller import parse_raw_screencap
+
+
+class AsyncADBController:
+    """
+    ADBController的asyncio版本，提供截屏、点击、滑动和获取屏幕尺寸功能
+    所有操作都是协程，一个事件循环可以同时驱动多台设备，
+    也可以让同一台设备的截图、匹配和输入操作相互重叠
+
+    使用示例:
+        adb = AsyncADBController("127.0.0.1:16384")
+        await adb.connect()
+        await adb.tap(100, 200)
+    """
+
+    def __init__(
+        self,
+        device_id="127.0.0.1:16384",
+        adb_path="adb",
+        transport="cli",
+        server_host="127.0.0.1",
+        server_port=5037,
+    ):
+        """
+        初始化异步ADB控制器（不会立即连接，需要await connect()）
+
+        参数:
+            device_id: 设备连接地址
+            adb_path: adb可执行文件路径
+            transport: "cli" 通过asyncio子进程调用adb；"socket" 直接与adb server通信
+            server_host: adb server地址，transport为"socket"时使用
+            server_port: adb server端口，transport为"socket"时使用
+        """
+        if transport not in ("cli", "socket"):
+            raise ValueError(f"不支持的传输方式: {transport}")
+        self.device_id = device_id
+        self.adb_path = adb_path
+        self.transport = transport
+        self.server_host = server_host
+        self.server_port = server_port
+        self.last_input_time = 0
+
+    async def connect(self):
+        """
+        连接设备并检查连接状态
+
+        返回:
+            bool: 如果连接成功返回True，否则引发异常
+        """
+        try:
+            if self.transport == "socket":
+                await self._host_request(f"host:connect:{self.device_id}")
+            else:
+                await self._run([self.adb_path, "connect", self.device_id])
+
+            devices = await self._execute_command("devices")
+            connected_devices = [
+                line for line in devices.strip().split("\n")[1:] if line.strip()
+            ]
+            if not connected_devices:
+                raise ConnectionError("没有检测到ADB设备连接")
+
+            print(f"ADB远程连接成功: {connected_devices}")
+            return True
+
+        except Exception as e:
+            raise ConnectionError(f"ADB远程连接错误: {str(e)}")
+
+    async def _run(self, cmd):
+        """
+        运行adb子进程
+
+        返回:
+            bytes: 标准输出
+        """
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await process.communicate()
+        if process.returncode != 0:
+            error = subprocess.CalledProcessError(
+                process.returncode, cmd, output=stdout, stderr=stderr
+            )
+            print(f"ADB命令执行错误: {error}")
+            print(f"错误输出: {stderr.decode('utf-8', errors='replace')}")
+            raise error
+        return stdout
+
+    async def _open_socket(self):
+        reader, writer = await asyncio.open_connection(
+            self.server_host, self.server_port
+        )
+        return reader, writer
+
+    @staticmethod
+    async def _send_request(reader, writer, request):
+        """
+        发送smart-socket请求并等待OKAY
+        """
+        payload = request.encode("utf-8")
+        writer.write(b"%04x" % len(payload) + payload)
+        await writer.drain()
+        status = await reader.readexactly(4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            length = int(await reader.readexactly(4), 16)
+            message = (await reader.readexactly(length)).decode("utf-8", errors="replace")
+            raise ConnectionError(f"adb请求失败 {request}: {message}")
+        raise ConnectionError(f"adb响应无效 {request}: {status!r}")
+
+    async def _host_request(self, request):
+        reader, writer = await self._open_socket()
+        try:
+            await self._send_request(reader, writer, request)
+            length = int(await reader.readexactly(4), 16)
+            return (await reader.readexactly(length)).decode("utf-8", errors="replace")
+        finally:
+            writer.close()
+
+    async def _stream_request(self, request):
+        reader, writer = await self._open_socket()
+        try:
+            await self._send_request(
+                reader,
+                writer,
+                f"host:transport:{self.device_id}" if self.device_id else "host:transport-any",
+            )
+            await self._send_request(reader, writer, request)
+            return await reader.read()
+        finally:
+            writer.close()
+
+    async def _execute_binary(self, command):
+        """
+        执行ADB命令并以字节形式返回输出
+
+        参数:
+            command: 要执行的ADB命令（不包含adb前缀）
+
+        返回:
+            bytes: 命令的原始输出
+        """
+        if self.transport == "socket":
+            name, _, args = command.partition(" ")
+            if name == "shell":
+                return await self._stream_request(f"shell:{args}")
+            if name == "exec-out":
+                return await self._stream_request(f"exec:{args}")
+            if name == "devices":
+                output = await self._host_request("host:devices")
+                return ("List of devices attached\n" + output).encode("utf-8")
+            raise ValueError(f"socket传输不支持的命令: {command}")
+
+        cmd = [self.adb_path]
+        if self.device_id:
+            cmd.extend(["-s", self.device_id])
+        cmd.extend(command.split())
+        return await self._run(cmd)
+
+    async def _execute_command(self, command):
+        """
+        执行ADB命令
+
+        返回:
+            str: 命令执行结果
+        """
+        output = await self._execute_binary(command)
+        return output.decode("utf-8", errors="replace")
+
+    async def screenshot_array(self, fmt="raw"):
+        """
+        通过exec-out直接读取截图到内存
+
+        参数:
+            fmt: "raw" 或 "png"，含义同ADBController.screenshot_array
+
+        返回:
+            numpy.ndarray: raw格式为RGBA数组，png格式为BGR数组
+        """
+        try:
+            if fmt == "raw":
+                data = await self._execute_binary("exec-out screencap")
+                return parse_raw_screencap(data)
+            elif fmt == "png":
+                data = await self._execute_binary("exec-out screencap -p")
+                image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+                if image is None:
+                    raise ValueError("无法解码PNG截图数据")
+                return image
+            else:
+                raise ValueError(f"不支持的截图格式: {fmt}")
+        except Exception as e:
+            print(f"截图失败: {str(e)}")
+            raise
+
+    async def tap(self, x, y):
+        """
+        模拟点击指定位置
+
+        返回:
+            bool: 操作是否成功
+        """
+        try:
+            await self._execute_command(f"shell input tap {x} {y}")
+            self.last_input_time = time.time()
+            print(f"点击位置: ({x}, {y})")
+            return True
+        except Exception as e:
+            print(f"点击失败: {str(e)}")
+            return False
+
+    async def swipe(self, start_x, start_y, end_x, end_y, duration=300):
+        """
+        模拟从一个位置滑动到另一个位置，duration为毫秒
+
+        返回:
+            bool: 操作是否成功
+        """
+        try:
+            await self._execute_command(
+                f"shell input swipe {start_x} {start_y} {end_x} {end_y} {duration}"
+            )
+            self.last_input_time = time.time()
+            print(
+                f"滑动: ({start_x}, {start_y}) -> ({end_x}, {end_y}), 持续时间: {duration}ms"
+            )
+            return True
+        except Exception as e:
+            print(f"滑动失败: {str(e)}")
+            return False
+
+    async def get_screen_size(self):
+        """
+        获取屏幕尺寸
+
+        返回:
+            tuple: (宽度, 高度) 屏幕尺寸
+        """
+        try:
+            output = await self._execute_command("shell wm size")
+            if "Physical size:" in output:
+                size_part = output.split("Physical size:")[1].strip().split()[0]
+                width, height = map(int, size_part.split("x"))
+                return width, height
+            else:
+                raise ValueError("无法解析屏幕尺寸")
+        except Exception as e:
+            print(f"获取屏幕尺寸失败: {str(e)}")
+            raise
@@ -0,0 +1,217 @@
+import asyncio
+import functools
+import time
+
+import cv2
+
+from match_engines import get_engine
+from template_matcher import (
+    draw_match,
+    load_template,
+    locate_all_templates,
+    locate_template,
+    to_bgr,
+)
+
+
+class AsyncTemplateMatcher:
+    """
+    TemplateMatcher的asyncio版本
+    截图通过AsyncADBController异步获取，cv2.matchTemplate等CPU密集的操作放到线程池中执行
+    （OpenCV在计算时会释放GIL），不会阻塞事件循环
+    """
+
+    def __init__(self, adb_controller, capture_mode="raw", executor=None, engine="opencv"):
+        """
+        参数:
+            adb_controller: AsyncADBController实例
+            capture_mode: 截图方式 "raw" 或 "png"
+            executor: 执行匹配的线程池，为None时使用事件循环默认的线程池
+            engine: 匹配引擎，见TemplateMatcher
+        """
+        self.adb = adb_controller
+        self.capture_mode = capture_mode
+        self.executor = executor
+        self.engine = get_engine(engine).name
+        self.last_screenshot = None
+        self.last_screenshot_time = 0
+        self._capture_lock = asyncio.Lock()
+
+    async def _run_in_executor(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args))
+
+    async def take_screenshot(self, force_new=False):
+        """
+        获取手机屏幕截图；同时发起的多个请求共用同一次截图
+
+        参数:
+            force_new: 是否强制获取新截图，否则可能返回3秒内且晚于最近一次输入的缓存截图
+
+        返回:
+            numpy.ndarray: BGR格式的截图
+        """
+        requested_at = time.time()
+        async with self._capture_lock:
+            # 等锁期间其他协程可能已经截取了满足要求的新图
+            if self.last_screenshot is not None and (
+                (force_new and self.last_screenshot_time >= requested_at)
+                or (
+                    not force_new
+                    and requested_at - self.last_screenshot_time <= 3
+                    and self.last_screenshot_time >= self.adb.last_input_time
+                )
+            ):
+                return self.last_screenshot
+
+            captured_at = time.time()
+            image = await self.adb.screenshot_array(self.capture_mode)
+            self.last_screenshot = await self._run_in_executor(
+                to_bgr, image, self.capture_mode
+            )
+            self.last_screenshot_time = captured_at
+            return self.last_screenshot
+
+    async def _load_template_and_screenshot(self, template_path, force_new):
+        """
+        并行读取模板和截图
+        """
+        template, screenshot = await asyncio.gather(
+            self._run_in_executor(load_template, template_path),
+            self.take_screenshot(force_new=force_new),
+        )
+        if screenshot is None:
+            print("错误: 无法获取手机屏幕截图")
+        return template, screenshot
+
+    async def find_template(
+        self,
+        template_path,
+        threshold=0.8,
+        method=cv2.TM_CCOEFF_NORMED,
+        force_new_screenshot=False,
+        debug_image=None,
+        engine=None,
+    ):
+        """
+        在手机屏幕截图中查找模板图片，参数和返回值同TemplateMatcher.find_template
+
+        返回:
+            成功时返回元组 (center_x, center_y, confidence)，失败时返回 None
+        """
+        template, screenshot = await self._load_template_and_screenshot(
+            template_path, force_new_screenshot
+        )
+        if template is None or screenshot is None:
+            return None
+
+        h, w = template.shape[:2]
+        match_loc, confidence = await self._run_in_executor(
+            locate_template, screenshot, template, method, engine or self.engine
+        )
+
+        if confidence < threshold:
+            print(
+                f"未找到匹配，最高置信度: {confidence:.4f}, 阈值: {threshold}",
+                template_path,
+            )
+            return None
+
+        center_x = match_loc[0] + w // 2
+        center_y = match_loc[1] + h // 2
+
+        if debug_image:
+            await self._run_in_executor(
+                _save_debug_image,
+                screenshot,
+                [(match_loc, f"Conf: {confidence:.4f}")],
+                w,
+                h,
+                debug_image,
+            )
+
+        print(f"模板匹配成功: 中心点=({center_x}, {center_y}), 置信度={confidence:.4f}")
+        return (center_x, center_y, confidence)
+
+    async def find_and_tap(
+        self, template_path, threshold=0.8, force_new_screenshot=False, debug_image=None
+    ):
+        """
+        查找模板图片并点击其中心点
+
+        返回:
+            成功时返回 True，失败时返回 False
+        """
+        result = await self.find_template(
+            template_path,
+            threshold,
+            force_new_screenshot=force_new_screenshot,
+            debug_image=debug_image,
+        )
+
+        if result:
+            center_x, center_y, _ = result
+            return await self.adb.tap(center_x, center_y)
+        else:
+            return False
+
+    async def find_all_templates(
+        self,
+        template_path,
+        threshold=0.8,
+        method=cv2.TM_CCOEFF_NORMED,
+        max_results=10,
+        force_new_screenshot=False,
+        debug_image=None,
+        engine=None,
+    ):
+        """
+        在屏幕中查找所有匹配的模板实例，参数和返回值同TemplateMatcher.find_all_templates
+
+        返回:
+            列表 [(x1, y1, conf1), (x2, y2, conf2), ...]
+        """
+        template, screenshot = await self._load_template_and_screenshot(
+            template_path, force_new_screenshot
+        )
+        if template is None or screenshot is None:
+            return []
+
+        h, w = template.shape[:2]
+        located = await self._run_in_executor(
+            locate_all_templates,
+            screenshot,
+            template,
+            method,
+            threshold,
+            max_results,
+            engine or self.engine,
+        )
+        matches = [
+            (match_loc[0] + w // 2, match_loc[1] + h // 2, confidence)
+            for match_loc, confidence in located
+        ]
+
+        if debug_image:
+            labels = [
+                (match_loc, f"{i + 1}: {confidence:.4f}")
+                for i, (match_loc, confidence) in enumerate(located)
+            ]
+            await self._run_in_executor(
+                _save_debug_image, screenshot, labels, w, h, debug_image
+            )
+
+        if matches:
+            print(f"找到 {len(matches)} 个匹配")
+        else:
+            print("未找到匹配")
+
+        return matches
+
+
+def _save_debug_image(screenshot, labels, w, h, debug_image):
+    debug_img = screenshot.copy()
+    for match_loc, label in labels:
+        draw_match(debug_img, match_loc, w, h, label)
+    cv2.imwrite(debug_image, debug_img)
+    print(f"调试图像已保存到: {debug_image}")
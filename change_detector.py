@@ -0,0 +1,151 @@
+import threading
+
+import cv2
+import numpy as np
+
+from frame import as_frame, phash_distance
+
+# 画面比较方式
+COMPARE_METHODS = ("diff", "phash")
+
+# diff方式下缩小后的画面边长不小于该值
+MIN_SIGNATURE_SIZE = 8
+
+
+class FrameChangeDetector:
+    """
+    画面变化检测：把新截图与上一次匹配时的截图比较，画面没有变化时直接返回上一次的匹配结果，
+    不再执行模板匹配。用于战斗中每隔几秒查找一次按钮的轮询，画面基本不变时省去匹配耗时
+
+    比较方式:
+        "diff": 比较缩小后的灰度图，差值超过pixel_threshold的像素不超过max_changed个时认为没有变化（默认）；
+            按像素计数而不是取平均，整屏比较时小按钮出现也能发现
+        "phash": 比较感知哈希的汉明距离，对整体画面的变化敏感，对小面积变化不敏感，
+            只适合比较较小的区域（如模板的查找窗口）
+
+    使用示例:
+        detector = FrameChangeDetector()
+        matcher = TemplateMatcher(adb, change_detector=detector)
+        ...
+        detector.print_summary()
+    """
+
+    def __init__(self, method="diff", level=3, pixel_threshold=10, max_changed=0, max_distance=0):
+        """
+        参数:
+            method: 比较方式，"diff" 或 "phash"
+            level: diff方式下缩小的层数，每层缩小一半（3表示缩小到1/8），画面较小时自动减少
+            pixel_threshold: diff方式下缩小后像素的灰度差(0-255)超过该值时认为该像素变化
+            max_changed: diff方式下变化的像素不超过该数量时认为画面没有变化
+            max_distance: phash方式下汉明距离不超过该值时认为画面没有变化
+        """
+        if method not in COMPARE_METHODS:
+            raise ValueError(f"不支持的比较方式: {method}，可选: {', '.join(COMPARE_METHODS)}")
+        self.method = method
+        self.level = level
+        self.pixel_threshold = pixel_threshold
+        self.max_changed = max_changed
+        self.max_distance = max_distance
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.skips = 0
+
+    def signature(self, frame, region=None):
+        """
+        计算用于比较的画面特征
+
+        参数:
+            frame: Frame或BGR数组
+            region: 只比较该区域 (x, y, 宽, 高)，为None时比较整个画面
+
+        返回:
+            缩小后的灰度图(diff方式)或感知哈希(phash方式)
+        """
+        frame = as_frame(frame)
+        if region is not None:
+            frame = frame.crop(region)
+        if self.method == "phash":
+            return frame.phash
+        level = self.level
+        while level > 0 and min(frame.width, frame.height) >> level < MIN_SIGNATURE_SIZE:
+            level -= 1
+        return frame.pyramid(level, gray=True)
+
+    def same(self, first, second):
+        """
+        返回:
+            bool: 两个画面特征是否相同（画面没有变化）
+        """
+        if self.method == "phash":
+            return phash_distance(first, second) <= self.max_distance
+        if first.shape != second.shape:
+            return False
+        changed = np.count_nonzero(cv2.absdiff(first, second) > self.pixel_threshold)
+        return changed <= self.max_changed
+
+    def lookup(self, key, frame, region=None):
+        """
+        查找缓存的匹配结果
+
+        参数:
+            key: 匹配的标识，如 (模板路径, 区域, 阈值)
+            frame: 新截图
+            region: 只比较该区域
+
+        返回:
+            tuple: (画面是否没有变化, 缓存的匹配结果, 新截图的画面特征)；
+                   画面变化或没有缓存时前两项为 (False, None)，把特征传给store即可
+        """
+        signature = self.signature(frame, region)
+        with self._lock:
+            self.checks += 1
+            entry = self._entries.get(key)
+            if entry is not None and self.same(entry[0], signature):
+                self.skips += 1
+                return True, entry[1], signature
+        return False, None, signature
+
+    def store(self, key, signature, result):
+        """
+        保存匹配结果，下次画面没有变化时直接返回
+        """
+        with self._lock:
+            self._entries[key] = (signature, result)
+
+    def reset(self):
+        """
+        清空缓存的匹配结果（如执行了会改变画面的操作后）
+        """
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def skip_ratio(self):
+        """
+        返回:
+            float: 因画面没有变化而跳过匹配的比例
+        """
+        return self.skips / self.checks if self.checks else 0.0
+
+    def stats(self):
+        """
+        返回:
+            dict: 检查次数、跳过次数和跳过比例
+        """
+        with self._lock:
+            return {
+                "checks": self.checks,
+                "skips": self.skips,
+                "skip_ratio": self.skip_ratio,
+            }
+
+    def print_summary(self):
+        """
+        打印跳过比例
+        """
+        stats = self.stats()
+        print(
+            f"画面变化检测: 检查{stats['checks']}次, 画面未变化跳过匹配{stats['skips']}次, "
+            f"跳过比例{stats['skip_ratio'] * 100:.1f}%"
+        )
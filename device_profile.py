@@ -0,0 +1,156 @@
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+# 设备信息缓存文件，按设备序列号保存
+DEFAULT_PROFILE_PATH = Path(__file__).parent / ".cache" / "device_profiles.json"
+
+
+class DeviceProfile:
+    """
+    设备信息：分辨率、像素密度、屏幕方向、adb传输方式、截图格式和触摸屏参数
+    探测一次后持久化保存，避免每次启动或每次调用都重新查询设备
+    """
+
+    FIELDS = (
+        "serial",
+        "width",
+        "height",
+        "density",
+        "rotation",
+        "transport",
+        "capture_format",
+        "raw_header_size",
+        "raw_width",
+        "raw_height",
+        "bytes_per_pixel",
+        "touch_device",
+        "probed_at",
+    )
+
+    def __init__(self, serial, **fields):
+        """
+        参数:
+            serial: 设备序列号（adb使用的设备地址）
+            fields: 其余字段，见FIELDS；width/height为自然方向的物理分辨率
+        """
+        self.serial = serial
+        self.width = None
+        self.height = None
+        self.density = None
+        self.rotation = 0
+        self.transport = "cli"
+        self.capture_format = "raw"
+        self.raw_header_size = None
+        # raw截图的宽高（当前屏幕方向），用于按区域截图时计算偏移
+        self.raw_width = None
+        self.raw_height = None
+        self.bytes_per_pixel = None
+        self.touch_device = None
+        self.probed_at = time.time()
+        for name, value in fields.items():
+            if name in self.FIELDS:
+                setattr(self, name, value)
+
+    @property
+    def screen_size(self):
+        """
+        返回:
+            tuple: 自然方向的屏幕尺寸 (宽, 高)
+        """
+        return self.width, self.height
+
+    def is_stale(self, max_age):
+        return time.time() - self.probed_at > max_age
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        return cls(data.pop("serial"), **data)
+
+
+class DeviceProfileStore:
+    """
+    设备信息的磁盘缓存，JSON文件中按设备序列号保存
+    """
+
+    def __init__(self, path=DEFAULT_PROFILE_PATH, max_age=24 * 3600):
+        """
+        参数:
+            path: 缓存文件路径
+            max_age: 缓存有效期(秒)，超过后重新探测
+        """
+        self.path = Path(path)
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def _read_all(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_all(self, profiles):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再替换，避免多个进程同时写入时损坏文件
+        temp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(profiles, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+    def load(self, serial):
+        """
+        返回:
+            DeviceProfile: 未过期的缓存，没有或已过期时返回None
+        """
+        data = self._read_all().get(serial)
+        if not data:
+            return None
+        try:
+            profile = DeviceProfile.from_dict(data)
+        except (KeyError, TypeError):
+            return None
+        if profile.is_stale(self.max_age):
+            return None
+        return profile
+
+    def save(self, profile):
+        with self._lock:
+            profiles = self._read_all()
+            profiles[profile.serial] = profile.to_dict()
+            self._write_all(profiles)
+
+    def invalidate(self, serial):
+        with self._lock:
+            profiles = self._read_all()
+            if profiles.pop(serial, None) is not None:
+                self._write_all(profiles)
+
+
+def detect_rotation(adb_controller):
+    """
+    检测当前屏幕旋转方向
+
+    返回:
+        int: 0/1/2/3，对应0/90/180/270度，检测失败时返回0
+    """
+    try:
+        output = adb_controller._execute_command("shell dumpsys input")
+        match = re.search(r"SurfaceOrientation:\s*(\d)", output)
+        if match:
+            return int(match.group(1))
+        output = adb_controller._execute_command("shell dumpsys window displays")
+        match = re.search(r"mCurrentRotation=(?:ROTATION_)?(\d+)", output)
+        if match:
+            value = int(match.group(1))
+            return value // 90 if value >= 90 else value
+    except Exception as e:
+        print(f"检测屏幕方向失败，按0处理: {str(e)}")
+    return 0
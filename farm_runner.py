@@ -0,0 +1,243 @@
+import argparse
+import json
+import multiprocessing
+import os
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+# 可以在设备上运行的任务
+TASKS = ("auto_battle", "attack_night_village")
+
+# 每个任务用到的模板目录，工作进程启动时预先解码
+TASK_TEMPLATE_DIRS = {
+    "auto_battle": ("zhushijie",),
+    "attack_night_village": ("night_world", "adb_spec"),
+}
+
+# 工作进程共享的模板匹配信号量，由进程池初始化函数设置
+_match_semaphore = None
+
+
+def discover_devices(adb_path="adb"):
+    """
+    通过 adb devices 查找所有在线设备
+
+    返回:
+        list: 设备序列号列表
+    """
+    output = subprocess.run(
+        [adb_path, "devices"], capture_output=True, text=True, check=True
+    ).stdout
+    devices = []
+    for line in output.strip().split("\n")[1:]:
+        parts = line.split("\t")
+        if len(parts) == 2 and parts[1].strip() == "device":
+            devices.append(parts[0])
+    return devices
+
+
+def load_device_config(config_path):
+    """
+    读取设备配置文件，格式为设备地址列表，或 {"devices": [...]}
+
+    返回:
+        list: 设备地址列表
+    """
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    if isinstance(config, dict):
+        config = config.get("devices", [])
+    return [str(device) for device in config]
+
+
+def _init_worker(match_semaphore):
+    global _match_semaphore
+    _match_semaphore = match_semaphore
+    # 模板图片使用相对路径，统一切换到项目目录
+    os.chdir(Path(__file__).parent)
+
+
+def run_device(device_id, task, iterations=1, adb_path="adb"):
+    """
+    在工作进程中为一台设备创建独立的控制器和匹配器，并执行任务
+
+    参数:
+        device_id: 设备地址
+        task: 任务名称，见TASKS
+        iterations: 执行次数
+        adb_path: adb可执行文件路径
+
+    返回:
+        dict: 该设备的执行统计
+    """
+    from adb_controller import ADBController
+    from change_detector import FrameChangeDetector
+    from template_matcher import TemplateMatcher
+
+    adb = ADBController(device_id, adb_path)
+    matcher = TemplateMatcher(
+        adb, match_semaphore=_match_semaphore, change_detector=FrameChangeDetector()
+    )
+    matcher.preload_templates(*TASK_TEMPLATE_DIRS[task])
+
+    if task == "auto_battle":
+        import main_world_adb
+
+        main_world_adb.use_device(adb, matcher)
+
+        def run_once():
+            return main_world_adb.auto_battle(1) > 0
+
+    elif task == "attack_night_village":
+        import play_game_by_adb
+
+        def run_once():
+            return play_game_by_adb.attack_night_village(1, adb, matcher)
+
+    else:
+        raise ValueError(f"未知任务: {task}")
+
+    succeeded = 0
+    durations = []
+    start_time = time.time()
+    try:
+        for i in range(iterations):
+            iteration_start = time.time()
+            try:
+                if run_once():
+                    succeeded += 1
+            except Exception as e:
+                print(f"[{device_id}] 第 {i + 1} 次 {task} 出错: {e}")
+            durations.append(time.time() - iteration_start)
+    finally:
+        elapsed = time.time() - start_time
+        matcher.close()
+        adb.close()
+
+    return {
+        "device": device_id,
+        "task": task,
+        "iterations": iterations,
+        "succeeded": succeeded,
+        "failed": iterations - succeeded,
+        "seconds": elapsed,
+        "avg_seconds": sum(durations) / len(durations) if durations else 0.0,
+        "per_hour": succeeded * 3600 / elapsed if elapsed > 0 else 0.0,
+        "spatial_priors": matcher.spatial_priors.stats() if matcher.spatial_priors else {},
+        "change_detector": matcher.change_detector.stats(),
+        "waits": matcher.wait_stats.stats(),
+    }
+
+
+def run_farm(devices, task, iterations=1, max_matching=None, adb_path="adb"):
+    """
+    为每台设备启动一个工作进程，并行执行任务
+
+    参数:
+        devices: 设备地址列表
+        task: 任务名称，见TASKS
+        iterations: 每台设备执行的次数
+        max_matching: 所有设备同时进行模板匹配的最大数量，默认为CPU核数的一半
+        adb_path: adb可执行文件路径
+
+    返回:
+        list: 每台设备的执行统计
+    """
+    if task not in TASKS:
+        raise ValueError(f"未知任务: {task}")
+    if not devices:
+        print("没有可用的设备")
+        return []
+    if max_matching is None:
+        max_matching = max(1, (os.cpu_count() or 2) // 2)
+
+    context = multiprocessing.get_context()
+    match_semaphore = context.Semaphore(max_matching)
+    print(f"启动 {len(devices)} 台设备执行 {task}，同时匹配上限 {max_matching}")
+
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=len(devices),
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(match_semaphore,),
+    ) as executor:
+        futures = {
+            executor.submit(run_device, device, task, iterations, adb_path): device
+            for device in devices
+        }
+        for future in as_completed(futures):
+            device = futures[future]
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"[{device}] 工作进程失败: {e}")
+                results.append(
+                    {
+                        "device": device,
+                        "task": task,
+                        "iterations": iterations,
+                        "succeeded": 0,
+                        "failed": iterations,
+                        "seconds": 0.0,
+                        "avg_seconds": 0.0,
+                        "per_hour": 0.0,
+                        "error": str(e),
+                    }
+                )
+
+    results.sort(key=lambda result: devices.index(result["device"]))
+    print_summary(results)
+    return results
+
+
+def print_summary(results):
+    """
+    打印每台设备以及整体的吞吐量
+    """
+    print("\n=== 设备执行统计 ===")
+    for result in results:
+        line = (
+            f"{result['device']}: 成功 {result['succeeded']}/{result['iterations']}, "
+            f"耗时 {result['seconds']:.1f}秒, 平均每次 {result['avg_seconds']:.1f}秒, "
+            f"每小时 {result['per_hour']:.1f} 次"
+        )
+        change_stats = result.get("change_detector")
+        if change_stats and change_stats["checks"]:
+            line += f", 画面未变化跳过匹配 {change_stats['skip_ratio'] * 100:.0f}%"
+        if "error" in result:
+            line += f", 错误: {result['error']}"
+        print(line)
+
+    total_succeeded = sum(result["succeeded"] for result in results)
+    total_per_hour = sum(result["per_hour"] for result in results)
+    print(f"合计: 成功 {total_succeeded} 次, 每小时 {total_per_hour:.1f} 次")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在多台模拟器上并行运行自动化任务")
+    parser.add_argument("--task", "-t", choices=TASKS, default="auto_battle", help="任务名称")
+    parser.add_argument("--iterations", "-n", type=int, default=1, help="每台设备执行次数")
+    parser.add_argument("--devices", "-d", nargs="*", help="设备地址列表，默认从adb devices读取")
+    parser.add_argument("--config", "-c", help="设备配置文件(JSON)")
+    parser.add_argument("--max-matching", type=int, default=None, help="同时进行模板匹配的最大数量")
+    parser.add_argument("--adb-path", default="adb", help="adb可执行文件路径")
+    args = parser.parse_args()
+
+    if args.devices:
+        devices = args.devices
+    elif args.config:
+        devices = load_device_config(args.config)
+    else:
+        devices = discover_devices(args.adb_path)
+
+    results = run_farm(
+        devices, args.task, args.iterations, args.max_matching, args.adb_path
+    )
+    return 0 if results and all(r["succeeded"] == r["iterations"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,154 @@
+import cv2
+import numpy as np
+
+from frame import as_frame
+from template_store import TEMPLATE_STORE
+
+# 支持的特征检测器
+FEATURE_DETECTORS = ("orb", "akaze", "sift")
+
+# 二进制描述子的检测器在放大后的模板上检测特征，小图标也能得到足够的特征点
+BINARY_TEMPLATE_UPSCALE = 2
+
+# 模板至少要有这么多特征点，RANSAC至少要有这么多内点，否则认为无法用特征匹配
+MIN_FEATURE_MATCHES = 4
+
+# 估计出的缩放比例超出该范围时认为是错误匹配
+FEATURE_SCALE_RANGE = (0.25, 4.0)
+
+# 最近邻与次近邻的距离比低于该值的匹配才保留(Lowe ratio test)
+DEFAULT_RATIO = 0.85
+
+
+def create_detector(name="orb"):
+    """
+    创建特征检测器
+
+    参数:
+        name: "orb"（最快，缩放容忍度一般）、"akaze" 或 "sift"（最慢，缩放和旋转最稳定）
+
+    返回:
+        tuple: (检测器, 描述子的距离类型)
+    """
+    if name == "orb":
+        # 缩小边缘阈值和描述子区域，按钮等小图标边缘附近的特征点也能保留
+        detector = cv2.ORB_create(
+            nfeatures=20000, nlevels=8, edgeThreshold=15, patchSize=15, fastThreshold=10
+        )
+        return detector, cv2.NORM_HAMMING
+    if name == "akaze":
+        return cv2.AKAZE_create(threshold=0.0001), cv2.NORM_HAMMING
+    if name == "sift":
+        return cv2.SIFT_create(), cv2.NORM_L2
+    raise ValueError(f"不支持的特征检测器: {name}，可选: {', '.join(FEATURE_DETECTORS)}")
+
+
+def load_template_features(template_path, detector="orb"):
+    """
+    获取模板的特征点和描述子（经过TEMPLATE_STORE缓存，每个模板和检测器只计算一次）
+
+    参数:
+        template_path: 模板图片路径
+        detector: 特征检测器名称，见FEATURE_DETECTORS
+
+    返回:
+        list: [特征点坐标(N x 2，模板原始尺寸下的坐标), 描述子]，
+              模板无法读取或特征点太少（纯色、太小的模板）时返回None
+    """
+
+    def build(entry):
+        feature_detector, _ = create_detector(detector)
+        image = entry.gray
+        upscale = 1 if detector == "sift" else BINARY_TEMPLATE_UPSCALE
+        if upscale != 1:
+            image = cv2.resize(image, None, fx=upscale, fy=upscale, interpolation=cv2.INTER_LINEAR)
+        keypoints, descriptors = feature_detector.detectAndCompute(image, None)
+        if descriptors is None or len(keypoints) < MIN_FEATURE_MATCHES:
+            return None
+        points = np.float32([keypoint.pt for keypoint in keypoints]) / upscale
+        points.flags.writeable = False
+        descriptors.flags.writeable = False
+        return [points, descriptors]
+
+    return TEMPLATE_STORE.derived(template_path, ("features", detector), build)
+
+
+def frame_features(frame, detector="orb"):
+    """
+    获取截图的特征点和描述子，每帧每种检测器只检测一次，同一帧上的所有模板共用
+
+    参数:
+        frame: Frame或BGR数组
+        detector: 特征检测器名称
+
+    返回:
+        tuple: (特征点坐标(N x 2), 描述子)，没有特征点时描述子为None
+    """
+    frame = as_frame(frame)
+
+    def detect():
+        feature_detector, _ = create_detector(detector)
+        keypoints, descriptors = feature_detector.detectAndCompute(frame.gray, None)
+        points = np.float32([keypoint.pt for keypoint in keypoints]).reshape(-1, 2)
+        return points, descriptors
+
+    return frame.derived(("features", detector), detect)
+
+
+def locate_template_features(
+    screenshot, template, template_features, detector="orb", ratio=DEFAULT_RATIO
+):
+    """
+    用特征匹配查找模板：截图的特征点与模板的描述子做最近邻匹配，
+    用RANSAC估计相似变换（平移、缩放、旋转），再把截图中对应的区域变换回模板尺寸，
+    与模板计算归一化相关系数作为置信度，与matchTemplate的置信度含义相同
+
+    参数:
+        screenshot: 截图(Frame或BGR数组)
+        template: 模板图像(BGR)
+        template_features: load_template_features的返回值
+        detector: 特征检测器名称，与template_features使用的相同
+        ratio: Lowe ratio test的距离比
+
+    返回:
+        tuple: (匹配区域左上角坐标, 置信度, 缩放比例)；左上角坐标为按模板原始尺寸、
+               以找到的中心点为中心的位置，加上模板宽高的一半即为中心点；没找到时置信度为0
+    """
+    frame = as_frame(screenshot)
+    h, w = template.shape[:2]
+    not_found = ((0, 0), 0.0, 1.0)
+
+    frame_points, frame_descriptors = frame_features(frame, detector)
+    if frame_descriptors is None or len(frame_points) < 2:
+        return not_found
+    template_points, template_descriptors = template_features
+
+    _, norm = create_detector(detector)
+    pairs = cv2.BFMatcher(norm).knnMatch(template_descriptors, frame_descriptors, k=2)
+    good = [
+        pair[0] for pair in pairs if len(pair) == 2 and pair[0].distance < ratio * pair[1].distance
+    ]
+    if len(good) < MIN_FEATURE_MATCHES:
+        return not_found
+
+    source = template_points[[match.queryIdx for match in good]]
+    target = frame_points[[match.trainIdx for match in good]]
+    transform, inliers = cv2.estimateAffinePartial2D(
+        source, target, method=cv2.RANSAC, ransacReprojThreshold=3.0
+    )
+    if transform is None or int(inliers.sum()) < MIN_FEATURE_MATCHES:
+        return not_found
+    scale = float(np.hypot(transform[0, 0], transform[1, 0]))
+    if not FEATURE_SCALE_RANGE[0] <= scale <= FEATURE_SCALE_RANGE[1]:
+        return not_found
+
+    # 把截图中对应的区域变换回模板尺寸，与模板比较
+    template_gray = template if template.ndim == 2 else cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+    rectified = cv2.warpAffine(
+        frame.gray, transform, (w, h), flags=cv2.WARP_INVERSE_MAP | cv2.INTER_LINEAR
+    )
+    confidence = float(cv2.matchTemplate(rectified, template_gray, cv2.TM_CCOEFF_NORMED)[0, 0])
+
+    center_x, center_y = transform @ np.array([w / 2, h / 2, 1.0])
+    match_loc = (int(round(center_x)) - w // 2, int(round(center_y)) - h // 2)
+    return match_loc, confidence, scale
@@ -0,0 +1,233 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# 原始像素数据的颜色顺序和通道数 -> 转换为BGR/灰度图的cvtColor代码，None表示无需转换
+_TO_BGR = {
+    ("bgr", 3): None,
+    ("bgr", 4): cv2.COLOR_BGRA2BGR,
+    ("rgb", 3): cv2.COLOR_RGB2BGR,
+    ("rgb", 4): cv2.COLOR_RGBA2BGR,
+}
+_TO_GRAY = {
+    ("bgr", 3): cv2.COLOR_BGR2GRAY,
+    ("bgr", 4): cv2.COLOR_BGRA2GRAY,
+    ("rgb", 3): cv2.COLOR_RGB2GRAY,
+    ("rgb", 4): cv2.COLOR_RGBA2GRAY,
+}
+
+
+class Frame:
+    """
+    一帧截图：原始像素数据、截图时间和帧编号
+    BGR图、灰度图、缩小的金字塔层、积分图和感知哈希都在第一次使用时生成并缓存，
+    同一帧上的多个模板匹配、调试图像共用这些结果，每种转换只做一次
+
+    使用示例:
+        frame = matcher.take_frame()
+        result = locate_template(frame, template)
+        small = frame.pyramid(2)
+    """
+
+    def __init__(self, raw, color_order="bgr", timestamp=None, frame_id=None, offset=(0, 0)):
+        """
+        参数:
+            raw: 原始像素数据(numpy.ndarray)，灰度(二维)或3/4通道
+            color_order: 原始数据的颜色顺序，"bgr"(OpenCV/PNG解码) 或 "rgb"(raw截图/PIL)
+            timestamp: 截图开始的时间(time.time())，为None时取当前时间
+            frame_id: 帧编号，后台截图时由FrameGrabber分配
+            offset: 该帧在整屏中的左上角坐标，区域截图时不为(0, 0)
+        """
+        if color_order not in ("bgr", "rgb"):
+            raise ValueError(f"不支持的颜色顺序: {color_order}")
+        self.raw = raw
+        self.color_order = color_order
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.frame_id = frame_id
+        self.offset = tuple(offset)
+        self._cache = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_capture(cls, image, capture_mode="raw", timestamp=None):
+        """
+        由ADBController.screenshot_array的输出创建，png方式解码后为BGR，raw方式为RGB(A)
+        """
+        return cls(image, "bgr" if capture_mode == "png" else "rgb", timestamp)
+
+    @property
+    def shape(self):
+        return self.raw.shape
+
+    @property
+    def width(self):
+        return self.raw.shape[1]
+
+    @property
+    def height(self):
+        return self.raw.shape[0]
+
+    def _memo(self, key, factory):
+        with self._lock:
+            value = self._cache.get(key)
+            if value is None:
+                value = factory()
+                # 新生成的数组设为只读；原始数据属于调用方，不修改
+                if value is not self.raw:
+                    value.flags.writeable = False
+                self._cache[key] = value
+            return value
+
+    def _channels(self):
+        return 1 if self.raw.ndim == 2 else self.raw.shape[2]
+
+    @property
+    def bgr(self):
+        """
+        返回:
+            numpy.ndarray: BGR格式的图像（与其他调用方共用，不要修改）
+        """
+
+        def convert():
+            channels = self._channels()
+            if channels == 1:
+                return cv2.cvtColor(self.raw, cv2.COLOR_GRAY2BGR)
+            code = _TO_BGR[(self.color_order, channels)]
+            return self.raw if code is None else cv2.cvtColor(self.raw, code)
+
+        return self._memo("bgr", convert)
+
+    @property
+    def gray(self):
+        """
+        返回:
+            numpy.ndarray: 灰度图（与其他调用方共用，不要修改），直接由原始数据转换，不经过BGR
+        """
+
+        def convert():
+            channels = self._channels()
+            if channels == 1:
+                return self.raw
+            return cv2.cvtColor(self.raw, _TO_GRAY[(self.color_order, channels)])
+
+        return self._memo("gray", convert)
+
+    def pyramid(self, level, gray=False):
+        """
+        获取逐层缩小一半(cv2.pyrDown)后的图像
+
+        参数:
+            level: 层数，0为原图
+            gray: 是否使用灰度图
+
+        返回:
+            numpy.ndarray: 缩小后的图像（只读）
+        """
+        if level <= 0:
+            return self.gray if gray else self.bgr
+        return self._memo(
+            ("pyramid", level, gray), lambda: cv2.pyrDown(self.pyramid(level - 1, gray))
+        )
+
+    def _integrals(self):
+        with self._lock:
+            if "integral" not in self._cache:
+                integral, integral_sq = cv2.integral2(self.gray, sdepth=cv2.CV_64F)
+                integral.flags.writeable = False
+                integral_sq.flags.writeable = False
+                self._cache["integral"] = integral
+                self._cache["integral_sq"] = integral_sq
+            return self._cache["integral"], self._cache["integral_sq"]
+
+    @property
+    def integral(self):
+        """
+        返回:
+            numpy.ndarray: 灰度图的积分图，形状为(高+1, 宽+1)，用于快速计算任意矩形的像素和
+        """
+        return self._integrals()[0]
+
+    @property
+    def integral_sq(self):
+        """
+        返回:
+            numpy.ndarray: 灰度图平方的积分图，用于快速计算任意矩形的方差
+        """
+        return self._integrals()[1]
+
+    @property
+    def phash(self):
+        """
+        返回:
+            int: 64位感知哈希，画面内容相近的两帧哈希的汉明距离很小，见phash_distance
+        """
+        with self._lock:
+            if "phash" not in self._cache:
+                small = cv2.resize(self.gray, (32, 32), interpolation=cv2.INTER_AREA)
+                dct = cv2.dct(np.float32(small))[:8, :8].flatten()
+                # 不含直流分量计算中位数
+                bits = dct > np.median(dct[1:])
+                self._cache["phash"] = int("".join("1" if bit else "0" for bit in bits), 2)
+            return self._cache["phash"]
+
+    def derived(self, key, factory):
+        """
+        获取本帧的任意派生数据（如特征点），第一次使用时调用factory()生成并缓存，
+        多个线程同时请求时只生成一次
+
+        参数:
+            key: 缓存键，不要与内置的键冲突（建议使用元组，如 ("features", "orb")）
+            factory: 无参数的生成函数
+
+        返回:
+            factory()的返回值
+        """
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = factory()
+            return self._cache[key]
+
+    def crop(self, region):
+        """
+        截取一个矩形区域，返回新的Frame；已经生成的BGR图和灰度图直接裁剪，不再重新转换
+
+        参数:
+            region: (x, y, 宽, 高)，相对于本帧
+
+        返回:
+            Frame: 区域帧，offset为该区域在整屏中的位置
+        """
+        x, y, width, height = region
+        left, top = max(0, x), max(0, y)
+        right, bottom = x + width, y + height
+        cropped = Frame(
+            self.raw[top:bottom, left:right],
+            self.color_order,
+            self.timestamp,
+            self.frame_id,
+            (self.offset[0] + left, self.offset[1] + top),
+        )
+        with self._lock:
+            for key in ("bgr", "gray"):
+                if key in self._cache:
+                    cropped._cache[key] = self._cache[key][top:bottom, left:right]
+        return cropped
+
+
+def as_frame(image):
+    """
+    把BGR格式的numpy数组包装为Frame，已经是Frame时直接返回
+    """
+    if isinstance(image, Frame):
+        return image
+    return Frame(image, "bgr")
+
+
+def phash_distance(first, second):
+    """
+    返回:
+        int: 两个感知哈希(Frame.phash)的汉明距离，0-64
+    """
+    return bin(first ^ second).count("1")
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import deque
+
+
+class FrameGrabber:
+    """
+    后台截图线程
+    持续调用截图函数，把最新的几帧连同帧编号和时间戳保存在环形缓冲区中，
+    使截图与模板匹配、点击操作并行进行，调用方无需等待截图耗时
+    """
+
+    def __init__(self, capture, buffer_size=3, interval=0.0):
+        """
+        参数:
+            capture: 截图函数，无参数，返回numpy.ndarray图像
+            buffer_size: 环形缓冲区保存的帧数
+            interval: 两次截图之间的最小间隔(秒)，0表示尽可能快地截图
+        """
+        self.capture = capture
+        self.interval = interval
+        self._buffer = deque(maxlen=buffer_size)
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._next_id = 1
+        self.frame_count = 0
+        self.error_count = 0
+        self.last_capture_seconds = 0.0
+
+    def start(self):
+        """
+        启动后台截图线程
+        """
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        print("后台截图线程已启动")
+
+    def stop(self, timeout=5):
+        """
+        停止后台截图线程
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._condition:
+            self._condition.notify_all()
+        print("后台截图线程已停止")
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            started = time.time()
+            try:
+                image = self.capture()
+            except Exception as e:
+                self.error_count += 1
+                print(f"后台截图失败: {str(e)}")
+                self._stop_event.wait(1.0)
+                continue
+
+            self.last_capture_seconds = time.time() - started
+            with self._condition:
+                # 时间戳记录截图开始的时间，保证该帧内容不早于这个时间
+                self._buffer.append((self._next_id, started, image))
+                self._next_id += 1
+                self.frame_count += 1
+                self._condition.notify_all()
+
+            if self.interval > 0:
+                self._stop_event.wait(max(0.0, self.interval - (time.time() - started)))
+
+    def latest(self):
+        """
+        返回:
+            tuple: 最新一帧 (帧编号, 时间戳, 图像)，还没有截图时返回None
+        """
+        with self._condition:
+            return self._buffer[-1] if self._buffer else None
+
+    def get_frame_after(self, timestamp, timeout=5.0):
+        """
+        获取在指定时间之后才开始截取的第一帧，缓冲区中没有时等待新帧
+
+        参数:
+            timestamp: time.time()格式的时间点
+            timeout: 最长等待时间(秒)
+
+        返回:
+            tuple: (帧编号, 时间戳, 图像)，超时返回None
+        """
+        deadline = time.time() + timeout
+        with self._condition:
+            while True:
+                for frame in self._buffer:
+                    if frame[1] >= timestamp:
+                        return frame
+                remaining = deadline - time.time()
+                if remaining <= 0 or self._stop_event.is_set():
+                    return None
+                self._condition.wait(remaining)
+
+    def stats(self):
+        """
+        返回:
+            dict: 已截取帧数、失败次数和最近一次截图耗时
+        """
+        return {
+            "frames": self.frame_count,
+            "errors": self.error_count,
+            "last_capture_ms": self.last_capture_seconds * 1000,
+        }
@@ -0,0 +1,448 @@
+import hashlib
+import math
+import re
+import time
+
+from device_profile import detect_rotation
+
+# Linux input事件类型和代码（MT协议B）
+EV_SYN = 0
+EV_KEY = 1
+EV_ABS = 3
+SYN_REPORT = 0
+BTN_TOUCH = 0x14A
+ABS_MT_SLOT = 0x2F
+ABS_MT_POSITION_X = 0x35
+ABS_MT_POSITION_Y = 0x36
+ABS_MT_TRACKING_ID = 0x39
+
+# 没有常驻shell会话时，手势脚本较长（几百毫秒的缩放就有几KB）会超出adb命令行的长度限制，
+# 按内容哈希上传到该目录后执行，相同的手势只上传一次
+GESTURE_DIR = "/data/local/tmp/gestures"
+
+# 设备上保存的手势脚本超过该数量时全部删除，重新开始上传
+MAX_GESTURE_SCRIPTS = 64
+
+# 上传的手势脚本使用固定的触点追踪ID起始值，同一个手势每次编译出相同的脚本
+GESTURE_TRACKING_ID_BASE = 60000
+
+
+def _ease_in_out(t):
+    return 4 * t * t * t if t < 0.5 else 1 - (-2 * t + 2) ** 3 / 2
+
+
+# 缓动函数，输入输出都是0~1之间的进度
+EASINGS = {
+    "linear": lambda t: t,
+    "ease_in": lambda t: t * t * t,
+    "ease_out": lambda t: 1 - (1 - t) ** 3,
+    "ease_in_out": _ease_in_out,
+}
+
+
+class Pointer:
+    """
+    单个手指的轨迹：在start_ms按下，沿折线路径移动，在end_ms抬起
+    """
+
+    def __init__(self, path, start_ms, end_ms, easing="linear"):
+        if not path:
+            raise ValueError("手指轨迹至少需要一个点")
+        if easing not in EASINGS:
+            raise ValueError(f"不支持的缓动函数: {easing}")
+        self.path = [(float(x), float(y)) for x, y in path]
+        self.start_ms = start_ms
+        self.end_ms = max(end_ms, start_ms)
+        self.easing = EASINGS[easing]
+
+        # 预先计算折线的累计长度，按路程而不是按点数插值
+        self._lengths = [0.0]
+        for (x1, y1), (x2, y2) in zip(self.path, self.path[1:]):
+            self._lengths.append(self._lengths[-1] + math.hypot(x2 - x1, y2 - y1))
+
+    def position(self, t_ms):
+        """
+        返回:
+            tuple: t_ms时刻手指所在的坐标 (x, y)
+        """
+        span = self.end_ms - self.start_ms
+        progress = 1.0 if span <= 0 else (t_ms - self.start_ms) / span
+        progress = self.easing(min(max(progress, 0.0), 1.0))
+
+        total = self._lengths[-1]
+        if total == 0:
+            return self.path[0]
+
+        distance = progress * total
+        for i in range(1, len(self.path)):
+            if distance <= self._lengths[i] or i == len(self.path) - 1:
+                segment = self._lengths[i] - self._lengths[i - 1]
+                ratio = 0.0 if segment == 0 else (distance - self._lengths[i - 1]) / segment
+                (x1, y1), (x2, y2) = self.path[i - 1], self.path[i]
+                return (x1 + (x2 - x1) * ratio, y1 + (y2 - y1) * ratio)
+
+
+class Gesture:
+    """
+    多指手势：由任意数量的手指轨迹组成，预先计算出完整的时间轴
+    """
+
+    def __init__(self, frame_interval_ms=16):
+        """
+        参数:
+            frame_interval_ms: 移动事件的采样间隔(毫秒)
+        """
+        self.frame_interval_ms = frame_interval_ms
+        self.pointers = []
+
+    def add_pointer(self, path, duration_ms, start_ms=0, easing="linear"):
+        """
+        添加一个手指
+
+        参数:
+            path: 轨迹折线 [(x1, y1), (x2, y2), ...]，只有一个点时为原地按住
+            duration_ms: 按住的时长(毫秒)
+            start_ms: 相对手势开始的按下时间(毫秒)
+            easing: 缓动函数名称，见EASINGS
+
+        返回:
+            Gesture: 自身，便于链式调用
+        """
+        self.pointers.append(Pointer(path, start_ms, start_ms + duration_ms, easing))
+        return self
+
+    @property
+    def duration_ms(self):
+        return max((p.end_ms for p in self.pointers), default=0)
+
+    def compile_frames(self):
+        """
+        计算手势的时间轴
+
+        返回:
+            list: [(时间ms, [事件, ...]), ...]，事件为
+                  ("down", 手指序号, x, y)、("move", 手指序号, x, y) 或 ("up", 手指序号)
+        """
+        times = set(range(0, int(self.duration_ms) + 1, max(int(self.frame_interval_ms), 1)))
+        for pointer in self.pointers:
+            times.add(pointer.start_ms)
+            times.add(pointer.end_ms)
+
+        frames = []
+        state = {}  # 手指序号 -> 最近一次发送的整数坐标，抬起后删除
+        finished = set()
+        for t in sorted(times):
+            events = []
+            for index, pointer in enumerate(self.pointers):
+                if index in finished or t < pointer.start_ms:
+                    continue
+                x, y = pointer.position(t)
+                position = (int(round(x)), int(round(y)))
+                if index not in state:
+                    events.append(("down", index) + position)
+                elif position != state[index]:
+                    events.append(("move", index) + position)
+                state[index] = position
+                if t >= pointer.end_ms:
+                    events.append(("up", index))
+                    del state[index]
+                    finished.add(index)
+            if events:
+                frames.append((t, events))
+        return frames
+
+
+class TouchDevice:
+    """
+    设备触摸屏的input节点信息，用于把屏幕坐标换算成触摸屏坐标
+    """
+
+    def __init__(self, path, x_range, y_range, max_slots, natural_size, rotation=0):
+        """
+        参数:
+            path: input设备节点，如 /dev/input/event2
+            x_range: ABS_MT_POSITION_X 的 (最小值, 最大值)
+            y_range: ABS_MT_POSITION_Y 的 (最小值, 最大值)
+            max_slots: 支持的最大触点数
+            natural_size: 自然方向(旋转为0时)的屏幕尺寸 (宽, 高)
+            rotation: 当前屏幕旋转方向 0/1/2/3，对应0/90/180/270度
+        """
+        self.path = path
+        self.x_range = x_range
+        self.y_range = y_range
+        self.max_slots = max_slots
+        self.natural_size = natural_size
+        self.rotation = rotation
+
+    def to_touch(self, x, y):
+        """
+        将当前方向下的屏幕坐标换算成触摸屏的原始坐标
+
+        返回:
+            tuple: (触摸屏x, 触摸屏y)
+        """
+        width, height = self.natural_size
+        if self.rotation % 2:
+            width, height = height, width
+        u, v = x / width, y / height
+        # 换算到自然方向下的比例坐标
+        if self.rotation == 1:
+            u, v = 1 - v, u
+        elif self.rotation == 2:
+            u, v = 1 - u, 1 - v
+        elif self.rotation == 3:
+            u, v = v, 1 - u
+        touch_x = self.x_range[0] + u * (self.x_range[1] - self.x_range[0])
+        touch_y = self.y_range[0] + v * (self.y_range[1] - self.y_range[0])
+        return int(round(touch_x)), int(round(touch_y))
+
+
+class GestureEngine:
+    """
+    多指手势引擎
+    把手势的完整多指时间轴编译成一段sendevent脚本（Linux MT协议B），一条命令执行：
+    有常驻shell会话时直接写入会话，否则按内容哈希上传到设备后执行；
+    所有手指的事件在同一帧中同步上报，实现真正的多指缩放
+    """
+
+    def __init__(self, adb_controller, rotation=None):
+        """
+        参数:
+            adb_controller: ADBController实例
+            rotation: 屏幕旋转方向，为None时自动检测
+        """
+        self.adb = adb_controller
+        self.rotation = rotation
+        self.touch_device = None
+        self._tracking_id = 0
+        # 设备上已有的手势脚本文件名，第一次上传前从设备读取
+        self._device_scripts = None
+
+    def probe(self, force=False):
+        """
+        查找支持多点触控的input设备并读取其坐标范围（结果会缓存）
+
+        返回:
+            TouchDevice: 触摸屏信息
+        """
+        if self.touch_device is not None and not force:
+            return self.touch_device
+
+        # 触摸屏参数和屏幕信息一起缓存在设备信息中，避免每次启动都执行getevent
+        profile = self.adb.get_profile()
+        if profile.touch_device and not force:
+            cached = profile.touch_device
+            path = cached["path"]
+            x_range = tuple(cached["x_range"])
+            y_range = tuple(cached["y_range"])
+            max_slots = cached["max_slots"]
+        else:
+            output = self.adb._execute_command("shell getevent -pl")
+            device = parse_touch_device(output)
+            if device is None:
+                raise RuntimeError("未找到支持多点触控的input设备")
+            path, x_range, y_range, max_slots = device
+            profile.touch_device = {
+                "path": path,
+                "x_range": list(x_range),
+                "y_range": list(y_range),
+                "max_slots": max_slots,
+            }
+            self.adb.profile_store.save(profile)
+
+        natural_size = profile.screen_size
+        rotation = self.rotation
+        if rotation is None:
+            rotation = detect_rotation(self.adb) if force else profile.rotation
+
+        self.touch_device = TouchDevice(
+            path, x_range, y_range, max_slots, natural_size, rotation
+        )
+        print(
+            f"触摸设备: {path}, X范围{x_range}, Y范围{y_range}, 最大触点{max_slots}, 旋转{rotation}"
+        )
+        return self.touch_device
+
+    def compile(self, gesture, tracking_id=None):
+        """
+        将手势编译成设备端sendevent脚本
+
+        参数:
+            gesture: Gesture实例
+            tracking_id: 触点追踪ID的起始值，为None时接着本引擎上次使用的值；
+                需要生成内容固定的脚本（如手势宏）时指定
+
+        返回:
+            str: shell脚本
+        """
+        device = self.probe()
+        next_id = self._tracking_id if tracking_id is None else tracking_id
+
+        # 用短函数名缩短脚本长度；每条sendevent都要启动一个进程，帧之间不能固定sleep，
+        # 而是用/proc/uptime（百分之一秒）等到该帧相对开始时间的时刻，落后时不再等待，耗时不会累积
+        lines = [
+            f"e(){{ sendevent {device.path} $1 $2 $3; }}",
+            "n(){ read u _ < /proc/uptime; u=${u%.*}${u#*.}; }",
+            "w(){ n; d=$((s + $1 - u)); [ $d -gt 0 ] && sleep $((d / 100)).$((d / 10 % 10))$((d % 10)); }",
+            "n; s=$u",
+        ]
+        slots = {}  # 手指序号 -> 触点槽位
+        active = 0
+        previous_t = None
+        for t, events in gesture.compile_frames():
+            if previous_t is not None and t > previous_t:
+                lines.append(f"w {int(round(t / 10))}")
+            previous_t = t
+
+            for event in events:
+                kind, index = event[0], event[1]
+                if kind == "down":
+                    free = sorted(set(range(device.max_slots)) - set(slots.values()))
+                    if not free:
+                        raise ValueError(f"同时按下的手指超过设备支持的{device.max_slots}个触点")
+                    slots[index] = free[0]
+                    next_id += 1
+                    lines.append(f"e {EV_ABS} {ABS_MT_SLOT} {slots[index]}")
+                    lines.append(f"e {EV_ABS} {ABS_MT_TRACKING_ID} {next_id}")
+                    if active == 0:
+                        lines.append(f"e {EV_KEY} {BTN_TOUCH} 1")
+                    active += 1
+                else:
+                    lines.append(f"e {EV_ABS} {ABS_MT_SLOT} {slots[index]}")
+
+                if kind in ("down", "move"):
+                    touch_x, touch_y = device.to_touch(event[2], event[3])
+                    lines.append(f"e {EV_ABS} {ABS_MT_POSITION_X} {touch_x}")
+                    lines.append(f"e {EV_ABS} {ABS_MT_POSITION_Y} {touch_y}")
+                else:
+                    lines.append(f"e {EV_ABS} {ABS_MT_TRACKING_ID} -1")
+                    del slots[index]
+                    active -= 1
+                    if active == 0:
+                        lines.append(f"e {EV_KEY} {BTN_TOUCH} 0")
+            lines.append(f"e {EV_SYN} {SYN_REPORT} 0")
+
+        if tracking_id is None:
+            self._tracking_id = next_id
+        return "; ".join(lines)
+
+    def perform(self, gesture):
+        """
+        一条命令执行整个手势
+
+        返回:
+            bool: 操作是否成功
+        """
+        if self.adb._shell_session is not None:
+            # 常驻会话通过标准输入写入脚本，没有命令行长度限制，不需要上传
+            self.adb._execute_command(f"shell {self.compile(gesture)}")
+        else:
+            script = self.compile(gesture, GESTURE_TRACKING_ID_BASE)
+            self.adb._execute_command(f"shell sh {self._upload(script)}")
+        self.adb.last_input_time = time.time()
+        return True
+
+    def _upload(self, script):
+        """
+        按内容哈希上传手势脚本，设备上已有相同内容的脚本时不再上传
+
+        返回:
+            str: 设备端脚本路径
+        """
+        file_name = f"gesture_{hashlib.sha1(script.encode('utf-8')).hexdigest()[:12]}.sh"
+        if self._device_scripts is None:
+            self._device_scripts = set(
+                self.adb._execute_command(f"shell mkdir -p {GESTURE_DIR}; ls {GESTURE_DIR}").split()
+            )
+        if file_name not in self._device_scripts:
+            if len(self._device_scripts) >= MAX_GESTURE_SCRIPTS:
+                self.adb._execute_command(f"shell rm -f {GESTURE_DIR}/gesture_*.sh")
+                self._device_scripts.clear()
+            self.adb._push_bytes(script.encode("utf-8"), f"{GESTURE_DIR}/{file_name}")
+            self._device_scripts.add(file_name)
+        return f"{GESTURE_DIR}/{file_name}"
+
+    def pinch(
+        self,
+        center_x,
+        center_y,
+        start_distance,
+        end_distance,
+        duration=300,
+        pointers=2,
+        easing="ease_in_out",
+        angle=0,
+    ):
+        """
+        多指缩放：所有手指均匀分布在以中心点为圆心的圆上，同时沿半径方向移动
+
+        参数:
+            center_x, center_y: 缩放中心点
+            start_distance: 起始时相对两指的距离(像素)
+            end_distance: 结束时相对两指的距离(像素)
+            duration: 手势持续时间(毫秒)
+            pointers: 手指数量
+            easing: 缓动函数名称
+            angle: 第一个手指相对水平方向的角度(度)
+
+        返回:
+            bool: 操作是否成功
+        """
+        gesture = pinch_gesture(
+            center_x, center_y, start_distance, end_distance, duration, pointers, easing, angle
+        )
+        return self.perform(gesture)
+
+
+def pinch_gesture(
+    center_x,
+    center_y,
+    start_distance,
+    end_distance,
+    duration=300,
+    pointers=2,
+    easing="ease_in_out",
+    angle=0,
+):
+    """
+    构造多指缩放手势，参数同GestureEngine.pinch
+
+    返回:
+        Gesture: 手势
+    """
+    gesture = Gesture()
+    for i in range(pointers):
+        theta = math.radians(angle) + 2 * math.pi * i / pointers
+        dx, dy = math.cos(theta), math.sin(theta)
+        start = (center_x + dx * start_distance / 2, center_y + dy * start_distance / 2)
+        end = (center_x + dx * end_distance / 2, center_y + dy * end_distance / 2)
+        gesture.add_pointer([start, end], duration, easing=easing)
+    return gesture
+
+
+def parse_touch_device(output):
+    """
+    解析 getevent -pl 的输出，找到第一个支持多点触控的设备
+
+    返回:
+        tuple: (设备节点, X范围, Y范围, 最大触点数)，未找到时返回None
+    """
+    for block in re.split(r"(?=add device \d+:)", output):
+        path_match = re.search(r"add device \d+:\s*(\S+)", block)
+        if not path_match:
+            continue
+        axes = {}
+        for name, low, high in re.findall(
+            r"(ABS_MT_POSITION_X|ABS_MT_POSITION_Y|ABS_MT_SLOT)\s*:.*?min\s+(-?\d+),\s*max\s+(-?\d+)",
+            block,
+        ):
+            axes[name] = (int(low), int(high))
+        if "ABS_MT_POSITION_X" in axes and "ABS_MT_POSITION_Y" in axes:
+            max_slots = axes["ABS_MT_SLOT"][1] + 1 if "ABS_MT_SLOT" in axes else 1
+            return (
+                path_match.group(1),
+                axes["ABS_MT_POSITION_X"],
+                axes["ABS_MT_POSITION_Y"],
+                max_slots,
+            )
+    return None
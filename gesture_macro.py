@@ -0,0 +1,132 @@
+import hashlib
+import re
+
+from gesture import pinch_gesture
+
+# 设备上保存手势宏脚本的目录
+MACRO_DIR = "/data/local/tmp/macros"
+
+# 手势宏中多指手势的触点追踪ID起始值，固定的值使同一个宏每次编译出相同的脚本
+MACRO_TRACKING_ID_BASE = 50000
+
+
+class GestureMacro:
+    """
+    手势宏：一串固定的点击、滑动、等待和多指手势
+    编译成设备端脚本后按内容哈希上传一次，之后每次执行只需要一条很短的 sh 命令，
+    所有操作之间的等待都在设备端完成
+
+    脚本内容包含点击和滑动的坐标，只有坐标固定时才能重复使用已上传的脚本；
+    坐标取决于匹配结果（每次相差几个像素）时指定origin，脚本中只保存相对origin的偏移，
+    origin在执行时作为脚本参数传入。多指手势(gesture/pinch)的坐标不随origin偏移
+
+    使用示例:
+        pan = adb.macro("find_water_cart").sleep(2).swipe(500, 500, 500, 900, 200).sleep(2)
+        adb.run_macro(pan)
+
+        deploy = adb.macro("deploy_heroes", origin=(center_x, center_y))
+        deploy.tap(center_x + 120, center_y).tap(center_x, center_y - 260)
+        adb.run_macro(deploy)
+    """
+
+    def __init__(self, name, origin=None):
+        """
+        参数:
+            name: 宏名称，只能包含字母、数字、下划线和短横线，用作设备端文件名
+            origin: 点击和滑动坐标的参照点 (x, y)，为None时脚本中保存绝对坐标
+        """
+        if not re.fullmatch(r"[\w-]+", name, re.ASCII):
+            raise ValueError(f"手势宏名称只能包含字母、数字、下划线和短横线: {name}")
+        self.name = name
+        self.origin = None if origin is None else (int(origin[0]), int(origin[1]))
+        self.steps = []
+
+    def __len__(self):
+        return len(self.steps)
+
+    def _point(self, x, y):
+        # 指定了origin时写成相对脚本参数$1 $2的偏移，脚本内容与origin无关
+        if self.origin is None:
+            return f"{int(x)} {int(y)}"
+        return f"$(($1{int(x) - self.origin[0]:+d})) $(($2{int(y) - self.origin[1]:+d}))"
+
+    def arguments(self):
+        """
+        返回:
+            list: 执行脚本时传入的参数（origin的坐标），没有origin时为空
+        """
+        return [] if self.origin is None else list(self.origin)
+
+    def tap(self, x, y):
+        """
+        添加点击操作
+        """
+        self.steps.append(("command", f"input tap {self._point(x, y)}"))
+        return self
+
+    def swipe(self, start_x, start_y, end_x, end_y, duration=300):
+        """
+        添加滑动操作，duration为毫秒
+        """
+        self.steps.append(
+            (
+                "command",
+                f"input swipe {self._point(start_x, start_y)} {self._point(end_x, end_y)} "
+                f"{int(duration)}",
+            )
+        )
+        return self
+
+    def sleep(self, seconds):
+        """
+        添加设备端等待
+        """
+        if seconds > 0:
+            self.steps.append(("command", f"sleep {seconds:.3f}"))
+        return self
+
+    def gesture(self, gesture):
+        """
+        添加多指手势（gesture.Gesture），通过sendevent注入，需要设备支持多点触控
+        """
+        self.steps.append(("gesture", gesture))
+        return self
+
+    def pinch(self, center_x, center_y, start_distance, end_distance, duration=300, **kwargs):
+        """
+        添加多指缩放手势，参数同GestureEngine.pinch
+        """
+        return self.gesture(
+            pinch_gesture(center_x, center_y, start_distance, end_distance, duration, **kwargs)
+        )
+
+    def compile(self, gesture_engine=None):
+        """
+        编译成设备端shell脚本，内容只取决于宏的步骤和触摸设备
+
+        参数:
+            gesture_engine: GestureEngine实例，宏中包含多指手势时必须提供
+
+        返回:
+            str: 脚本内容
+        """
+        lines = []
+        tracking_id = MACRO_TRACKING_ID_BASE
+        for kind, value in self.steps:
+            if kind == "command":
+                lines.append(value)
+                continue
+            if gesture_engine is None:
+                raise ValueError(f"手势宏 {self.name} 包含多指手势，需要提供GestureEngine")
+            lines.append(gesture_engine.compile(value, tracking_id))
+            tracking_id += len(value.pointers)
+        return "\n".join(lines) + "\n"
+
+
+def macro_remote_path(name, script):
+    """
+    返回:
+        str: 设备端脚本路径，文件名包含内容哈希，内容变化时使用新文件
+    """
+    digest = hashlib.sha1(script.encode("utf-8")).hexdigest()[:12]
+    return f"{MACRO_DIR}/{name}_{digest}.sh"
@@ -2,8 +2,339 @@ import cv2
 import numpy as np
 import pyautogui
 import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+from frame import Frame, as_frame
+from match_engines import MATCH_ENGINES, get_engine
+from nms import find_peaks
+from scale_calibration import ScaleCalibration
+from template_store import TEMPLATE_STORE
+
+
+# 某个缩放比例的匹配度达到该值时，认为已经找到目标，不再尝试其余比例
+CERTAIN_MATCH = 0.95
+
+# 默认的缩放比例校准结果，查找函数的calibration参数为None时使用
+SCALE_CALIBRATION = ScaleCalibration()
+
+
+def scale_grid(scale_range=(0.5, 1.5), scale_step=0.05):
+    """
+    生成缩放比例列表，包含两端（按步数计算，避免浮点累加误差丢掉最后一个比例）
+
+    返回:
+        tuple: 从小到大的缩放比例
+    """
+    low, high = scale_range
+    if scale_step <= 0 or high < low:
+        return (round(low, 4),)
+    count = int((high - low) / scale_step + 1e-6) + 1
+    return tuple(round(low + i * scale_step, 4) for i in range(count))
+
+
+def get_scaled_templates(template_path, scale_range=(0.5, 1.5), scale_step=0.05):
+    """
+    获取模板在各缩放比例下的灰度图，每个模板和缩放参数只生成一次，
+    缓存在TEMPLATE_STORE中，模板文件修改后自动重新生成
+
+    参数:
+        template_path: 模板图像路径
+        scale_range: 缩放范围的元组 (最小缩放, 最大缩放)
+        scale_step: 缩放步长
+
+    返回:
+        list: [(缩放比例, 缩放后的灰度模板), ...]，按与原始尺寸的接近程度排序
+              （1.0附近的比例排在前面，便于提前结束），模板无法读取时返回None
+    """
+    grid = scale_grid(scale_range, scale_step)
+    # 先取一次灰度图，使其计入缓存占用
+    if TEMPLATE_STORE.gray(template_path) is None:
+        return None
+
+    def build(entry):
+        scaled_templates = []
+        for scale in sorted(grid, key=lambda value: (abs(value - 1.0), value)):
+            if scale == 1.0:
+                scaled = entry.gray
+            else:
+                scaled = cv2.resize(
+                    entry.gray,
+                    None,
+                    fx=scale,
+                    fy=scale,
+                    interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR,
+                )
+                scaled.flags.writeable = False
+            if scaled.shape[0] > 0 and scaled.shape[1] > 0:
+                scaled_templates.append((scale, scaled))
+        return scaled_templates
+
+    return TEMPLATE_STORE.derived(template_path, ("scales", grid), build)
+
+
+def match_scales(screenshot, scaled_templates, certain=CERTAIN_MATCH, engine=None):
+    """
+    依次用各缩放比例的模板匹配截图，记录匹配度最高的比例
+
+    参数:
+        screenshot: 截图(Frame)或灰度截图；传入Frame时各比例、各模板共用引擎在截图上的计算结果
+        scaled_templates: get_scaled_templates的返回值
+        certain: 匹配度达到该值时提前结束，为None时尝试全部比例
+        engine: 匹配引擎名称(见match_engines)，为None时使用cv2.matchTemplate
+
+    返回:
+        dict: value(匹配度)、location(左上角)、scale、size(模板高, 宽)、
+              result(匹配结果矩阵)、tried(尝试的比例数)；所有模板都比截图大时返回None
+    """
+    frame = as_frame(screenshot)
+    screen_h, screen_w = frame.height, frame.width
+    engine = get_engine(engine)
+    best = None
+    tried = 0
+
+    for scale, scaled_template in scaled_templates:
+        template_h, template_w = scaled_template.shape
+        # 模板比截图大时无法匹配
+        if template_h > screen_h or template_w > screen_w:
+            continue
+
+        tried += 1
+        result = engine.score_map(frame, scaled_template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+
+        # 如果找到更好的匹配
+        if best is None or max_val > best["value"]:
+            best = {
+                "value": max_val,
+                "location": max_loc,
+                "scale": scale,
+                "size": (template_h, template_w),
+                "result": result,
+            }
+
+        if certain is not None and max_val >= certain:
+            break
+
+    if best is not None:
+        best["tried"] = tried
+    return best
+
+
+def match_calibrated(
+    screenshot,
+    template_path,
+    scaled_templates,
+    threshold,
+    certain=CERTAIN_MATCH,
+    calibration=None,
+    engine=None,
+):
+    """
+    按校准的缩放比例匹配：已校准时只尝试校准比例及相邻的两个比例，
+    还没有校准或需要重新校准时尝试全部比例，并把找到的比例记录为校准结果
+
+    参数:
+        screenshot: 截图(Frame)或灰度截图
+        template_path: 模板图像路径
+        scaled_templates: get_scaled_templates的返回值
+        threshold: 匹配阈值
+        certain: 匹配度达到该值时不再尝试其余比例
+        calibration: 缩放比例校准(ScaleCalibration)，为None时使用SCALE_CALIBRATION，为False时尝试全部比例
+        engine: 匹配引擎名称，见match_scales
+
+    返回:
+        dict: 与match_scales相同
+    """
+    calibration = SCALE_CALIBRATION if calibration is None else calibration or None
+    if calibration is None:
+        return match_scales(screenshot, scaled_templates, certain, engine)
+
+    frame = as_frame(screenshot)
+    resolution = (frame.width, frame.height)
+    grid = sorted(scale for scale, _ in scaled_templates)
+    candidates = calibration.candidates(template_path, resolution, grid)
+    if candidates is not None:
+        nearby = [item for item in scaled_templates if item[0] in candidates]
+        best = match_scales(frame, nearby, certain, engine)
+        if not calibration.observe(template_path, resolution, best, threshold):
+            return best
+        print(f"校准比例附近多次未找到，重新尝试全部缩放比例: {template_path}")
+
+    calibration.count_full()
+    best = match_scales(frame, scaled_templates, certain, engine)
+    if best is not None and best["value"] >= threshold:
+        calibration.record(template_path, resolution, best["scale"], best["value"])
+    return best
+
+
+def calibrate_scales(
+    template_paths,
+    frames=3,
+    interval=0.5,
+    threshold=0.8,
+    scale_range=(0.5, 1.5),
+    scale_step=0.05,
+    calibration=None,
+    engine=None,
+):
+    """
+    校准缩放比例：截取几帧屏幕，对每个模板尝试全部缩放比例，
+    把各帧中匹配度最高的比例记录为该模板在当前分辨率下的比例
+
+    参数:
+        template_paths: 模板图像路径列表（应为当前画面上能看到的模板）
+        frames: 截取的帧数
+        interval: 两帧之间的间隔(秒)
+        threshold: 匹配度低于该值的模板不记录
+        scale_range: 缩放范围的元组 (最小缩放, 最大缩放)
+        scale_step: 缩放步长
+        calibration: 缩放比例校准(ScaleCalibration)，为None时使用SCALE_CALIBRATION
+        engine: 匹配引擎名称(见match_engines)，为None时使用cv2.matchTemplate
+
+    返回:
+        dict: {模板路径: (缩放比例, 匹配度)}，只包含找到的模板
+    """
+    calibration = calibration or SCALE_CALIBRATION
+    found = {}
+    resolution = None
+    for index in range(frames):
+        if index:
+            time.sleep(interval)
+        frame = grab_screen_frame()
+        resolution = (frame.width, frame.height)
+        for template_path in template_paths:
+            scaled_templates = get_scaled_templates(template_path, scale_range, scale_step)
+            if scaled_templates is None:
+                print(f"错误：无法读取模板图像 {template_path}")
+                continue
+            best = match_scales(frame, scaled_templates, certain=None, engine=engine)
+            if best is None or best["value"] < threshold:
+                continue
+            if template_path not in found or best["value"] > found[template_path][1]:
+                found[template_path] = (best["scale"], best["value"])
+
+    for template_path, (scale, value) in found.items():
+        calibration.record(template_path, resolution, scale, value)
+        print(f"校准: {template_path} 缩放比例 {scale:.2f}, 匹配度 {value:.4f}")
+    if resolution is not None and found:
+        print(
+            f"分辨率 {calibration.resolution_key(resolution)} 的缩放比例: "
+            f"{calibration.display_scale(resolution):.2f} ({len(found)}/{len(template_paths)} 个模板)"
+        )
+    else:
+        print("没有找到任何模板，未校准")
+    return found
+
+
+def grab_screen_frame():
+    """
+    截取整个屏幕，灰度图和BGR图在第一次使用时转换并缓存
+
+    返回:
+        Frame: 截图
+    """
+    captured_at = time.time()
+    screenshot = pyautogui.screenshot()
+    # PIL图像为RGB顺序
+    return Frame(np.array(screenshot), "rgb", captured_at)
+
+
+# find_images_in_screenshot使用的线程池，第一次使用时创建
+_match_executor = None
+
+
+def _get_match_executor():
+    global _match_executor
+    if _match_executor is None:
+        _match_executor = ThreadPoolExecutor(
+            max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="image-match"
+        )
+    return _match_executor
+
+
+def find_images_in_screenshot(
+    template_paths,
+    threshold=0.8,
+    scale_range=(0.5, 1.5),
+    scale_step=0.05,
+    certain=CERTAIN_MATCH,
+    mode="all",
+    frame=None,
+    calibration=None,
+    engine=None,
+):
+    """
+    只截一次屏，用线程池并行查找多个模板图像（matchTemplate执行时会释放GIL）
+
+    参数:
+        template_paths: 模板图像路径列表
+        threshold: 匹配阈值，0-1之间，值越高要求匹配度越高
+        scale_range: 缩放范围的元组 (最小缩放, 最大缩放)
+        scale_step: 缩放步长
+        certain: 某个缩放比例的匹配度达到该值时不再尝试其余比例
+        mode: "all" 查找全部模板；"first" 任意一个模板找到后立即返回；"best" 只保留匹配度最高的一个
+        frame: 已有的截图(Frame)，为None时截取屏幕
+        calibration: 缩放比例校准(ScaleCalibration)，为None时使用SCALE_CALIBRATION，为False时每次尝试全部比例
+        engine: 匹配引擎名称(见match_engines)，为None时使用cv2.matchTemplate
+
+    返回:
+        dict: {模板路径: 匹配位置的中心点坐标 (x, y)}，未找到、未查找或未被选中的模板为None
+    """
+    if mode not in ("all", "first", "best"):
+        raise ValueError(f"不支持的查找方式: {mode}")
+    template_paths = list(template_paths)
+    frame = frame if frame is not None else grab_screen_frame()
+
+    def find_one(template_path):
+        scaled_templates = get_scaled_templates(template_path, scale_range, scale_step)
+        if scaled_templates is None:
+            print(f"错误：无法读取模板图像 {template_path}")
+            return None
+        best = match_calibrated(
+            frame, template_path, scaled_templates, threshold, certain, calibration, engine
+        )
+        if best is None or best["value"] < threshold:
+            return None
+        template_h, template_w = best["size"]
+        center_x = best["location"][0] + template_w // 2
+        center_y = best["location"][1] + template_h // 2
+        return center_x, center_y, best["value"], best["scale"]
+
+    found = {}
+    futures = {
+        _get_match_executor().submit(find_one, template_path): template_path
+        for template_path in template_paths
+    }
+    try:
+        for future in as_completed(futures):
+            match = future.result()
+            if match is not None:
+                found[futures[future]] = match
+                if mode == "first":
+                    break
+    finally:
+        # first方式下取消还没开始的匹配
+        for future in futures:
+            future.cancel()
+
+    if mode == "best" and found:
+        best_path = max(found, key=lambda path: found[path][2])
+        found = {best_path: found[best_path]}
+
+    results = {template_path: None for template_path in template_paths}
+    for template_path, (center_x, center_y, match_val, scale) in found.items():
+        results[template_path] = (center_x, center_y)
+        print(
+            f"找到匹配! {template_path} 位置: ({center_x}, {center_y}), "
+            f"匹配度: {match_val:.4f}, 缩放比例: {scale:.2f}"
+        )
+    if not found:
+        print(f"{len(template_paths)} 个模板均未找到匹配")
+    return results
+
 
 def match_image(
     template_path,
@@ -14,6 +345,10 @@ def match_image(
     max_results=10,
     save_debug=True,
     debug_path="./tmp_img_save_folder/debug_match.png",
+    certain=CERTAIN_MATCH,
+    change_detector=None,
+    calibration=None,
+    engine=None,
 ):
     """
     简易包装函数，在屏幕中查找指定图像，并可选择保存调试图像
@@ -27,6 +362,10 @@ def match_image(
         max_results: 查找所有匹配时的最大结果数量
         save_debug: 是否保存调试图像
         debug_path: 调试图像保存路径
+        certain: 某个缩放比例的匹配度达到该值时不再尝试其余比例，为None时尝试全部比例
+        change_detector: 画面变化检测(FrameChangeDetector)，查找单个匹配时画面与上次相同则直接返回上次的结果
+        calibration: 缩放比例校准(ScaleCalibration)，为None时使用SCALE_CALIBRATION，为False时每次尝试全部比例
+        engine: 匹配引擎名称(见match_engines)，为None时使用cv2.matchTemplate
 
     返回:
         如果 find_all=False: 返回匹配位置的中心点坐标 (x, y) 或 None（未找到匹配）
@@ -38,6 +377,9 @@ def match_image(
         print(f"错误：找不到模板图像 {template_path}")
         return [] if find_all else None
 
+    # 查找和调试图像共用同一张截图
+    frame = grab_screen_frame()
+
     # 根据参数选择查找单个匹配或所有匹配
     if find_all:
         matches = find_all_matches(
@@ -46,6 +388,10 @@ def match_image(
             scale_range=scale_range,
             scale_step=scale_step,
             max_results=max_results,
+            certain=certain,
+            frame=frame,
+            calibration=calibration,
+            engine=engine,
         )
         result = matches
     else:
@@ -54,19 +400,32 @@ def match_image(
             threshold=threshold,
             scale_range=scale_range,
             scale_step=scale_step,
+            certain=certain,
+            frame=frame,
+            change_detector=change_detector,
+            calibration=calibration,
+            engine=engine,
         )
         result = match
         matches = [match] if match else []
 
     # 如果启用调试模式，保存调试图像
     if save_debug and matches:
-        save_debug_image(template_path, matches, debug_path)
+        save_debug_image(template_path, matches, debug_path, frame=frame)
 
     return result
 
 
 def find_image_in_screenshot(
-    template_path, threshold=0.8, scale_range=(0.5, 1.5), scale_step=0.05
+    template_path,
+    threshold=0.8,
+    scale_range=(0.5, 1.5),
+    scale_step=0.05,
+    certain=CERTAIN_MATCH,
+    frame=None,
+    change_detector=None,
+    calibration=None,
+    engine=None,
 ):
     """
     在屏幕截图中查找模板图像，支持不同缩放比例
@@ -76,78 +435,58 @@ def find_image_in_screenshot(
         threshold: 匹配阈值，0-1之间，值越高要求匹配度越高
         scale_range: 缩放范围的元组 (最小缩放, 最大缩放)
         scale_step: 缩放步长
+        certain: 某个缩放比例的匹配度达到该值时不再尝试其余比例，为None时尝试全部比例
+        frame: 已有的截图(Frame)，为None时截取屏幕
+        change_detector: 画面变化检测(FrameChangeDetector)，画面与上次匹配时相同则直接使用上次的结果，
+            为None时每次都匹配
+        calibration: 缩放比例校准(ScaleCalibration)，为None时使用SCALE_CALIBRATION，为False时每次尝试全部比例
+        engine: 匹配引擎名称(见match_engines)，为None时使用cv2.matchTemplate
 
     返回:
         如果找到匹配，返回匹配位置的中心点坐标 (x, y)
         如果未找到匹配，返回 None
     """
-    # 读取模板图像
-    template = cv2.imread(str(template_path))
-    if template is None:
+    # 读取各缩放比例的灰度模板（经过缓存，每个模板和缩放参数只生成一次）
+    scaled_templates = get_scaled_templates(template_path, scale_range, scale_step)
+    if scaled_templates is None:
         print(f"错误：无法读取模板图像 {template_path}")
         return None
 
-    # 将模板转换为灰度图
-    template_gray = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
-
     # 获取屏幕截图
-    screenshot = pyautogui.screenshot()
-    # 将PIL图像转换为OpenCV格式
-    screenshot = np.array(screenshot)
-    screenshot = cv2.cvtColor(screenshot, cv2.COLOR_RGB2BGR)
-    # 转换为灰度图
-    screenshot_gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
-
-    best_match_val = -1
-    best_match_loc = None
-    best_scale = 1.0
-
-    # 尝试不同的缩放比例
-    current_scale = scale_range[0]
-    while current_scale <= scale_range[1]:
-        # 缩放模板
-        scaled_template = cv2.resize(
-            template_gray,
-            None,
-            fx=current_scale,
-            fy=current_scale,
-            interpolation=cv2.INTER_AREA if current_scale < 1 else cv2.INTER_LINEAR,
-        )
+    frame = frame if frame is not None else grab_screen_frame()
 
-        template_h, template_w = scaled_template.shape
-
-        # 执行模板匹配
-        result = cv2.matchTemplate(
-            screenshot_gray, scaled_template, cv2.TM_CCOEFF_NORMED
+    def match():
+        return match_calibrated(
+            frame, template_path, scaled_templates, threshold, certain, calibration, engine
         )
 
-        # 查找最佳匹配位置
-        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-
-        # 如果找到更好的匹配
-        if max_val > best_match_val:
-            best_match_val = max_val
-            best_match_loc = max_loc
-            best_scale = current_scale
-
-        current_scale += scale_step
+    if change_detector is None:
+        best = match()
+    else:
+        key = (str(template_path), scale_range, scale_step, certain, get_engine(engine).name)
+        unchanged, best, signature = change_detector.lookup(key, frame)
+        if not unchanged:
+            best = match()
+            # 不保存整张得分图
+            cached = None if best is None else {k: v for k, v in best.items() if k != "result"}
+            change_detector.store(key, signature, cached)
 
     # 如果最佳匹配值超过阈值，则认为找到了匹配
-    if best_match_val >= threshold:
-        # 计算缩放后模板的尺寸
-        scaled_template_h = int(template_gray.shape[0] * best_scale)
-        scaled_template_w = int(template_gray.shape[1] * best_scale)
+    if best is not None and best["value"] >= threshold:
+        template_h, template_w = best["size"]
 
         # 计算匹配区域的中心点
-        center_x = best_match_loc[0] + scaled_template_w // 2
-        center_y = best_match_loc[1] + scaled_template_h // 2
+        center_x = best["location"][0] + template_w // 2
+        center_y = best["location"][1] + template_h // 2
 
         print(
-            f"找到匹配! 位置: ({center_x}, {center_y}), 匹配度: {best_match_val:.4f}, 缩放比例: {best_scale:.2f}"
+            f"找到匹配! 位置: ({center_x}, {center_y}), 匹配度: {best['value']:.4f}, "
+            f"缩放比例: {best['scale']:.2f}, 尝试比例: {best['tried']}/{len(scaled_templates)}"
         )
         return (center_x, center_y)
     else:
-        print(f"未找到匹配。最佳匹配度: {best_match_val:.4f}, 阈值: {threshold}")
+        best_val = best["value"] if best is not None else -1
+        print(f"未找到匹配。最佳匹配度: {best_val:.4f}, 阈值: {threshold}")
         return None
 
 
@@ -157,6 +496,10 @@ def find_all_matches(
     scale_range=(0.5, 1.5),
     scale_step=0.05,
     max_results=10,
+    certain=CERTAIN_MATCH,
+    frame=None,
+    calibration=None,
+    engine=None,
 ):
     """
     在屏幕截图中查找所有匹配模板图像的位置，支持不同缩放比例
@@ -167,105 +510,47 @@ def find_all_matches(
         scale_range: 缩放范围的元组 (最小缩放, 最大缩放)
         scale_step: 缩放步长
         max_results: 最大返回结果数
+        certain: 某个缩放比例的匹配度达到该值时不再尝试其余比例，为None时尝试全部比例
+        frame: 已有的截图(Frame)，为None时截取屏幕
+        calibration: 缩放比例校准(ScaleCalibration)，为None时使用SCALE_CALIBRATION，为False时每次尝试全部比例
+        engine: 匹配引擎名称(见match_engines)，为None时使用cv2.matchTemplate
 
     返回:
         匹配位置的中心点坐标列表 [(x1, y1), (x2, y2), ...]
     """
-    # 读取模板图像
-    template = cv2.imread(str(template_path))
-    if template is None:
+    # 读取各缩放比例的灰度模板（经过缓存，每个模板和缩放参数只生成一次）
+    scaled_templates = get_scaled_templates(template_path, scale_range, scale_step)
+    if scaled_templates is None:
         print(f"错误：无法读取模板图像 {template_path}")
         return []
 
-    # 将模板转换为灰度图
-    template_gray = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
-
     # 获取屏幕截图
-    screenshot = pyautogui.screenshot()
-    # 将PIL图像转换为OpenCV格式
-    screenshot = np.array(screenshot)
-    screenshot = cv2.cvtColor(screenshot, cv2.COLOR_RGB2BGR)
-    # 转换为灰度图
-    screenshot_gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
-
-    all_matches = []
-    best_scale = 1.0
-    best_result = None
-
-    # 尝试不同的缩放比例，找出最佳缩放比例
-    current_scale = scale_range[0]
-    while current_scale <= scale_range[1]:
-        # 缩放模板
-        scaled_template = cv2.resize(
-            template_gray,
-            None,
-            fx=current_scale,
-            fy=current_scale,
-            interpolation=cv2.INTER_AREA if current_scale < 1 else cv2.INTER_LINEAR,
-        )
-
-        # 执行模板匹配
-        result = cv2.matchTemplate(
-            screenshot_gray, scaled_template, cv2.TM_CCOEFF_NORMED
-        )
-
-        # 查找最大值
-        _, max_val, _, _ = cv2.minMaxLoc(result)
+    frame = frame if frame is not None else grab_screen_frame()
 
-        # 如果这个缩放比例下有更好的匹配
-        if max_val >= threshold and (
-            best_result is None or max_val > np.max(best_result)
-        ):
-            best_result = result
-            best_scale = current_scale
-
-        current_scale += scale_step
+    # 尝试不同的缩放比例（已校准时只尝试校准比例附近），找出最佳缩放比例
+    best = match_calibrated(
+        frame, template_path, scaled_templates, threshold, certain, calibration, engine
+    )
 
     # 如果找不到任何匹配
-    if best_result is None:
+    if best is None or best["value"] < threshold:
         print("未找到任何匹配")
         return []
 
-    # 计算缩放后模板的尺寸
-    scaled_template_h = int(template_gray.shape[0] * best_scale)
-    scaled_template_w = int(template_gray.shape[1] * best_scale)
-
-    # 在最佳缩放比例下找出所有匹配位置
-    match_indices = np.where(best_result >= threshold)
-
-    # 将匹配位置转换为列表
-    match_positions = list(zip(match_indices[1], match_indices[0]))
-
-    # 过滤重叠匹配 (使用非极大值抑制)
-    filtered_matches = []
-    match_positions.sort(key=lambda pos: best_result[pos[1], pos[0]], reverse=True)
-
-    for match_pos in match_positions:
-        # 检查是否与已有匹配重叠
-        overlap = False
-        for existing_match in filtered_matches:
-            # 计算两个匹配框中心点之间的距离
-            dist = np.sqrt(
-                (match_pos[0] - existing_match[0]) ** 2
-                + (match_pos[1] - existing_match[1]) ** 2
-            )
-            # 如果距离小于模板尺寸的一半，则视为重叠
-            if dist < (scaled_template_w + scaled_template_h) / 4:
-                overlap = True
-                break
-
-        if not overlap:
-            filtered_matches.append(match_pos)
-            # 限制最大结果数
-            if len(filtered_matches) >= max_results:
-                break
+    best_result = best["result"]
+    best_scale = best["scale"]
+    scaled_template_h, scaled_template_w = best["size"]
+
+    # 在最佳缩放比例下找出所有匹配位置，并过滤重叠匹配 (使用非极大值抑制)
+    filtered_matches = find_peaks(
+        best_result, threshold, (scaled_template_w, scaled_template_h), max_results
+    )
 
     # 计算中心点坐标
     center_points = []
-    for match_pos in filtered_matches:
+    for match_pos, match_val in filtered_matches:
         center_x = match_pos[0] + scaled_template_w // 2
         center_y = match_pos[1] + scaled_template_h // 2
-        match_val = best_result[match_pos[1], match_pos[0]]
         center_points.append((center_x, center_y))
         print(
             f"找到匹配! 位置: ({center_x}, {center_y}), 匹配度: {match_val:.4f}, 缩放比例: {best_scale:.2f}"
@@ -274,7 +559,12 @@ def find_all_matches(
     return center_points
 
 
-def save_debug_image(template_path, matches=None, output_path="./tmp_img_save_folder/debug_match.png"):
+def save_debug_image(
+    template_path,
+    matches=None,
+    output_path="./tmp_img_save_folder/debug_match.png",
+    frame=None,
+):
     """
     保存带有匹配结果标记的截图，用于调试
 
@@ -282,28 +572,27 @@ def save_debug_image(template_path, matches=None, output_path="./tmp_img_save_fo
         template_path: 模板图像路径
         matches: 匹配位置列表 [(x1, y1), ...]，如果为None则重新进行匹配
         output_path: 输出图像路径
+        frame: 查找时使用的截图(Frame)，为None时重新截取屏幕
     """
+    frame = frame if frame is not None else grab_screen_frame()
+
     # 如果未提供匹配结果，则重新进行匹配
     if matches is None:
-        matches = find_all_matches(template_path)
+        matches = find_all_matches(template_path, frame=frame)
         if not matches:
             print("未找到匹配，无法生成调试图像")
             return
 
     # 读取模板图像获取尺寸
-    template = cv2.imread(str(template_path))
+    template = TEMPLATE_STORE.color(template_path)
     if template is None:
         print(f"错误：无法读取模板图像 {template_path}")
         return
 
     template_h, template_w = template.shape[:2]
 
-    # 获取屏幕截图
-    screenshot = pyautogui.screenshot()
-    screenshot = np.array(screenshot)
-    screenshot = cv2.cvtColor(screenshot, cv2.COLOR_RGB2BGR)
-
-    # 在截图上标记匹配位置
+    # 在截图副本上标记匹配位置，不修改共用的BGR图
+    screenshot = frame.bgr.copy()
     for center_x, center_y in matches:
         # 计算矩形左上角
         left = center_x - template_w // 2
@@ -342,7 +631,28 @@ def main():
     parser.add_argument("--min-scale", type=float, default=0.5, help="最小缩放比例")
     parser.add_argument("--max-scale", type=float, default=1.5, help="最大缩放比例")
     parser.add_argument("--scale-step", type=float, default=0.05, help="缩放步长")
+    parser.add_argument(
+        "--certain",
+        type=float,
+        default=CERTAIN_MATCH,
+        help="匹配度达到该值时不再尝试其余缩放比例 (大于1表示尝试全部比例)",
+    )
     parser.add_argument("--all", "-a", action="store_true", help="查找所有匹配")
+    parser.add_argument(
+        "--calibrate",
+        action="store_true",
+        help="校准缩放比例：template可以是模板目录，用当前屏幕上能找到的模板记录缩放比例",
+    )
+    parser.add_argument("--frames", type=int, default=3, help="校准时截取的帧数")
+    parser.add_argument(
+        "--no-calibration", action="store_true", help="不使用校准的缩放比例，每次尝试全部比例"
+    )
+    parser.add_argument(
+        "--engine",
+        choices=sorted(MATCH_ENGINES),
+        default=None,
+        help="匹配引擎 (默认opencv，auto按模板尺寸计时选择最快的引擎)",
+    )
     parser.add_argument("--max-results", type=int, default=10, help="最大结果数量")
     parser.add_argument("--debug", "-d", action="store_true", help="保存调试图像")
     parser.add_argument(
@@ -357,6 +667,22 @@ def main():
         print(f"错误：找不到模板图像 {template_path}")
         return 1
 
+    if args.calibrate:
+        if template_path.is_dir():
+            template_paths = sorted(template_path.glob("*.png"))
+        else:
+            template_paths = [template_path]
+        found = calibrate_scales(
+            template_paths,
+            frames=args.frames,
+            threshold=args.threshold,
+            scale_range=(args.min_scale, args.max_scale),
+            scale_step=args.scale_step,
+            engine=args.engine,
+        )
+        return 0 if found else 1
+    calibration = False if args.no_calibration else None
+
     # 根据参数选择查找单个匹配或所有匹配
     if args.all:
         matches = find_all_matches(
@@ -365,6 +691,9 @@ def main():
             scale_range=(args.min_scale, args.max_scale),
             scale_step=args.scale_step,
             max_results=args.max_results,
+            certain=args.certain,
+            calibration=calibration,
+            engine=args.engine,
         )
     else:
         match = find_image_in_screenshot(
@@ -372,6 +701,9 @@ def main():
             threshold=args.threshold,
             scale_range=(args.min_scale, args.max_scale),
             scale_step=args.scale_step,
+            certain=args.certain,
+            calibration=calibration,
+            engine=args.engine,
         )
         matches = [match] if match else []
 
@@ -382,13 +714,24 @@ def main():
     return 0
 
 
-def match_and_click(image_path, threshold=0.6, debug_path="./tmp_img_save_folder/debug_match.png"):
+def match_and_click(
+    image_path,
+    threshold=0.6,
+    debug_path="./tmp_img_save_folder/debug_match.png",
+    change_detector=None,
+):
     """
     查找并点击指定图片的位置
     :param image_path: 图片路径
     :param threshold: 匹配阈值
+    :param change_detector: 画面变化检测，画面与上次相同时不再匹配，见match_image
     """
-    position = match_image(image_path, threshold=threshold, debug_path=debug_path)
+    position = match_image(
+        image_path,
+        threshold=threshold,
+        debug_path=debug_path,
+        change_detector=change_detector,
+    )
     if position:
         x, y = position
         pyautogui.click(x, y)  # 点击匹配位置
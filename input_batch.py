@@ -0,0 +1,108 @@
+import time
+
+
+class InputBatch:
+    """
+    批量输入队列
+    将点击、滑动和等待操作编译成一段设备端shell脚本，一次往返执行完毕，
+    设备端按顺序执行，并保留操作之间的等待时间
+
+    使用示例:
+        with adb.batch() as batch:
+            for _ in range(50):
+                batch.tap(x, y)
+                batch.sleep(0.03)
+    """
+
+    def __init__(self, adb_controller, max_script_length=3000):
+        """
+        参数:
+            adb_controller: ADBController实例
+            max_script_length: 单次发送的脚本最大长度，超过时拆分成多次执行
+                （旧版本adbd对shell命令长度有4KB限制）
+        """
+        self.adb = adb_controller
+        self.max_script_length = max_script_length
+        self.commands = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # 发生异常时丢弃未执行的操作
+        if exc_type is None:
+            self.flush()
+        else:
+            self.commands = []
+        return False
+
+    def __len__(self):
+        return len(self.commands)
+
+    def tap(self, x, y):
+        """
+        添加点击操作
+        """
+        self.commands.append(f"input tap {int(x)} {int(y)}")
+        return self
+
+    def swipe(self, start_x, start_y, end_x, end_y, duration=300):
+        """
+        添加滑动操作，duration为毫秒
+        """
+        self.commands.append(
+            f"input swipe {int(start_x)} {int(start_y)} {int(end_x)} {int(end_y)} {int(duration)}"
+        )
+        return self
+
+    def sleep(self, seconds):
+        """
+        添加等待操作，由设备端执行，不占用往返时间
+        """
+        if seconds > 0:
+            self.commands.append(f"sleep {seconds:.3f}")
+        return self
+
+    def compile(self):
+        """
+        将队列中的操作编译成shell脚本
+
+        返回:
+            list: 脚本列表，每个脚本不超过max_script_length
+        """
+        scripts = []
+        current = []
+        length = 0
+        for command in self.commands:
+            if current and length + len(command) + 2 > self.max_script_length:
+                scripts.append("; ".join(current))
+                current = []
+                length = 0
+            current.append(command)
+            length += len(command) + 2
+        if current:
+            scripts.append("; ".join(current))
+        return scripts
+
+    def flush(self):
+        """
+        执行队列中的所有操作并清空队列
+
+        返回:
+            bool: 操作是否成功
+        """
+        if not self.commands:
+            return True
+
+        count = len(self.commands)
+        scripts = self.compile()
+        self.commands = []
+        try:
+            for script in scripts:
+                self.adb._execute_command(f"shell {script}")
+            self.adb.last_input_time = time.time()
+            print(f"批量执行输入操作: {count}条, {len(scripts)}次往返")
+            return True
+        except Exception as e:
+            print(f"批量输入失败: {str(e)}")
+            return False
@@ -1,4 +1,10 @@
-from image_matcher import match_and_click, match_image
+from change_detector import FrameChangeDetector
+from image_matcher import (
+    SCALE_CALIBRATION,
+    find_images_in_screenshot,
+    match_and_click,
+    match_image,
+)
 import pyautogui
 import time
 import random
@@ -63,11 +69,15 @@ def auto_attack_battle_advanced(
             ]
             random.shuffle(fangbing_weizhi)
             print(fangbing_weizhi)  # 输出打乱后的列表
-            for location in fangbing_weizhi:
-                fang_bing_x, fang_bing_y = match_and_click(
-                    location, threshold=0.8, debug_path="fangbing_debug.png"
-                )
-                if fang_bing_x != -1 and fang_bing_y != -1:
+            # 一次截屏，并行匹配所有放兵位置，任意一个找到即可
+            fang_bing_x, fang_bing_y = -1, -1
+            results = find_images_in_screenshot(
+                fangbing_weizhi, threshold=0.8, mode="first"
+            )
+            for location, position in results.items():
+                if position:
+                    fang_bing_x, fang_bing_y = position
+                    pyautogui.click(fang_bing_x, fang_bing_y)
                     print(
                         f"第 {battle_round} 轮：找到放兵位置 {location}，x: {fang_bing_x}, y: {fang_bing_y}"
                     )
@@ -105,12 +115,16 @@ def auto_attack_battle_advanced(
             print(f"第 {battle_round} 轮：等待战斗结束（最长{battle_timeout}秒）...")
             start_time = time.time()
             check_count = 0
+            # 战斗画面没有变化时直接使用上次的查找结果
+            change_detector = FrameChangeDetector()
 
             while time.time() - start_time < battle_timeout:
                 elapsed_time = time.time() - start_time
                 check_count += 1
 
-                x, y = match_and_click("./zhushijie/hui-ying.png", threshold=0.9)
+                x, y = match_and_click(
+                    "./zhushijie/hui-ying.png", threshold=0.9, change_detector=change_detector
+                )
                 if x != -1 and y != -1:
                     print(f"第 {battle_round} 轮：战斗结束！用时: {elapsed_time:.1f}秒")
                     break
@@ -122,6 +136,7 @@ def auto_attack_battle_advanced(
 
             if time.time() - start_time >= battle_timeout:
                 print(f"第 {battle_round} 轮：战斗超时")
+            change_detector.print_summary()
 
             # 轮次间延迟
             if battle_round < times:
@@ -143,3 +158,6 @@ if __name__ == "__main__":
     auto_attack_battle_advanced(
         times=15, troop_count=60, battle_timeout=260, round_delay=3
     )
+
+    # 缩放比例校准结果和按校准比例查找的次数
+    SCALE_CALIBRATION.print_summary()
@@ -1,12 +1,34 @@
-from image_matcher import match_and_click, match_image
 from adb_controller import ADBController
+from change_detector import FrameChangeDetector
+from polling import PollingPolicy
 from template_matcher import TemplateMatcher
 import time
 import random
 
 # 创建实例
 adb = ADBController()  # 使用我们之前创建的ADB控制器
-matcher = TemplateMatcher(adb)
+# 轮询回营按钮等画面基本不变时，不再重复匹配
+matcher = TemplateMatcher(adb, change_detector=FrameChangeDetector())
+
+# 战斗至少持续几十秒，等待回营按钮时间隔从1秒开始，最长3秒
+BATTLE_POLLING = PollingPolicy(initial_interval=1.0, max_interval=3.0)
+
+
+def use_device(adb_controller, template_matcher=None):
+    """
+    切换本模块使用的设备，多设备并行运行时由每个工作进程调用
+
+    Args:
+        adb_controller (ADBController): 目标设备的控制器
+        template_matcher (TemplateMatcher): 对应的匹配器，为None时自动创建
+    """
+    global adb, matcher
+    adb = adb_controller
+    matcher = (
+        template_matcher
+        if template_matcher
+        else TemplateMatcher(adb_controller, change_detector=FrameChangeDetector())
+    )
 
 
 def fang_bing(x, y, count):
@@ -16,22 +38,28 @@ def fang_bing(x, y, count):
     if x == -1 or y == -1:
         print("未找到放兵位置")
         return
-    # 使用match_and_click函数匹配并点击放兵位置，设置阈值为0.3
-    for item in range(1, count + 1):
-        adb.tap(x, y)  # 使用ADB点击
-        time.sleep(random.uniform(0.01, 0.05))  # 确保点击间隔
+    # 所有点击编译成一个设备端脚本，一次往返完成
+    with adb.batch() as batch:
+        for item in range(1, count + 1):
+            batch.tap(x, y)  # 使用ADB点击
+            batch.sleep(random.uniform(0.01, 0.05))  # 确保点击间隔
 
 
-def click_img_postion(img_path, threshold=0.8):
+def click_img_postion(img_path, threshold=0.8, timeout=0, policy=None):
     """
-    查找并点击指定图片位置
+    查找并点击指定图片位置，点击后等待图片消失（最多2秒）
     :param img_path: 图片路径
     :param threshold: 匹配阈值
+    :param timeout: 等待图片出现的最长时间(秒)，为0时只查找一次
+    :param policy: 等待时的轮询节奏，见TemplateMatcher.wait_for
     """
-    result = matcher.find_and_tap(img_path, threshold)
+    result = matcher.wait_for(img_path, timeout, threshold, policy=policy)
     if result:
+        center_x, center_y, _ = result
+        adb.tap(center_x, center_y)
         print(f"点击成功，图片 {img_path} 已点击")
-        time.sleep(2)  # 等待1秒，确保点击生效
+        # 图片消失说明点击已生效，不再固定等待
+        matcher.wait_until_gone(img_path, timeout=2, threshold=threshold)
         return True
     else:
         print("未找到匹配的图片", img_path)
@@ -48,19 +76,20 @@ def auto_battle(call_count=1):
 
     Args:
         call_count (int): 调用次数，默认为1次
-    """
 
+    Returns:
+        int: 正常结束的战斗次数
+    """
+    completed = 0
     for i in range(call_count):
         print(f"开始第 {i+1} 次战斗...")
 
         try:
             # 点击进攻按钮
-            click_img_postion("./zhushijie/jin-gong.png", threshold=0.5)
-            time.sleep(1)
+            click_img_postion("./zhushijie/jin-gong.png", threshold=0.5, timeout=5)
 
             # 点击搜索按钮
-            click_img_postion("./zhushijie/sou-su.png", threshold=0.5)
-            time.sleep(1)
+            click_img_postion("./zhushijie/sou-su.png", threshold=0.5, timeout=5)
 
             # 寻找放兵位置
             fangbing_x, fangbing_y = find_fangbing_position()
@@ -75,6 +104,7 @@ def auto_battle(call_count=1):
             battle_result = wait_for_battle_end()
 
             if battle_result:
+                completed += 1
                 print(f"第 {i+1} 次战斗完成")
             else:
                 print(f"第 {i+1} 次战斗超时")
@@ -83,12 +113,8 @@ def auto_battle(call_count=1):
             print(f"第 {i+1} 次战斗出现错误: {e}")
             continue
 
-        # 如果不是最后一次调用，添加间隔时间
-        if i < call_count - 1:
-            print("等待下一次战斗...")
-            time.sleep(2)
-
     print(f"所有 {call_count} 次战斗已完成")
+    return completed
 
 
 def find_fangbing_position():
@@ -109,16 +135,12 @@ def find_fangbing_position():
     ]
     random.shuffle(fangbing_weizhi)
 
-    for location in fangbing_weizhi:
-        r = matcher.find_template(
-            location,
-            threshold=0.6,
-            debug_image="./tmp_img_save_folder/fangbing_deubg.png",
-        )
-        if r:
-            fangbing_x, fangbing_y, _ = r
-            print(f"找到放兵位置 {location}，x: {fangbing_x}")
-            return fangbing_x, fangbing_y
+    # 等待搜索到对手：每次截图并行匹配所有放兵位置，任意一个出现即返回
+    location, r = matcher.wait_any(fangbing_weizhi, timeout=10, threshold=0.6)
+    if r:
+        fangbing_x, fangbing_y, _ = r
+        print(f"找到放兵位置 {location}，x: {fangbing_x}")
+        return fangbing_x, fangbing_y
 
     print("未找到放兵位置")
     return 0, 0
@@ -132,20 +154,14 @@ def deploy_all_armies(fangbing_x, fangbing_y):
         fangbing_x (int): 放兵位置x坐标
         fangbing_y (int): 放兵位置y坐标
     """
-    all_arm_postions = []
-    all_arm_postions.append(
-        {"huang-mao": matcher.find_template("./zhushijie/huang-mao.png", threshold=0.8)}
-    )
-    all_arm_postions.append(
-        {"ge-bu-lin": matcher.find_template("./zhushijie/ge-bo-lin.png", threshold=0.8)}
-    )
-    all_arm_postions.append(
-        {
-            "archer": matcher.find_template(
-                "./zhushijie/gong-jian-shou.png", threshold=0.8
-            )
-        }
-    )
+    arms = {
+        "huang-mao": "./zhushijie/huang-mao.png",
+        "ge-bu-lin": "./zhushijie/ge-bo-lin.png",
+        "archer": "./zhushijie/gong-jian-shou.png",
+    }
+    # 一次截图，并行查找所有兵种图标
+    results = matcher.find_templates(arms.values(), threshold=0.8)
+    all_arm_postions = [{key: results[path]} for key, path in arms.items()]
 
     # 释放所有作战单位
     for arm in all_arm_postions:
@@ -169,17 +185,12 @@ def wait_for_battle_end(timeout=240):
     Returns:
         bool: True表示战斗正常结束，False表示超时
     """
-    start_time = time.time()
-    time.sleep(20)  # 等待20s开始检测， 这个时候战斗还在进行中。
-    while time.time() - start_time < timeout:
-        elapsed_time = time.time() - start_time
-
-        if click_img_postion("./zhushijie/hui-ying.png", threshold=0.8):
-            print("战斗结束")
-            time.sleep(3)
-            return True
-        else:
-            time.sleep(5)
+    # 回营按钮出现即点击，不再固定等待
+    if click_img_postion(
+        "./zhushijie/hui-ying.png", threshold=0.8, timeout=timeout, policy=BATTLE_POLLING
+    ):
+        print("战斗结束")
+        return True
 
     print("战斗超时")
     return False
@@ -187,6 +198,9 @@ def wait_for_battle_end(timeout=240):
 
 # 使用示例：
 if __name__ == "__main__":
+    # 启动时预先解码所有模板
+    matcher.preload_templates("zhushijie")
+
     # 调用1次
     auto_battle(2)
 
@@ -195,3 +209,11 @@ if __name__ == "__main__":
 
     # 调用10次
     # auto_battle(10)
+
+    # 模板历史位置的命中率和加速效果
+    if matcher.spatial_priors is not None:
+        matcher.spatial_priors.print_summary()
+    # 画面没有变化而跳过匹配的比例
+    matcher.change_detector.print_summary()
+    # 各等待的耗时
+    matcher.wait_stats.print_summary()
@@ -0,0 +1,622 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from frame import Frame, as_frame
+
+# FFT方式支持的匹配方法，其他方法由OpenCV计算
+FFT_METHODS = (cv2.TM_CCOEFF_NORMED,)
+
+# FFT方式缓存模板频谱占用的最大字节数（按截图尺寸计算的频谱较大，超出时丢弃最久未使用的）
+FFT_TEMPLATE_CACHE_BYTES = 256 * 1024 * 1024
+
+# 分母小于该值（匹配区域或模板几乎是纯色）时得分为0
+NCC_EPSILON = 1e-6
+
+# SAD方式计算下界时模板每边分的块数
+SAD_BLOCKS = 2
+
+# SAD方式查找最佳匹配时只准确比较置信度不低于该值的位置
+SAD_MIN_CONFIDENCE = 0.9
+
+# SAD方式每次对剩余位置累加的模板像素数，以及临时数组的最大元素数
+SAD_CHUNK_PIXELS = 16
+SAD_CHUNK_VALUES = 1 << 22
+
+# SAD方式下界筛选后剩余的位置超过该数量，或剩余位置数 x 剩余像素值数超过SAD_MAX_WORK时
+# 无法提前淘汰（如纯色模板在颜色接近的背景上），直接改用OpenCV引擎
+SAD_MAX_CANDIDATES = 1 << 17
+SAD_MAX_WORK = 1 << 26
+
+
+def _image_for(frame, template):
+    """
+    返回与模板通道数一致的截图：灰度模板用灰度图，彩色模板用BGR图
+    """
+    return frame.gray if template.ndim == 2 else frame.bgr
+
+
+def _channel_sum_integral(image):
+    """
+    返回:
+        numpy.ndarray: 各通道相加后的积分图
+    """
+    if image.ndim == 3:
+        image = image.sum(axis=2, dtype=np.float32)
+    return cv2.integral(image, sdepth=cv2.CV_64F)
+
+
+def _box_sums(table, top, bottom, left, right, height, width):
+    """
+    由积分图计算所有位置上一个矩形区域的像素和
+
+    参数:
+        table: 积分图
+        top, bottom, left, right: 矩形区域相对于位置左上角的范围
+        height, width: 位置的数量（得分图的高和宽）
+
+    返回:
+        numpy.ndarray: (height, width)的像素和，多通道时每个通道一个值
+    """
+    return cv2.subtract(
+        cv2.add(
+            table[bottom : bottom + height, right : right + width],
+            table[top : top + height, left : left + width],
+        ),
+        cv2.add(
+            table[top : top + height, right : right + width],
+            table[bottom : bottom + height, left : left + width],
+        ),
+    )
+
+
+def _window_sums(image, h, w):
+    """
+    返回:
+        numpy.ndarray: 以每个位置为左上角、h x w窗口内的像素和(float64)，右侧和下方超出截图的部分按0计算
+    """
+    return cv2.boxFilter(
+        image, cv2.CV_64F, (w, h), anchor=(0, 0), normalize=False, borderType=cv2.BORDER_CONSTANT
+    )
+
+
+def _best_location(score_map):
+    _, max_val, _, max_loc = cv2.minMaxLoc(score_map)
+    return max_loc, float(max_val)
+
+
+class MatchEngine(ABC):
+    """
+    匹配引擎：计算模板在截图每个位置的得分（越大越好），TemplateMatcher和image_matcher共用
+    新的引擎继承该类，实现score_map（需要时也实现locate），再用register_engine注册；
+    没有实现score_map的引擎无法创建实例
+
+    使用示例:
+        engine = get_engine("fft")
+        match_loc, confidence = engine.locate(frame, template)
+    """
+
+    name = None
+    # 结果与OpenCV相同的匹配方法，None表示全部方法；不在其中的方法得分含义不同，不会被自动选择
+    methods = None
+
+    def prepare(self, frame, template):
+        """
+        预先计算截图上可被多个模板共用的数据（如频谱、积分图），缓存在Frame中，每帧只计算一次
+
+        参数:
+            frame: Frame
+            template: 模板图像，用于确定使用灰度图还是BGR图
+        """
+
+    @abstractmethod
+    def score_map(self, frame, template, method=cv2.TM_CCOEFF_NORMED, threshold=None):
+        """
+        计算得分图
+
+        参数:
+            frame: 截图(Frame或BGR数组)
+            template: 模板图像，BGR(三维)或灰度(二维)，截图自动使用相同的格式
+            method: OpenCV模板匹配的方法
+            threshold: 只需要准确计算得分不低于该值的位置，其余位置可以是任意低于该值的数，
+                为None时全部准确计算
+
+        返回:
+            numpy.ndarray: 形状为(截图高-模板高+1, 截图宽-模板宽+1)的得分图，越大越好
+        """
+
+    def locate(self, frame, template, method=cv2.TM_CCOEFF_NORMED):
+        """
+        查找得分最高的位置
+
+        返回:
+            tuple: (匹配区域左上角坐标, 置信度)
+        """
+        return _best_location(self.score_map(frame, template, method))
+
+
+class OpenCVEngine(MatchEngine):
+    """
+    cv2.matchTemplate，支持全部匹配方法；SQDIFF方法的得分转换为 1 - 结果
+    """
+
+    name = "opencv"
+
+    def score_map(self, frame, template, method=cv2.TM_CCOEFF_NORMED, threshold=None):
+        result = cv2.matchTemplate(_image_for(as_frame(frame), template), template, method)
+        if method in (cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED):
+            return 1 - result
+        return result
+
+    def locate(self, frame, template, method=cv2.TM_CCOEFF_NORMED):
+        result = cv2.matchTemplate(_image_for(as_frame(frame), template), template, method)
+        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+        if method in (cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED):
+            return min_loc, 1 - min_val
+        return max_loc, max_val
+
+
+class FFTEngine(MatchEngine):
+    """
+    基于FFT的归一化互相关（与TM_CCOEFF_NORMED结果相同）：
+    截图每个通道的频谱和积分图每帧只计算一次，缓存在Frame中，同一帧上的所有模板（包括
+    image_matcher的各个缩放比例）共用；模板的频谱按截图尺寸缓存，之后每个模板只需一次逆变换
+    其他匹配方法由OpenCV计算
+    """
+
+    name = "fft"
+    methods = FFT_METHODS
+
+    def __init__(self, cache_bytes=FFT_TEMPLATE_CACHE_BYTES):
+        """
+        参数:
+            cache_bytes: 缓存模板频谱占用的最大字节数
+        """
+        self.cache_bytes = cache_bytes
+        self._templates = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+    def template_spectra(self, template, size):
+        """
+        获取去均值后的模板各通道在给定尺寸下的频谱，以及模板各通道方差之和
+
+        参数:
+            template: 模板图像（TEMPLATE_STORE中的模板不会被修改，可以按对象缓存）
+            size: 频谱尺寸(高, 宽)，与截图的频谱相同
+
+        返回:
+            tuple: ([各通道的频谱], 模板能量)
+        """
+        # 缓存中保留模板的引用，模板对象不会被回收，id不会被复用
+        key = (id(template), template.shape, size)
+        with self._lock:
+            entry = self._templates.get(key)
+            if entry is not None:
+                self._templates.move_to_end(key)
+                return entry[1], entry[2]
+
+        h = template.shape[0]
+        spectra = []
+        energy = 0.0
+        for plane in [template] if template.ndim == 2 else cv2.split(template):
+            centered = np.float32(plane) - float(plane.mean())
+            energy += float(cv2.norm(centered, cv2.NORM_L2SQR))
+            padded = np.zeros(size, np.float32)
+            padded[:h, : template.shape[1]] = centered
+            spectra.append(cv2.dft(padded, nonzeroRows=h))
+
+        nbytes = sum(spectrum.nbytes for spectrum in spectra)
+        with self._lock:
+            if key not in self._templates and nbytes <= self.cache_bytes:
+                self._templates[key] = (template, spectra, energy, nbytes)
+                self._cached_bytes += nbytes
+                while self._cached_bytes > self.cache_bytes:
+                    _, evicted = self._templates.popitem(last=False)
+                    self._cached_bytes -= evicted[3]
+        return spectra, energy
+
+    def prepare(self, frame, template):
+        self.frame_spectra(frame, 1 if template.ndim == 2 else template.shape[2])
+
+    def frame_spectra(self, frame, channels):
+        """
+        获取截图各通道的频谱和各通道像素值的平方和（每帧每种通道数只计算一次）
+
+        参数:
+            frame: Frame
+            channels: 1(灰度) 或 3(BGR)
+
+        返回:
+            tuple: (频谱尺寸(高, 宽), [各通道的频谱], 截图, 各通道平方和(float32))
+        """
+
+        def build():
+            image = frame.gray if channels == 1 else frame.bgr
+            height, width = image.shape[:2]
+            size = (cv2.getOptimalDFTSize(height), cv2.getOptimalDFTSize(width))
+            spectra = []
+            for plane in [image] if channels == 1 else cv2.split(image):
+                padded = np.zeros(size, np.float32)
+                padded[:height, :width] = plane
+                spectra.append(cv2.dft(padded, nonzeroRows=height))
+            values = np.float32(image)
+            squares = cv2.multiply(values, values)
+            if channels > 1:
+                squares = cv2.transform(squares, np.ones((1, channels), np.float32))
+            return size, spectra, image, squares
+
+        return frame.derived(("fft", channels), build)
+
+    def score_map(self, frame, template, method=cv2.TM_CCOEFF_NORMED, threshold=None):
+        frame = as_frame(frame)
+        if method not in FFT_METHODS:
+            return get_engine("opencv").score_map(frame, template, method, threshold)
+        channels = 1 if template.ndim == 2 else template.shape[2]
+        size, spectra, image, squares = self.frame_spectra(frame, channels)
+        h, w = template.shape[:2]
+        out_h, out_w = frame.height - h + 1, frame.width - w + 1
+
+        # 分子：截图与去均值模板的互相关，模板去均值后截图窗口的均值项为0，各通道相加后只做一次逆变换
+        template_spectra, template_energy = self.template_spectra(template, size)
+        product = None
+        for spectrum, template_spectrum in zip(spectra, template_spectra):
+            term = cv2.mulSpectrums(spectrum, template_spectrum, 0, conjB=True)
+            product = term if product is None else cv2.add(product, term)
+        correlation = cv2.idft(product, flags=cv2.DFT_SCALE | cv2.DFT_REAL_OUTPUT)
+        numerator = correlation[:out_h, :out_w]
+
+        # 分母：截图窗口各通道的方差之和与模板方差之和；窗口内的和用不归一化的均值滤波按double累加
+        sums = _window_sums(image, h, w)[:out_h, :out_w]
+        sums = cv2.multiply(sums, sums)
+        if channels > 1:
+            sums = cv2.transform(sums, np.ones((1, channels)))
+        window_energy = cv2.scaleAdd(
+            sums, -1.0 / (h * w), _window_sums(squares, h, w)[:out_h, :out_w]
+        )
+        denominator = cv2.sqrt(np.float32(cv2.max(window_energy, 0.0) * template_energy))
+
+        scores = cv2.divide(numerator, cv2.max(denominator, NCC_EPSILON))
+        scores[denominator <= NCC_EPSILON] = 0
+        return np.clip(scores, -1.0, 1.0, out=scores)
+
+
+class SADEngine(MatchEngine):
+    """
+    uint8绝对差之和(SAD)，提前淘汰候选位置：
+    先用积分图算出每个位置SAD的下界（模板分块后各块像素和之差），下界已超过上限的位置直接淘汰；
+    剩余位置按与模板均值相差最大的像素优先逐组累加差值，累加值超过上限即淘汰。
+    查找最佳匹配时上限为目前最好位置的完整SAD，查找所有匹配时为阈值对应的SAD
+    适合截图中像素完全一致的小图标，不适合有缩放、模糊或半透明效果的模板
+
+    置信度为 1 - 平均每个像素值的绝对差 / 255，与TM_CCOEFF_NORMED的含义不同；忽略method参数
+    剩余位置太多、无法提前淘汰时改用OpenCV引擎按method匹配（每种模板尺寸提示一次）
+    """
+
+    name = "sad"
+    methods = ()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fallbacks = set()
+
+    def prepare(self, frame, template):
+        self._lower_bound_integral(frame, _image_for(frame, template))
+
+    @staticmethod
+    def _pixel_order(template):
+        # 与模板均值相差大的像素在背景上更容易不一致，先累加这些像素可以更早淘汰候选位置
+        values = template.reshape(template.shape[0], template.shape[1], -1).astype(np.float32)
+        distinct = np.abs(values - values.mean(axis=(0, 1))).sum(axis=2)
+        order = np.argsort(-distinct, axis=None, kind="stable")
+        return np.unravel_index(order, distinct.shape)
+
+    @staticmethod
+    def _full_sad(image, template, y, x):
+        h, w = template.shape[:2]
+        return int(cv2.absdiff(image[y : y + h, x : x + w], template).sum(dtype=np.int64))
+
+    @staticmethod
+    def _lower_bound_integral(frame, image):
+        return frame.derived(("sad_integral", image.ndim), lambda: _channel_sum_integral(image))
+
+    @staticmethod
+    def _lower_bound(frame, image, template):
+        """
+        逐次淘汰(SEA)的下界：模板分为 SAD_BLOCKS x SAD_BLOCKS 块，各块像素值（各通道相加）之和的差的绝对值
+        之和不超过该位置的SAD；截图各通道相加后的积分图每帧只计算一次
+
+        返回:
+            numpy.ndarray: 每个位置SAD的下界
+        """
+
+        integral = SADEngine._lower_bound_integral(frame, image)
+        template_integral = _channel_sum_integral(template)
+        h, w = template.shape[:2]
+        out_h, out_w = image.shape[0] - h + 1, image.shape[1] - w + 1
+        rows = np.unique(np.linspace(0, h, SAD_BLOCKS + 1).astype(int))
+        cols = np.unique(np.linspace(0, w, SAD_BLOCKS + 1).astype(int))
+
+        bound = np.zeros((out_h, out_w), np.float64)
+        for top, bottom in zip(rows[:-1], rows[1:]):
+            for left, right in zip(cols[:-1], cols[1:]):
+                windows = _box_sums(integral, top, bottom, left, right, out_h, out_w)
+                block = _box_sums(template_integral, top, bottom, left, right, 1, 1)
+                cv2.add(bound, cv2.absdiff(windows, float(block[0, 0])), dst=bound)
+        return bound
+
+    def _search(self, frame, template, budget, best_only=False):
+        """
+        参数:
+            frame: Frame
+            template: 模板图像
+            budget: SAD的上限
+            best_only: 只查找SAD最小的位置，上限随找到的更好位置逐渐降低
+
+        返回:
+            tuple: (剩余位置的y数组, x数组, 完整的SAD数组, 得分图尺寸, 初始位置(y, x, SAD))；
+                   best_only时只保证上限以内SAD最小的位置在其中；无法提前淘汰时返回None
+        """
+        image = _image_for(frame, template)
+        lower = self._lower_bound(frame, image, template)
+        # 下界最小的位置作为初始位置，其完整SAD即为最佳匹配SAD的上限
+        y, x = np.unravel_index(int(np.argmin(lower)), lower.shape)
+        seed = (int(y), int(x), self._full_sad(image, template, y, x))
+        bound = min(budget, seed[2]) if best_only else budget
+
+        ys, xs = np.nonzero(lower <= bound)
+        # 剩余工作量只会减少，循环前没超过上限则整个查找都不会超过
+        if len(ys) > SAD_MAX_CANDIDATES or len(ys) * template.size > SAD_MAX_WORK:
+            self._fall_back(template)
+            return None
+        sums = np.zeros(len(ys), np.int64)
+        pixel_ys, pixel_xs = self._pixel_order(template)
+        channels = 1 if template.ndim == 2 else template.shape[2]
+        done = 0
+        while done < len(pixel_ys) and len(ys):
+            # 候选位置很多时每次少取几个像素，限制临时数组的大小
+            step = max(1, min(SAD_CHUNK_PIXELS, SAD_CHUNK_VALUES // (len(ys) * channels)))
+            chunk_ys = pixel_ys[done : done + step]
+            chunk_xs = pixel_xs[done : done + step]
+            done += len(chunk_ys)
+            values = image[ys[:, None] + chunk_ys, xs[:, None] + chunk_xs].astype(np.int16)
+            difference = np.abs(values - template[chunk_ys, chunk_xs].astype(np.int16))
+            sums += difference.reshape(len(ys), -1).sum(axis=1)
+            if best_only:
+                best = int(np.argmin(sums))
+                bound = min(bound, self._full_sad(image, template, ys[best], xs[best]))
+            keep = sums <= bound
+            ys, xs, sums = ys[keep], xs[keep], sums[keep]
+        return ys, xs, sums, lower.shape, seed
+
+    def _fall_back(self, template):
+        with self._lock:
+            if template.shape in self._fallbacks:
+                return
+            self._fallbacks.add(template.shape)
+        print(f"SAD无法提前淘汰候选位置，改用opencv引擎: 模板尺寸{template.shape}")
+
+    def score_map(self, frame, template, method=cv2.TM_CCOEFF_NORMED, threshold=None):
+        """
+        有阈值时只计算置信度不低于max(阈值, SAD_MIN_CONFIDENCE)的位置，其余位置为0；
+        没有阈值时计算全部位置（很慢，只用于分析）
+        """
+        scale = 255.0 * template.size
+        if threshold is None:
+            budget = int(scale)
+        else:
+            budget = int((1 - max(threshold, SAD_MIN_CONFIDENCE)) * scale)
+        found = self._search(as_frame(frame), template, budget)
+        if found is None:
+            return OpenCVEngine().score_map(frame, template, method, threshold)
+        ys, xs, sums, shape, _ = found
+        scores = np.zeros(shape, np.float32)
+        scores[ys, xs] = 1 - sums / scale
+        return scores
+
+    def locate(self, frame, template, method=cv2.TM_CCOEFF_NORMED):
+        """
+        查找SAD最小的位置；置信度低于SAD_MIN_CONFIDENCE时截图中没有该图标，
+        不再逐个比较，返回下界最小的位置及其置信度（不一定是置信度最高的位置）
+        """
+        scale = 255.0 * template.size
+        budget = int((1 - SAD_MIN_CONFIDENCE) * scale)
+        found = self._search(as_frame(frame), template, budget, best_only=True)
+        if found is None:
+            return OpenCVEngine().locate(frame, template, method)
+        ys, xs, sums, _, seed = found
+        if not len(sums):
+            y, x, sad = seed
+            return (x, y), float(1 - sad / scale)
+        best = int(np.argmin(sums))
+        return (int(xs[best]), int(ys[best])), float(1 - sums[best] / scale)
+
+
+class AutoEngine(MatchEngine):
+    """
+    按模板尺寸自动选择最快的引擎：每种 (截图尺寸, 模板通道数, 模板尺寸档位, 匹配方法) 第一次匹配时，
+    在这一帧上对各候选引擎计时，之后直接使用最快的引擎
+    截图上共用的数据（FFT的频谱等）单独计时，按平均每帧匹配的模板数分摊；
+    只在结果与所选方法相同的引擎中选择，不会自动选择SAD
+
+    使用示例:
+        matcher = TemplateMatcher(adb, engine="auto")
+        ...
+        get_engine("auto").print_summary()
+    """
+
+    name = "auto"
+
+    def __init__(self, candidates=("opencv", "fft"), repeat=2):
+        """
+        参数:
+            candidates: 候选引擎名称
+            repeat: 计时时每个引擎匹配的次数，取最短耗时
+        """
+        self.candidates = tuple(candidates)
+        self.repeat = repeat
+        self._timings = {}
+        self._lock = threading.Lock()
+        self._frames = 0
+        self._lookups = 0
+
+    @staticmethod
+    def size_class(template):
+        """
+        返回:
+            tuple: 模板尺寸档位，宽高按2的幂分档，如 (7, 7) 表示宽高都在64-127之间
+        """
+        h, w = template.shape[:2]
+        return int(h).bit_length(), int(w).bit_length()
+
+    def _count_frame(self):
+        with self._lock:
+            self._frames += 1
+        return True
+
+    def _templates_per_frame(self):
+        with self._lock:
+            return self._lookups / self._frames if self._frames else 1.0
+
+    def benchmark(self, frame, template, method=cv2.TM_CCOEFF_NORMED):
+        """
+        在截图上对各候选引擎计时
+
+        返回:
+            dict: {引擎名称: (截图上共用数据的耗时ms, 每个模板的匹配耗时ms)}
+        """
+        timings = {}
+        for name in self.candidates:
+            engine = get_engine(name)
+            if engine.methods is not None and method not in engine.methods:
+                continue
+            # 复制一个Frame计时，不受截图上已缓存数据的影响
+            copy = Frame(frame.raw, frame.color_order)
+            start = time.perf_counter()
+            engine.prepare(copy, template)
+            prepare_ms = (time.perf_counter() - start) * 1000
+            match_ms = None
+            for _ in range(max(1, self.repeat)):
+                start = time.perf_counter()
+                engine.locate(copy, template, method)
+                elapsed = (time.perf_counter() - start) * 1000
+                match_ms = elapsed if match_ms is None else min(match_ms, elapsed)
+            timings[name] = (prepare_ms, match_ms)
+        return timings
+
+    def choose(self, frame, template, method=cv2.TM_CCOEFF_NORMED):
+        """
+        返回:
+            MatchEngine: 该截图尺寸和模板尺寸下最快的引擎
+        """
+        frame = as_frame(frame)
+        channels = 1 if template.ndim == 2 else template.shape[2]
+        key = (frame.shape[:2], channels, self.size_class(template), method)
+        with self._lock:
+            timings = self._timings.get(key)
+        if timings is None:
+            timings = self.benchmark(frame, template, method)
+            with self._lock:
+                self._timings[key] = timings
+            print(
+                f"匹配引擎计时: 截图{frame.width}x{frame.height}, 模板约{template.shape[1]}x{template.shape[0]}, "
+                + ", ".join(
+                    f"{name} {match_ms:.1f}ms(每帧+{prepare_ms:.1f}ms)"
+                    for name, (prepare_ms, match_ms) in timings.items()
+                )
+            )
+        if not timings:
+            return get_engine("opencv")
+        per_frame = max(1.0, self._templates_per_frame())
+        name = min(timings, key=lambda item: timings[item][0] / per_frame + timings[item][1])
+        return get_engine(name)
+
+    def _engine_for(self, frame, template, method):
+        frame = as_frame(frame)
+        # 按帧计数，估计平均每帧匹配的模板数
+        frame.derived(("auto_engine_frame", id(self)), self._count_frame)
+        with self._lock:
+            self._lookups += 1
+        return frame, self.choose(frame, template, method)
+
+    def score_map(self, frame, template, method=cv2.TM_CCOEFF_NORMED, threshold=None):
+        frame, engine = self._engine_for(frame, template, method)
+        return engine.score_map(frame, template, method, threshold)
+
+    def locate(self, frame, template, method=cv2.TM_CCOEFF_NORMED):
+        frame, engine = self._engine_for(frame, template, method)
+        return engine.locate(frame, template, method)
+
+    def stats(self):
+        """
+        返回:
+            dict: 平均每帧匹配的模板数(templates_per_frame)，以及各尺寸档位的计时和选择的引擎(choices)
+        """
+        per_frame = max(1.0, self._templates_per_frame())
+        with self._lock:
+            choices = {}
+            for (shape, channels, size, method), timings in self._timings.items():
+                if timings:
+                    choices[f"{shape[1]}x{shape[0]} c{channels} {size} m{method}"] = {
+                        "engine": min(
+                            timings, key=lambda item: timings[item][0] / per_frame + timings[item][1]
+                        ),
+                        "timings": timings,
+                    }
+            return {"templates_per_frame": per_frame, "choices": choices}
+
+    def print_summary(self):
+        """
+        打印各尺寸档位选择的引擎
+        """
+        stats = self.stats()
+        print(f"匹配引擎自动选择: 平均每帧匹配{stats['templates_per_frame']:.1f}个模板")
+        for key, choice in stats["choices"].items():
+            print(f"  {key}: {choice['engine']}")
+
+
+# 已注册的匹配引擎，名称 -> 引擎实例
+MATCH_ENGINES = {}
+
+# 没有指定引擎时使用的引擎
+DEFAULT_ENGINE = "opencv"
+
+
+def register_engine(engine):
+    """
+    注册匹配引擎，之后可以按名称在TemplateMatcher、image_matcher中使用
+
+    参数:
+        engine: MatchEngine实例，按engine.name注册，同名的引擎被替换
+
+    返回:
+        MatchEngine: 注册的引擎
+    """
+    MATCH_ENGINES[engine.name] = engine
+    return engine
+
+
+def get_engine(engine=None):
+    """
+    参数:
+        engine: 引擎名称或MatchEngine实例，为None时使用DEFAULT_ENGINE
+
+    返回:
+        MatchEngine: 匹配引擎
+    """
+    if isinstance(engine, MatchEngine):
+        return engine
+    name = DEFAULT_ENGINE if engine is None else engine
+    if name not in MATCH_ENGINES:
+        raise ValueError(f"不支持的匹配引擎: {name}，可选: {', '.join(MATCH_ENGINES)}")
+    return MATCH_ENGINES[name]
+
+
+register_engine(OpenCVEngine())
+register_engine(FFTEngine())
+register_engine(SADEngine())
+register_engine(AutoEngine())
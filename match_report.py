@@ -0,0 +1,772 @@
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from feature_matcher import (
+    FEATURE_DETECTORS,
+    frame_features,
+    load_template_features,
+    locate_template_features,
+)
+from frame import Frame
+from match_engines import MATCH_ENGINES, AutoEngine, get_engine
+from nms import find_peaks
+from template_matcher import (
+    load_template,
+    load_template_pyramid,
+    locate_template,
+    locate_template_by_features,
+    locate_template_pyramid,
+)
+
+# 两种方式找到的位置相差不超过该像素数时视为同一个位置
+SAME_LOCATION_PIXELS = 2
+
+
+def load_frames(paths):
+    """
+    读取录制的截图：可以是图片文件、包含图片的目录（含子目录），或模拟场景文件(scenario.json)
+
+    参数:
+        paths: 路径列表
+
+    返回:
+        list: [(名称, BGR图像), ...]
+    """
+    frames = []
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            files = sorted(
+                file for pattern in ("*.png", "*.jpg") for file in path.rglob(pattern)
+            )
+        elif path.suffix == ".json":
+            with open(path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+            files = []
+            for screen in config["screens"].values():
+                images = screen.get("images") or [screen["image"]]
+                files.extend(path.parent / image for image in images)
+        else:
+            files = [path]
+
+        for file in files:
+            image = cv2.imread(str(file))
+            if image is None:
+                print(f"跳过无法读取的截图: {file}")
+                continue
+            frames.append((str(file), image))
+    return frames
+
+
+def _best_time(function, repeat):
+    """
+    返回:
+        tuple: (函数返回值, repeat次中最短的耗时(秒))
+    """
+    best = None
+    value = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return value, best
+
+
+def compare_pyramid(frames, templates, threshold=0.8, levels=2, repeat=3):
+    """
+    在录制的截图上比较由粗到细匹配与逐像素匹配的结果和耗时
+
+    参数:
+        frames: load_frames的返回值
+        templates: 模板图片路径列表
+        threshold: 匹配阈值，用于判断两种方式是否都找到/都没找到
+        levels: pyramid方式的缩小层数
+        repeat: 每组重复次数，取最短耗时
+
+    返回:
+        dict: rows(每个截图和模板的比较结果)和summary(汇总)
+    """
+    rows = []
+    for template_path in templates:
+        template = load_template(template_path)
+        if template is None:
+            continue
+        coarse_templates = load_template_pyramid(template_path, levels)
+
+        for frame_name, frame in frames:
+            if frame.shape[0] < template.shape[0] or frame.shape[1] < template.shape[1]:
+                continue
+            (loc, conf), exhaustive_time = _best_time(
+                lambda: locate_template(frame, template), repeat
+            )
+            (pyramid_loc, pyramid_conf), pyramid_time = _best_time(
+                lambda: locate_template_pyramid(frame, template, coarse_templates),
+                repeat,
+            )
+
+            found = conf >= threshold
+            pyramid_found = pyramid_conf >= threshold
+            same_location = (
+                abs(loc[0] - pyramid_loc[0]) <= SAME_LOCATION_PIXELS
+                and abs(loc[1] - pyramid_loc[1]) <= SAME_LOCATION_PIXELS
+            )
+            rows.append(
+                {
+                    "frame": frame_name,
+                    "template": str(template_path),
+                    "exhaustive_ms": exhaustive_time * 1000,
+                    "pyramid_ms": pyramid_time * 1000,
+                    "exhaustive_confidence": conf,
+                    "pyramid_confidence": pyramid_conf,
+                    "found": found,
+                    "pyramid_found": pyramid_found,
+                    # 都没找到时位置无意义，只比较是否都没找到
+                    "agree": found == pyramid_found and (not found or same_location),
+                }
+            )
+
+    if not rows:
+        return {"rows": [], "summary": {}}
+
+    exhaustive_total = sum(row["exhaustive_ms"] for row in rows)
+    pyramid_total = sum(row["pyramid_ms"] for row in rows)
+    summary = {
+        "cases": len(rows),
+        "levels": levels,
+        "threshold": threshold,
+        "exhaustive_ms_mean": exhaustive_total / len(rows),
+        "pyramid_ms_mean": pyramid_total / len(rows),
+        "speedup": exhaustive_total / pyramid_total if pyramid_total > 0 else 0.0,
+        "agreement": sum(row["agree"] for row in rows) / len(rows),
+        "found": sum(row["found"] for row in rows),
+        "pyramid_found": sum(row["pyramid_found"] for row in rows),
+        "missed": sum(row["found"] and not row["pyramid_found"] for row in rows),
+        "max_confidence_drop": max(
+            row["exhaustive_confidence"] - row["pyramid_confidence"] for row in rows
+        ),
+    }
+    return {"rows": rows, "summary": summary}
+
+
+def print_report(report):
+    """
+    打印比较结果
+    """
+    for row in report["rows"]:
+        mark = "一致" if row["agree"] else "不一致"
+        print(
+            f"{Path(row['frame']).name:<24} {Path(row['template']).name:<24} "
+            f"逐像素 {row['exhaustive_ms']:7.2f}ms {row['exhaustive_confidence']:.4f}  "
+            f"由粗到细 {row['pyramid_ms']:7.2f}ms {row['pyramid_confidence']:.4f}  {mark}"
+        )
+
+    summary = report["summary"]
+    if not summary:
+        print("没有可比较的截图和模板")
+        return
+    print(
+        f"共{summary['cases']}组, 缩小{summary['levels']}层: "
+        f"逐像素平均{summary['exhaustive_ms_mean']:.2f}ms, "
+        f"由粗到细平均{summary['pyramid_ms_mean']:.2f}ms, 加速{summary['speedup']:.1f}倍"
+    )
+    print(
+        f"结果一致率{summary['agreement'] * 100:.1f}%, "
+        f"找到 {summary['pyramid_found']}/{summary['found']}, 漏检{summary['missed']}, "
+        f"置信度最大下降{summary['max_confidence_drop']:.4f}"
+    )
+
+
+def _resize(image, scale):
+    if scale == 1.0:
+        return image
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+    return cv2.resize(image, None, fx=scale, fy=scale, interpolation=interpolation)
+
+
+def compare_features(
+    frames, templates, threshold=0.8, scales=(1.0, 0.75, 0.5), detectors=("orb",), repeat=3
+):
+    """
+    把截图缩放到不同比例（模拟分辨率不同的设备），比较固定比例的matchTemplate与特征匹配的
+    准确率和耗时。正确位置由按相同比例缩放后的模板做matchTemplate得到
+
+    参数:
+        frames: load_frames的返回值
+        templates: 模板图片路径列表
+        threshold: 匹配阈值
+        scales: 截图的缩放比例
+        detectors: 比较的特征检测器
+        repeat: 每组重复次数，取最短耗时
+
+    返回:
+        dict: rows(每个截图、比例和模板的比较结果)和summary(按比例和方式汇总)
+    """
+    loaded = []
+    for template_path in templates:
+        template = load_template(template_path)
+        if template is not None:
+            loaded.append((str(template_path), template))
+
+    rows = []
+    detect_ms = {}
+    for frame_name, image in frames:
+        for scale in scales:
+            scaled = _resize(image, scale)
+            for detector in detectors:
+                _, elapsed = _best_time(
+                    lambda: frame_features(Frame(scaled), detector), repeat
+                )
+                detect_ms.setdefault((scale, detector), []).append(elapsed * 1000)
+            shared = {detector: Frame(scaled) for detector in detectors}
+
+            for template_path, template in loaded:
+                truth_template = _resize(template, scale)
+                th, tw = truth_template.shape[:2]
+                if scaled.shape[0] < max(th, template.shape[0]) or scaled.shape[1] < max(
+                    tw, template.shape[1]
+                ):
+                    continue
+                truth_loc, truth_conf = locate_template(scaled, truth_template)
+                truth_center = (truth_loc[0] + tw // 2, truth_loc[1] + th // 2)
+                tolerance = max(SAME_LOCATION_PIXELS, min(tw, th) // 4)
+                row = {
+                    "frame": frame_name,
+                    "scale": scale,
+                    "template": template_path,
+                    "present": truth_conf >= threshold,
+                }
+
+                h, w = template.shape[:2]
+                (loc, conf), elapsed = _best_time(lambda: locate_template(scaled, template), repeat)
+                results = {"fixed": ((loc[0] + w // 2, loc[1] + h // 2), conf, elapsed)}
+                for detector in detectors:
+                    template_features = load_template_features(template_path, detector)
+                    if template_features is None:
+                        results[detector] = (None, 0.0, 0.0)
+                        continue
+                    frame_features(shared[detector], detector)
+                    (loc, conf, _), elapsed = _best_time(
+                        lambda: locate_template_features(
+                            shared[detector], template, template_features, detector
+                        ),
+                        repeat,
+                    )
+                    results[detector] = ((loc[0] + w // 2, loc[1] + h // 2), conf, elapsed)
+
+                for name, (center, conf, elapsed) in results.items():
+                    found = center is not None and conf >= threshold
+                    correct = (
+                        found
+                        and row["present"]
+                        and abs(center[0] - truth_center[0]) <= tolerance
+                        and abs(center[1] - truth_center[1]) <= tolerance
+                    )
+                    row[f"{name}_ms"] = elapsed * 1000
+                    row[f"{name}_confidence"] = conf
+                    row[f"{name}_found"] = found
+                    row[f"{name}_correct"] = correct
+                rows.append(row)
+
+    summary = []
+    for scale in scales:
+        scale_rows = [row for row in rows if row["scale"] == scale]
+        if not scale_rows:
+            continue
+        present = sum(row["present"] for row in scale_rows)
+        for name in ("fixed",) + tuple(detectors):
+            match_ms = sum(row[f"{name}_ms"] for row in scale_rows) / len(scale_rows)
+            frame_ms = 0.0
+            if name != "fixed":
+                times = detect_ms[(scale, name)]
+                frame_ms = sum(times) / len(times)
+            summary.append(
+                {
+                    "scale": scale,
+                    "method": name,
+                    "cases": len(scale_rows),
+                    "present": present,
+                    "correct": sum(row[f"{name}_correct"] for row in scale_rows),
+                    "false_positives": sum(
+                        row[f"{name}_found"] and not row[f"{name}_correct"] for row in scale_rows
+                    ),
+                    "match_ms_mean": match_ms,
+                    "frame_ms_mean": frame_ms,
+                    # 每帧的特征检测由该帧上的所有模板分摊
+                    "lookup_ms_mean": match_ms + frame_ms * len(frames) / max(1, len(scale_rows)),
+                }
+            )
+    return {"rows": rows, "summary": summary}
+
+
+def check_exact_crops(frames, detectors=("orb",), threshold=0.8, size=(80, 60)):
+    """
+    检查features方式（含置信度低于阈值时的逐像素匹配）能否找到按原尺寸从截图中裁出的区域：
+    每张截图裁出纹理最丰富的 size 区域作为模板，在原截图中查找
+
+    参数:
+        frames: load_frames的返回值
+        detectors: 检查的特征检测器
+        threshold: 匹配阈值
+        size: 裁出区域的 (宽, 高)
+
+    返回:
+        list: 每个截图和检测器的检查结果，found为是否在裁出的位置找到
+    """
+    width, height = size
+    rows = []
+    with tempfile.TemporaryDirectory() as folder:
+        for index, (frame_name, image) in enumerate(frames):
+            if image.shape[0] < height or image.shape[1] < width:
+                continue
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            # 按网格取标准差最大的区域，避免裁出纯色区域（位置不唯一）
+            x, y = max(
+                (
+                    (x, y)
+                    for y in range(0, gray.shape[0] - height + 1, height)
+                    for x in range(0, gray.shape[1] - width + 1, width)
+                ),
+                key=lambda loc: float(
+                    gray[loc[1] : loc[1] + height, loc[0] : loc[0] + width].std()
+                ),
+            )
+            crop = image[y : y + height, x : x + width].copy()
+            crop_path = str(Path(folder) / f"crop_{index}.png")
+            cv2.imwrite(crop_path, crop)
+            for detector in detectors:
+                loc, conf = locate_template_by_features(
+                    Frame(image), crop, crop_path, detector, threshold=threshold
+                )
+                rows.append(
+                    {
+                        "frame": frame_name,
+                        "detector": detector,
+                        "location": [x, y],
+                        "confidence": conf,
+                        "found": conf >= threshold
+                        and abs(loc[0] - x) <= SAME_LOCATION_PIXELS
+                        and abs(loc[1] - y) <= SAME_LOCATION_PIXELS,
+                    }
+                )
+    return rows
+
+
+def print_features_report(report):
+    """
+    打印特征匹配的比较结果
+    """
+    for row in report.get("exact_crops", []):
+        print(
+            f"原尺寸裁剪检查 {Path(row['frame']).name:<20} {row['detector']:<6} "
+            f"({row['location'][0]}, {row['location'][1]}) 置信度{row['confidence']:.2f} "
+            f"{'找到' if row['found'] else '没找到'}"
+        )
+    if not report["rows"]:
+        print("没有可比较的截图和模板")
+        return
+    for row in report["rows"]:
+        methods = [key[: -len("_ms")] for key in row if key.endswith("_ms")]
+        cells = "  ".join(
+            f"{name} {row[f'{name}_confidence']:.2f}"
+            f"{'✓' if row[f'{name}_correct'] else ('✗' if row[f'{name}_found'] else '-')}"
+            for name in methods
+        )
+        print(
+            f"{Path(row['frame']).name:<20} x{row['scale']:<5} {Path(row['template']).name:<22} "
+            f"{'存在' if row['present'] else '不存在'}  {cells}"
+        )
+    print("=== 汇总（固定比例fixed为TemplateMatcher当前的matchTemplate） ===")
+    for item in report["summary"]:
+        print(
+            f"缩放x{item['scale']:<5} {item['method']:<6} 找对 {item['correct']}/{item['present']}, "
+            f"误检{item['false_positives']}, 每次查找平均{item['lookup_ms_mean']:.1f}ms"
+            f"(匹配{item['match_ms_mean']:.1f}ms + 每帧特征检测{item['frame_ms_mean']:.1f}ms分摊)"
+        )
+
+
+def compare_engines(
+    frames, templates, engines=("opencv", "fft", "sad"), threshold=0.8, gray=False, repeat=3
+):
+    """
+    在录制的截图上比较各匹配引擎的耗时，以及与cv2.matchTemplate找到的位置是否一致；
+    截图上共用的数据（频谱、积分图）每帧计时一次，按该帧上的模板数分摊
+
+    参数:
+        frames: load_frames的返回值
+        templates: 模板图片路径列表
+        engines: 比较的引擎名称
+        threshold: matchTemplate的匹配度不低于该值时才比较位置
+        gray: 是否用灰度图匹配（image_matcher的方式），否则用BGR图（TemplateMatcher的方式）
+        repeat: 每组重复次数，取最短耗时
+
+    返回:
+        dict: rows(每个截图和模板的比较结果)和summary(按模板尺寸档位汇总，含最快的引擎)
+    """
+    loaded = []
+    for template_path in templates:
+        template = load_template(template_path)
+        if template is not None:
+            if gray:
+                template = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+            loaded.append((str(template_path), template))
+
+    rows = []
+    for frame_name, image in frames:
+        usable = [
+            (path, template)
+            for path, template in loaded
+            if image.shape[0] >= template.shape[0] and image.shape[1] >= template.shape[1]
+        ]
+        if not usable:
+            continue
+        prepared = {}
+        prepare_ms = {}
+        for name in engines:
+            prepared[name] = Frame(image)
+            start = time.perf_counter()
+            get_engine(name).prepare(prepared[name], usable[0][1])
+            prepare_ms[name] = (time.perf_counter() - start) * 1000
+
+        for template_path, template in usable:
+            (reference_loc, reference_conf), _ = _best_time(
+                lambda: get_engine("opencv").locate(Frame(image), template), 1
+            )
+            row = {
+                "frame": frame_name,
+                "template": template_path,
+                "size": [template.shape[1], template.shape[0]],
+                "size_class": list(AutoEngine.size_class(template)),
+                "found": reference_conf >= threshold,
+            }
+            for name in engines:
+                (loc, conf), elapsed = _best_time(
+                    lambda: get_engine(name).locate(prepared[name], template), repeat
+                )
+                row[f"{name}_ms"] = elapsed * 1000
+                row[f"{name}_frame_ms"] = prepare_ms[name] / len(usable)
+                row[f"{name}_confidence"] = conf
+                # matchTemplate没找到时位置无意义；SAD的置信度含义不同，只比较位置
+                row[f"{name}_agree"] = not row["found"] or (
+                    abs(loc[0] - reference_loc[0]) <= SAME_LOCATION_PIXELS
+                    and abs(loc[1] - reference_loc[1]) <= SAME_LOCATION_PIXELS
+                )
+            rows.append(row)
+
+    summary = []
+    for size_class in sorted({tuple(row["size_class"]) for row in rows}):
+        size_rows = [row for row in rows if tuple(row["size_class"]) == size_class]
+        item = {
+            "size_class": list(size_class),
+            # 尺寸档位的宽高范围
+            "size_range": [
+                [1 << (size_class[1] - 1), (1 << size_class[1]) - 1],
+                [1 << (size_class[0] - 1), (1 << size_class[0]) - 1],
+            ],
+            "cases": len(size_rows),
+            "engines": {},
+        }
+        for name in engines:
+            item["engines"][name] = {
+                "lookup_ms_mean": sum(
+                    row[f"{name}_ms"] + row[f"{name}_frame_ms"] for row in size_rows
+                )
+                / len(size_rows),
+                "agreement": sum(row[f"{name}_agree"] for row in size_rows) / len(size_rows),
+            }
+        # 只在位置全部一致的引擎中选最快的
+        agreeing = [
+            name for name, stats in item["engines"].items() if stats["agreement"] == 1.0
+        ] or ["opencv"]
+        item["fastest"] = min(agreeing, key=lambda name: item["engines"][name]["lookup_ms_mean"])
+        summary.append(item)
+    return {"rows": rows, "summary": summary}
+
+
+def print_engines_report(report):
+    """
+    打印各匹配引擎的比较结果
+    """
+    if not report["rows"]:
+        print("没有可比较的截图和模板")
+        return
+    for row in report["rows"]:
+        methods = [key[: -len("_frame_ms")] for key in row if key.endswith("_frame_ms")]
+        cells = "  ".join(
+            f"{name} {row[f'{name}_ms'] + row[f'{name}_frame_ms']:7.1f}ms"
+            f"{'' if row[f'{name}_agree'] else '(位置不一致)'}"
+            for name in methods
+        )
+        print(
+            f"{Path(row['frame']).name:<20} {Path(row['template']).name:<22} "
+            f"{row['size'][0]}x{row['size'][1]:<5} {cells}"
+        )
+    print("=== 按模板尺寸汇总（每次查找平均耗时，含分摊的每帧计算） ===")
+    for item in report["summary"]:
+        (min_w, max_w), (min_h, max_h) = item["size_range"]
+        cells = ", ".join(
+            f"{name} {stats['lookup_ms_mean']:.1f}ms(一致{stats['agreement'] * 100:.0f}%)"
+            for name, stats in item["engines"].items()
+        )
+        print(
+            f"宽{min_w}-{max_w} 高{min_h}-{max_h} ({item['cases']}组): {cells} -> {item['fastest']}"
+        )
+
+
+def dense_frame(template, size=(1920, 1080), spacing=1.5, seed=0):
+    """
+    生成密集匹配的测试截图：模板按网格平铺在噪声背景上，并加入轻微噪声，
+    低阈值时会产生大量超过阈值的位置
+
+    参数:
+        template: BGR模板
+        size: 截图的 (宽, 高)
+        spacing: 相邻模板的间距（模板尺寸的倍数）
+        seed: 随机种子
+
+    返回:
+        tuple: (BGR截图, 平铺的模板数量)
+    """
+    width, height = size
+    rng = np.random.RandomState(seed)
+    frame = cv2.GaussianBlur(rng.randint(0, 255, (height, width, 3), np.uint8), (9, 9), 0)
+    h, w = template.shape[:2]
+    step_x, step_y = max(1, int(w * spacing)), max(1, int(h * spacing))
+    count = 0
+    for top in range(0, height - h + 1, step_y):
+        for left in range(0, width - w + 1, step_x):
+            frame[top:top + h, left:left + w] = template
+            count += 1
+    noise = rng.randint(-8, 9, frame.shape)
+    return np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8), count
+
+
+def legacy_distance_suppression(score_map, threshold, template_size, max_results=10):
+    """
+    image_matcher原来的做法：收集所有超过阈值的位置，排序后逐个与已保留的位置比较距离
+    """
+    width, height = template_size
+    match_indices = np.where(score_map >= threshold)
+    positions = list(zip(match_indices[1], match_indices[0]))
+    positions.sort(key=lambda pos: score_map[pos[1], pos[0]], reverse=True)
+
+    kept = []
+    for pos in positions:
+        overlap = False
+        for other in kept:
+            dist = np.sqrt((pos[0] - other[0]) ** 2 + (pos[1] - other[1]) ** 2)
+            if dist < (width + height) / 4:
+                overlap = True
+                break
+        if not overlap:
+            kept.append(pos)
+            if len(kept) >= max_results:
+                break
+    return [((int(x), int(y)), float(score_map[y, x])) for x, y in kept]
+
+
+def legacy_fill_suppression(score_map, threshold, template_size, max_results=10):
+    """
+    TemplateMatcher原来的做法：反复取最大值，并把该位置周围填充为0
+    """
+    width, height = template_size
+    result = score_map.copy()
+    matches = []
+    for _ in range(max_results):
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if max_val < threshold:
+            break
+        matches.append((max_loc, max_val))
+        cv2.rectangle(
+            result,
+            (max_loc[0] - width // 2, max_loc[1] - height // 2),
+            (max_loc[0] + width // 2, max_loc[1] + height // 2),
+            0,
+            -1,
+        )
+    return matches
+
+
+def compare_nms(frames, templates, thresholds=(0.5, 0.7, 0.9), max_results=50, repeat=3):
+    """
+    在密集匹配的截图上比较向量化非极大值抑制与两种旧做法的耗时和结果数量
+    模板匹配的得分图只计算一次，只统计抑制本身的耗时
+
+    参数:
+        frames: load_frames的返回值
+        templates: 模板图片路径列表
+        thresholds: 比较的阈值
+        max_results: 最大结果数量
+        repeat: 每组重复次数，取最短耗时
+
+    返回:
+        list: 每个截图、模板和阈值的比较结果
+    """
+    suppressors = (
+        ("vectorized", find_peaks),
+        ("legacy_distance", legacy_distance_suppression),
+        ("legacy_fill", legacy_fill_suppression),
+    )
+    rows = []
+    for template_path in templates:
+        template = load_template(template_path)
+        if template is None:
+            continue
+        h, w = template.shape[:2]
+        for frame_name, frame in frames:
+            if frame.shape[0] < h or frame.shape[1] < w:
+                continue
+            score_map = cv2.matchTemplate(frame, template, cv2.TM_CCOEFF_NORMED)
+            for threshold in thresholds:
+                row = {
+                    "frame": frame_name,
+                    "template": str(template_path),
+                    "threshold": threshold,
+                    "above_threshold": int((score_map >= threshold).sum()),
+                }
+                for name, function in suppressors:
+                    matches, elapsed = _best_time(
+                        lambda: function(score_map, threshold, (w, h), max_results), repeat
+                    )
+                    row[f"{name}_ms"] = elapsed * 1000
+                    row[f"{name}_matches"] = len(matches)
+                rows.append(row)
+    return rows
+
+
+def print_nms_report(rows):
+    """
+    打印非极大值抑制的比较结果
+    """
+    if not rows:
+        print("没有可比较的截图和模板")
+        return
+    for row in rows:
+        print(
+            f"{Path(row['frame']).name:<20} {Path(row['template']).name:<20} "
+            f"阈值{row['threshold']:.2f} 超过阈值{row['above_threshold']:>8}个  "
+            f"向量化 {row['vectorized_ms']:8.2f}ms/{row['vectorized_matches']}个  "
+            f"距离循环 {row['legacy_distance_ms']:9.2f}ms/{row['legacy_distance_matches']}个  "
+            f"填充 {row['legacy_fill_ms']:7.2f}ms/{row['legacy_fill_matches']}个"
+        )
+    vectorized = sum(row["vectorized_ms"] for row in rows)
+    distance = sum(row["legacy_distance_ms"] for row in rows)
+    fill = sum(row["legacy_fill_ms"] for row in rows)
+    print(
+        f"共{len(rows)}组: 向量化合计{vectorized:.1f}ms, "
+        f"距离循环合计{distance:.1f}ms({distance / vectorized:.1f}倍), "
+        f"填充合计{fill:.1f}ms({fill / vectorized:.1f}倍)"
+    )
+
+
+def _template_paths(args):
+    templates = list(args.template)
+    for directory in args.template_dir:
+        templates.extend(
+            str(path)
+            for pattern in ("*.png", "*.jpg")
+            for path in sorted(Path(directory).rglob(pattern))
+        )
+    return templates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模板匹配的准确率和速度报告")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    pyramid = subparsers.add_parser("pyramid", help="比较由粗到细匹配与逐像素匹配")
+    pyramid.add_argument("frames", nargs="+", help="截图文件、截图目录或模拟场景文件")
+    pyramid.add_argument("--threshold", type=float, default=0.8)
+    pyramid.add_argument("--levels", type=int, default=2, help="缩小层数")
+
+    nms = subparsers.add_parser("nms", help="在密集匹配的截图上比较非极大值抑制的耗时")
+    nms.add_argument("frames", nargs="*", help="截图文件、截图目录或模拟场景文件")
+    nms.add_argument(
+        "--dense", type=int, default=1, help="每个模板生成的密集平铺截图数量，0表示不生成"
+    )
+    nms.add_argument(
+        "--thresholds", type=float, nargs="+", default=[0.5, 0.7, 0.9], help="比较的阈值"
+    )
+    nms.add_argument("--max-results", type=int, default=50)
+
+    features = subparsers.add_parser(
+        "features", help="在缩放后的截图上比较特征匹配与固定比例的matchTemplate"
+    )
+    features.add_argument("frames", nargs="+", help="截图文件、截图目录或模拟场景文件")
+    features.add_argument("--threshold", type=float, default=0.8)
+    features.add_argument(
+        "--scales", type=float, nargs="+", default=[1.0, 0.75, 0.5], help="截图的缩放比例"
+    )
+    features.add_argument(
+        "--detectors",
+        nargs="+",
+        choices=FEATURE_DETECTORS,
+        default=["orb"],
+        help="比较的特征检测器",
+    )
+
+    engines = subparsers.add_parser("engines", help="按模板尺寸比较各匹配引擎的耗时")
+    engines.add_argument("frames", nargs="+", help="截图文件、截图目录或模拟场景文件")
+    engines.add_argument("--threshold", type=float, default=0.8)
+    engines.add_argument(
+        "--engines",
+        nargs="+",
+        choices=sorted(name for name in MATCH_ENGINES if name != "auto"),
+        default=["opencv", "fft", "sad"],
+        help="比较的引擎",
+    )
+    engines.add_argument("--gray", action="store_true", help="用灰度图匹配（image_matcher的方式）")
+
+    for subparser in (pyramid, nms, features, engines):
+        subparser.add_argument(
+            "--template", "-t", action="append", default=[], help="模板图片，可多次指定"
+        )
+        subparser.add_argument(
+            "--template-dir", action="append", default=[], help="模板目录，使用其中所有图片"
+        )
+        subparser.add_argument("--repeat", type=int, default=3, help="每组重复次数")
+        subparser.add_argument("--json", help="把结果保存为JSON文件")
+
+    args = parser.parse_args()
+    templates = _template_paths(args)
+    frames = load_frames(args.frames)
+
+    if args.command == "pyramid":
+        report = compare_pyramid(frames, templates, args.threshold, args.levels, args.repeat)
+        print_report(report)
+    elif args.command == "features":
+        report = compare_features(
+            frames, templates, args.threshold, args.scales, args.detectors, args.repeat
+        )
+        report["exact_crops"] = check_exact_crops(frames, args.detectors, args.threshold)
+        print_features_report(report)
+    elif args.command == "engines":
+        report = compare_engines(
+            frames, templates, args.engines, args.threshold, args.gray, args.repeat
+        )
+        print_engines_report(report)
+    else:
+        for template_path in templates:
+            template = load_template(template_path)
+            for seed in range(args.dense if template is not None else 0):
+                image, count = dense_frame(template, seed=seed)
+                frames.append((f"dense_{Path(template_path).stem}_{seed}({count})", image))
+        report = compare_nms(
+            frames, templates, args.thresholds, args.max_results, args.repeat
+        )
+        print_nms_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import cv2
+import numpy as np
+
+# 两个匹配框的交并比超过该值时视为同一个目标
+DEFAULT_MAX_OVERLAP = 0.3
+
+# 超过阈值的位置多于该数量时，先用膨胀找出局部最大值再做非极大值抑制
+DILATE_MIN_CANDIDATES = 4096
+
+
+def find_peaks(score_map, threshold, template_size, max_results=10, max_overlap=DEFAULT_MAX_OVERLAP):
+    """
+    在模板匹配的得分图中找出所有匹配：候选位置较多时先用膨胀找出局部最大值，再按交并比做非极大值抑制
+    TemplateMatcher和image_matcher的多目标查找共用，结果语义一致
+
+    参数:
+        score_map: cv2.matchTemplate的结果，越大越好（SQDIFF方法需先转换，如 1 - result）
+        threshold: 得分阈值
+        template_size: 模板的 (宽, 高)
+        max_results: 最大结果数量，为None时不限制
+        max_overlap: 交并比超过该值的两个匹配只保留得分高的一个
+
+    返回:
+        list: [((x, y), 得分), ...]，(x, y)为匹配区域左上角，按得分从高到低排列
+    """
+    width, height = template_size
+    if cv2.minMaxLoc(score_map)[1] < threshold:
+        return []
+    ys, xs = np.nonzero(score_map >= threshold)
+    if not len(xs):
+        return []
+
+    if len(xs) > DILATE_MIN_CANDIDATES:
+        # 候选位置很多时先只保留局部最大值：膨胀后与原值相等的位置是邻域内的最大值。
+        # 邻域取模板的四分之一，邻域内的其他位置与最大值的交并比一定超过阈值，本来就会被抑制；
+        # 只膨胀包含候选位置的范围
+        radius_x, radius_y = width // 4, height // 4
+        top, left = max(0, ys.min() - radius_y), max(0, xs.min() - radius_x)
+        bottom, right = ys.max() + radius_y + 1, xs.max() + radius_x + 1
+        kernel = np.ones((2 * radius_y + 1, 2 * radius_x + 1), np.uint8)
+        dilated = cv2.dilate(score_map[top:bottom, left:right], kernel)
+        local_max = score_map[ys, xs] >= dilated[ys - top, xs - left]
+        ys, xs = ys[local_max], xs[local_max]
+    scores = score_map[ys, xs]
+
+    order = np.argsort(-scores, kind="stable")
+    xs, ys, scores = xs[order], ys[order], scores[order]
+    keep = suppress(xs, ys, width, height, max_overlap, max_results)
+    return [((int(xs[i]), int(ys[i])), float(scores[i])) for i in keep]
+
+
+def suppress(xs, ys, width, height, max_overlap=DEFAULT_MAX_OVERLAP, max_results=None):
+    """
+    非极大值抑制：依次保留得分最高的框，去掉与它交并比超过max_overlap的框
+
+    参数:
+        xs, ys: 匹配框左上角坐标（numpy数组），已按得分从高到低排列
+        width, height: 匹配框的宽高，所有框相同或与xs等长的数组
+        max_overlap: 交并比阈值
+        max_results: 最多保留的数量，为None时不限制
+
+    返回:
+        list: 保留的下标
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    x2 = xs + width
+    y2 = ys + height
+    areas = (x2 - xs) * (y2 - ys)
+
+    keep = []
+    order = np.arange(len(xs))
+    while order.size:
+        i = order[0]
+        keep.append(int(i))
+        if max_results is not None and len(keep) >= max_results:
+            break
+        rest = order[1:]
+        overlap_w = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(xs[i], xs[rest]))
+        overlap_h = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(ys[i], ys[rest]))
+        intersection = overlap_w * overlap_h
+        iou = intersection / (areas[i] + areas[rest] - intersection)
+        order = rest[iou <= max_overlap]
+    return keep
@@ -1,10 +1,20 @@
 from adb_controller import ADBController
+from change_detector import FrameChangeDetector
 from template_matcher import TemplateMatcher
 import time
 
 # 创建实例
 adb = ADBController()  # 使用我们之前创建的ADB控制器
-matcher = TemplateMatcher(adb)
+# 轮询回营按钮等画面基本不变时，不再重复匹配
+matcher = TemplateMatcher(adb, change_detector=FrameChangeDetector())
+
+
+def _default_device():
+    """
+    返回:
+        tuple: 模块级共用的 (ADB控制器, 图像匹配器)，避免每次调用都新建连接和重新探测设备
+    """
+    return adb, matcher
 
 
 def click_img_postion(img_path, threshold=0.8):
@@ -65,31 +75,37 @@ def click_img_postion(img_path, threshold=0.8):
 # click_img_postion("./night_world/x.png", threshold=0.8)
 
 
-def attack_night_village(iterations=1):
+def attack_night_village(iterations=1, adb_controller=None, template_matcher=None):
     """
     执行夜世界的进攻操作
 
     参数:
         iterations: 执行次数，默认为1次
+        adb_controller: 使用的ADB控制器，为None时使用模块级共用的控制器
+        template_matcher: 使用的图像匹配器，为None时使用共用的匹配器或根据adb_controller新建
 
     返回:
         bool: 操作是否成功
     """
     try:
         # 初始化ADB控制器和图像匹配器
-        adb = ADBController()
-        matcher = TemplateMatcher(adb)
-
-        # 定义点击图像位置的函数
-        def click_img_postion(image_path, threshold=0.8, max_retries=3):
-            for _ in range(max_retries):
-                result = matcher.find_template(image_path, threshold=threshold)
-                if result:
-                    center_x, center_y, _ = result
-                    adb.tap(center_x, center_y)
-                    print(f"点击图像 {image_path} 成功")
-                    return True
-                time.sleep(1)
+        if adb_controller is None:
+            adb, matcher = _default_device()
+        else:
+            adb, matcher = adb_controller, None
+        if template_matcher is not None:
+            matcher = template_matcher
+        elif matcher is None:
+            matcher = TemplateMatcher(adb)
+
+        # 定义点击图像位置的函数：图像出现即点击，最多等待timeout秒
+        def click_img_postion(image_path, threshold=0.8, timeout=3):
+            result = matcher.wait_for(image_path, timeout, threshold)
+            if result:
+                center_x, center_y, _ = result
+                adb.tap(center_x, center_y)
+                print(f"点击图像 {image_path} 成功")
+                return True
             print(f"未找到图像 {image_path}")
             return False
 
@@ -100,7 +116,8 @@ def attack_night_village(iterations=1):
             # 点击进攻按钮
             click_img_postion("./night_world/jingong.png", threshold=0.8)
             click_img_postion("./night_world/li-ji-xun-zhao.png", threshold=0.8)
-            time.sleep(5)  # 等待5秒，确保操作生效
+            # 等待进入战斗画面（英雄图标出现），最多等待10秒
+            matcher.wait_for("./night_world/ying-xiong.png", timeout=10, threshold=0.8)
 
             # 找到英雄图片的坐标并部署
             result = matcher.find_template(
@@ -115,43 +132,58 @@ def attack_night_village(iterations=1):
                 put_position_y = center_y - 260
                 adb.tap(put_position_x, put_position_y)  # 再次点击以确保操作生效
 
-                # 部署更多英雄
+                # 部署更多英雄（坐标相对进攻按钮的位置，按钮位置每次相差几个像素也不必重新上传宏脚本）
                 new_x = center_x
+                deploy = adb.macro("night_deploy_heroes", origin=(center_x, center_y))
                 for item in range(0, 6):
                     new_x += 120
-                    adb.tap(new_x, center_y)
-                    adb.tap(put_position_x, put_position_y)
-                    adb.tap(new_x, center_y)
+                    deploy.tap(new_x, center_y)
+                    deploy.tap(put_position_x, put_position_y)
+                    deploy.tap(new_x, center_y)
+                adb.run_macro(deploy)
 
                 # 等待战斗结束或激活英雄技能
                 start_time = time.time()
                 waite_time = 120
                 while time.time() - start_time < waite_time:  # 最长等待2分钟
-                    r = click_img_postion("./night_world/hui_ying.png", threshold=0.8)
-                    if r:
+                    # 回营按钮或第二场按钮出现即返回，都没有出现时最多等待5秒
+                    found_path, r = matcher.wait_any(
+                        ["./night_world/hui_ying.png", "./night_world/2.png"],
+                        timeout=5,
+                        threshold=0.8,
+                    )
+                    if found_path == "./night_world/hui_ying.png":
+                        adb.tap(r[0], r[1])
                         break
                     else:
                         # 激活英雄技能
                         adb.tap(center_x, center_y)
 
-                    r = click_img_postion("./night_world/2.png", threshold=0.8)
                     # 打赢了，继续打第二场
                     waite_time = waite_time + 120
-                    if r:
+                    if found_path == "./night_world/2.png":
+                        adb.tap(r[0], r[1])
                         new_x = center_x
+                        deploy = adb.macro(
+                            "night_deploy_second", origin=(center_x, center_y)
+                        )
                         for item in range(0, 8):
-                            adb.tap(new_x, center_y)
-                            adb.tap(put_position_x, put_position_y)
-                            adb.tap(new_x, center_y)
+                            deploy.tap(new_x, center_y)
+                            deploy.tap(put_position_x, put_position_y)
+                            deploy.tap(new_x, center_y)
                             new_x += 120
-                    time.sleep(5)
+                        adb.run_macro(deploy)
 
                 # 获取屏幕大小
                 x, y = adb.get_screen_size()
-                time.sleep(2)  # 等待2秒，确保操作生效
-                # 向下滑动查找水车
-                adb.swipe(500, 500, 500, 900, duration=200)  # 向下滑动
-                time.sleep(2)  # 等待2秒，确保滑动生效
+                # 向下滑动查找水车：等待2秒确保操作生效，滑动后再等待2秒确保滑动生效，
+                # 等待由设备端完成
+                adb.run_macro(
+                    adb.macro("night_pan_to_water_cart")
+                    .sleep(2)
+                    .swipe(500, 500, 500, 900, duration=200)
+                    .sleep(2)
+                )
 
                 # 点击水车、收集和关闭按钮
                 if click_img_postion("./adb_spec/adb_shuiche.png", threshold=0.6):
@@ -173,4 +205,14 @@ def attack_night_village(iterations=1):
 
 
 if __name__ == "__main__":
+    # 启动时预先解码所有模板
+    matcher.preload_templates("night_world", "adb_spec")
     attack_night_village(iterations=3)
+
+    # 模板历史位置的命中率和加速效果
+    if matcher.spatial_priors is not None:
+        matcher.spatial_priors.print_summary()
+    # 画面没有变化而跳过匹配的比例
+    matcher.change_detector.print_summary()
+    # 各等待的耗时
+    matcher.wait_stats.print_summary()
@@ -0,0 +1,141 @@
+import threading
+
+from adb_metrics import LatencyHistogram
+
+
+class PollingPolicy:
+    """
+    等待画面出现/消失时的轮询节奏：开始时间隔很短，之后按倍数逐渐拉长，
+    同时限制匹配耗时占总时间的比例，匹配较慢时自动延长间隔
+
+    使用示例:
+        policy = PollingPolicy(initial_interval=1.0, max_interval=3.0)
+        matcher.wait_for("./zhushijie/hui-ying.png", timeout=240, policy=policy)
+    """
+
+    def __init__(self, initial_interval=0.2, max_interval=2.0, backoff=1.5, cpu_budget=0.3):
+        """
+        参数:
+            initial_interval: 第一次查找失败后的等待间隔(秒)
+            max_interval: 等待间隔的上限(秒)
+            backoff: 每次查找失败后间隔乘以该倍数
+            cpu_budget: 匹配耗时占等待总时间的最大比例(0-1]，一次查找耗时t秒时至少等待
+                t * (1 - cpu_budget) / cpu_budget 秒
+        """
+        if not 0 < cpu_budget <= 1:
+            raise ValueError(f"cpu_budget必须在(0, 1]之间: {cpu_budget}")
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.cpu_budget = cpu_budget
+
+    def intervals(self):
+        """
+        依次生成每次查找失败后的基本等待间隔
+
+        返回:
+            generator: 等待间隔(秒)
+        """
+        interval = self.initial_interval
+        while True:
+            yield interval
+            interval = min(self.max_interval, interval * self.backoff)
+
+    def delay(self, interval, poll_seconds):
+        """
+        参数:
+            interval: intervals生成的基本等待间隔
+            poll_seconds: 刚才一次查找（截图和匹配）的耗时
+
+        返回:
+            float: 实际等待的秒数，满足CPU占用比例的限制
+        """
+        return max(interval, poll_seconds * (1 - self.cpu_budget) / self.cpu_budget)
+
+
+class WaitStats:
+    """
+    按等待类型和模板统计wait_for/wait_until_gone/wait_any的次数、成功率、
+    等待时长分布(p50/p90/p99)、查找次数和匹配耗时占比
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, kind, name, succeeded, elapsed, polls, poll_seconds):
+        """
+        记录一次等待
+
+        参数:
+            kind: 等待类型，"wait_for"、"wait_until_gone" 或 "wait_any"
+            name: 模板路径（wait_any为多个模板路径的组合）
+            succeeded: 是否在超时前满足条件
+            elapsed: 等待总时长(秒)
+            polls: 查找次数
+            poll_seconds: 查找（截图和匹配）的总耗时(秒)
+        """
+        with self._lock:
+            stats = self._stats.get((kind, name))
+            if stats is None:
+                stats = self._stats[(kind, name)] = {
+                    "waits": 0,
+                    "succeeded": 0,
+                    "polls": 0,
+                    "poll_seconds": 0.0,
+                    "wait_seconds": 0.0,
+                    "latency": LatencyHistogram(),
+                }
+            stats["waits"] += 1
+            stats["succeeded"] += 1 if succeeded else 0
+            stats["polls"] += polls
+            stats["poll_seconds"] += poll_seconds
+            stats["wait_seconds"] += elapsed
+            stats["latency"].record(int(elapsed * 1_000_000))
+
+    def stats(self):
+        """
+        返回:
+            dict: {"等待类型 模板": 统计}，统计包括等待次数、超时次数、平均查找次数、
+                  等待时长的平均值和分位数(ms)，以及匹配耗时占等待时间的比例
+        """
+        with self._lock:
+            result = {}
+            for (kind, name), stats in self._stats.items():
+                latency = stats["latency"]
+                waits = stats["waits"]
+                result[f"{kind} {name}"] = {
+                    "waits": waits,
+                    "succeeded": stats["succeeded"],
+                    "timeouts": waits - stats["succeeded"],
+                    "polls_mean": stats["polls"] / waits,
+                    "mean_ms": stats["wait_seconds"] * 1000 / waits,
+                    "p50_ms": latency.percentile(0.5) / 1000,
+                    "p90_ms": latency.percentile(0.9) / 1000,
+                    "p99_ms": latency.percentile(0.99) / 1000,
+                    "max_ms": latency.max / 1000,
+                    "cpu_ratio": (
+                        stats["poll_seconds"] / stats["wait_seconds"]
+                        if stats["wait_seconds"] > 0
+                        else 0.0
+                    ),
+                }
+            return result
+
+    def print_summary(self):
+        """
+        按等待总时长从高到低打印各等待的统计
+        """
+        rows = self.stats()
+        if not rows:
+            return
+        print("=== 等待统计 ===")
+        for name, row in sorted(
+            rows.items(), key=lambda item: item[1]["mean_ms"] * item[1]["waits"], reverse=True
+        ):
+            print(
+                f"  {name}: {row['waits']}次, 超时{row['timeouts']}, "
+                f"平均{row['mean_ms']:.0f}ms, p50 {row['p50_ms']:.0f}ms, p99 {row['p99_ms']:.0f}ms, "
+                f"平均查找{row['polls_mean']:.1f}次, 匹配耗时占比{row['cpu_ratio'] * 100:.0f}%"
+            )
+
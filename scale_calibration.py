@@ -0,0 +1,231 @@
+import json
+import os
+import statistics
+import threading
+from pathlib import Path
+
+# 缩放比例校准结果的缓存文件，按屏幕分辨率和模板路径保存
+DEFAULT_CALIBRATION_PATH = Path(__file__).parent / ".cache" / "scale_calibration.json"
+
+
+class ScaleCalibration:
+    """
+    按屏幕分辨率记录每个模板的最佳缩放比例并保存到磁盘
+    同一分辨率下模板的缩放比例固定不变，校准之后只需匹配该比例及相邻的两个比例，
+    不再每次尝试全部比例；还没有校准的模板使用同一分辨率下其他模板比例的中位数
+
+    在校准比例附近连续几次没找到或匹配度明显下降时，重新尝试全部比例（重新校准）
+
+    使用示例:
+        calibration = ScaleCalibration()
+        find_image_in_screenshot("./zhushijie/hui-ying.png", calibration=calibration)
+        ...
+        calibration.print_summary()
+    """
+
+    def __init__(self, path=DEFAULT_CALIBRATION_PATH, recalibrate_after=5, confidence_drop=0.1):
+        """
+        参数:
+            path: 缓存文件路径，为None时不保存到磁盘
+            recalibrate_after: 在校准比例附近连续多少次没找到（或匹配度下降）后重新尝试全部比例
+            confidence_drop: 匹配度比校准时低出该值时视为匹配度下降
+        """
+        self.path = Path(path) if path else None
+        self.recalibrate_after = recalibrate_after
+        self.confidence_drop = confidence_drop
+        self._lock = threading.Lock()
+        self._calibrations = self._read_all()
+        self._misses = {}
+        self._stats = {"calibrated": 0, "full": 0, "recalibrations": 0, "matches": 0}
+
+    @staticmethod
+    def _key(template_path):
+        return os.path.normpath(str(template_path))
+
+    @staticmethod
+    def resolution_key(resolution):
+        """
+        返回:
+            str: 分辨率的键，如 "1920x1080"
+        """
+        width, height = resolution
+        return f"{int(width)}x{int(height)}"
+
+    def _read_all(self):
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, resolution_key):
+        if self.path is None:
+            return
+        # 重新读取文件再更新一个分辨率，多个进程共用同一个文件时不会互相覆盖
+        calibrations = self._read_all()
+        calibrations[resolution_key] = self._calibrations.get(resolution_key, {})
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再替换，避免多个进程同时写入时损坏文件
+        temp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(calibrations, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+    def display_scale(self, resolution):
+        """
+        返回:
+            float: 该分辨率下所有模板缩放比例的中位数，还没有校准过时返回None
+        """
+        with self._lock:
+            display = self._calibrations.get(self.resolution_key(resolution))
+            return display["scale"] if display else None
+
+    def scale(self, template_path, resolution):
+        """
+        获取模板的校准缩放比例
+
+        参数:
+            template_path: 模板图片路径
+            resolution: 截图的 (宽, 高)
+
+        返回:
+            float: 该模板的校准比例，没有时返回同一分辨率下所有模板比例的中位数，
+                   该分辨率还没有校准过时返回None
+        """
+        with self._lock:
+            display = self._calibrations.get(self.resolution_key(resolution))
+            if not display:
+                return None
+            entry = display["templates"].get(self._key(template_path))
+            return entry["scale"] if entry else display["scale"]
+
+    def candidates(self, template_path, resolution, grid):
+        """
+        获取需要尝试的缩放比例：缩放比例列表中最接近校准比例的一个及其左右相邻的比例
+
+        参数:
+            template_path: 模板图片路径
+            resolution: 截图的 (宽, 高)
+            grid: 全部缩放比例（从小到大）
+
+        返回:
+            set: 需要尝试的缩放比例，还没有校准时返回None（需要尝试全部比例）
+        """
+        scale = self.scale(template_path, resolution)
+        if scale is None:
+            return None
+        index = min(range(len(grid)), key=lambda i: abs(grid[i] - scale))
+        return set(grid[max(0, index - 1) : index + 2])
+
+    def record(self, template_path, resolution, scale, confidence):
+        """
+        记录模板在尝试全部比例（或校准）后找到的最佳缩放比例，并更新该分辨率的整体比例
+
+        参数:
+            template_path: 模板图片路径
+            resolution: 截图的 (宽, 高)
+            scale: 最佳缩放比例
+            confidence: 该比例下的匹配度，之后低出confidence_drop时视为匹配度下降
+        """
+        resolution_key = self.resolution_key(resolution)
+        key = self._key(template_path)
+        with self._lock:
+            display = self._calibrations.setdefault(
+                resolution_key, {"scale": scale, "templates": {}}
+            )
+            previous = display["templates"].get(key)
+            display["templates"][key] = {"scale": scale, "confidence": round(confidence, 4)}
+            display["scale"] = statistics.median(
+                entry["scale"] for entry in display["templates"].values()
+            )
+            self._misses.pop((resolution_key, key), None)
+            if previous is None or previous["scale"] != scale:
+                if previous is not None:
+                    print(f"模板缩放比例变化: {key}, {previous['scale']} -> {scale}")
+                self._save(resolution_key)
+
+    def observe(self, template_path, resolution, best, threshold):
+        """
+        记录一次只尝试校准比例附近的匹配结果
+
+        参数:
+            template_path: 模板图片路径
+            resolution: 截图的 (宽, 高)
+            best: 匹配结果（含value和scale），没有可用比例时为None
+            threshold: 匹配阈值
+
+        返回:
+            bool: 是否需要重新尝试全部比例
+        """
+        resolution_key = self.resolution_key(resolution)
+        key = self._key(template_path)
+        with self._lock:
+            self._stats["calibrated"] += 1
+            entry = self._calibrations.get(resolution_key, {}).get("templates", {}).get(key)
+            expected = entry["confidence"] - self.confidence_drop if entry else threshold
+            if best is not None and best["value"] >= max(threshold, expected):
+                self._stats["matches"] += 1
+                self._misses.pop((resolution_key, key), None)
+                # 新模板或相邻比例匹配得更好时更新
+                changed = entry is None or entry["scale"] != best["scale"]
+            else:
+                misses = self._misses.get((resolution_key, key), 0) + 1
+                if misses < self.recalibrate_after:
+                    self._misses[(resolution_key, key)] = misses
+                    return False
+                self._misses.pop((resolution_key, key), None)
+                self._stats["recalibrations"] += 1
+                return True
+        if changed:
+            self.record(template_path, resolution, best["scale"], best["value"])
+        return False
+
+    def count_full(self):
+        """
+        记录一次尝试全部比例的查找
+        """
+        with self._lock:
+            self._stats["full"] += 1
+
+    def forget(self, resolution=None):
+        """
+        丢弃一个分辨率的校准结果，resolution为None时全部丢弃
+        """
+        with self._lock:
+            if resolution is None:
+                keys = list(self._calibrations)
+            else:
+                keys = [self.resolution_key(resolution)]
+            for resolution_key in keys:
+                self._calibrations.pop(resolution_key, None)
+                self._save(resolution_key)
+
+    def stats(self):
+        """
+        返回:
+            dict: 只尝试校准比例的查找次数(calibrated)及其中找到的次数(matches)、
+                  尝试全部比例的查找次数(full)、重新校准次数(recalibrations)，
+                  以及各分辨率的整体缩放比例(scales)
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["scales"] = {
+                resolution_key: display["scale"]
+                for resolution_key, display in self._calibrations.items()
+                if display
+            }
+            return stats
+
+    def print_summary(self):
+        """
+        打印校准比例和查找次数
+        """
+        stats = self.stats()
+        scales = ", ".join(f"{key}: {scale:.2f}" for key, scale in sorted(stats["scales"].items()))
+        print(
+            f"缩放比例校准: {scales or '无'}, 按校准比例查找{stats['calibrated']}次"
+            f"(找到{stats['matches']}次), 尝试全部比例{stats['full']}次, "
+            f"重新校准{stats['recalibrations']}次"
+        )
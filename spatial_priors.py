@@ -0,0 +1,278 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+# 模板位置缓存文件，按分辨率和模板路径保存
+DEFAULT_PRIORS_PATH = Path(__file__).parent / ".cache" / "spatial_priors.json"
+
+# 查找结果的来源
+SOURCES = ("window", "fallback", "full")
+
+
+class SpatialPriors:
+    """
+    按模板记录历史匹配位置（区分设备分辨率），生成带边距的查找窗口并保存到磁盘
+    按钮等界面元素几乎总在同一位置，之后的查找先只匹配窗口，窗口内没找到时再查找整个屏幕
+
+    连续几次在窗口外找到模板时认为界面布局发生了变化，重新学习位置
+
+    使用示例:
+        priors = SpatialPriors()
+        matcher = TemplateMatcher(adb, spatial_priors=priors)
+        ...
+        priors.print_summary()
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_PRIORS_PATH,
+        padding=40,
+        min_samples=2,
+        relearn_after=3,
+        max_window_ratio=0.5,
+    ):
+        """
+        参数:
+            path: 缓存文件路径，为None时不保存到磁盘
+            padding: 查找窗口在历史位置外扩的边距(像素)
+            min_samples: 找到多少次之后才开始使用查找窗口
+            relearn_after: 连续多少次在窗口外找到后放弃旧位置，按新位置重新学习
+            max_window_ratio: 窗口面积超过屏幕面积的该比例时不再使用窗口（位置太分散）
+        """
+        self.path = Path(path) if path else None
+        self.padding = padding
+        self.min_samples = min_samples
+        self.relearn_after = relearn_after
+        self.max_window_ratio = max_window_ratio
+        self._lock = threading.Lock()
+        self._priors = self._read_all()
+        self._stats = {}
+
+    @staticmethod
+    def _key(template_path):
+        return os.path.normpath(str(template_path))
+
+    @staticmethod
+    def resolution_key(resolution):
+        """
+        返回:
+            str: 分辨率的键，如 "1920x1080"
+        """
+        width, height = resolution
+        return f"{int(width)}x{int(height)}"
+
+    def _read_all(self):
+        if self.path is None:
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, resolution_key, key):
+        if self.path is None:
+            return
+        # 重新读取文件再更新一个模板，多个进程共用同一个文件时不会互相覆盖
+        priors = self._read_all()
+        prior = self._priors.get(resolution_key, {}).get(key)
+        templates = priors.setdefault(resolution_key, {})
+        if prior is None:
+            templates.pop(key, None)
+        else:
+            templates[key] = prior
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再替换，避免多个进程同时写入时损坏文件
+        temp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(priors, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+    def window(self, template_path, resolution):
+        """
+        获取模板的查找窗口
+
+        参数:
+            template_path: 模板图片路径
+            resolution: 整屏截图的 (宽, 高)
+
+        返回:
+            tuple: (x, y, 宽, 高)，还没有足够的历史位置或位置太分散时返回None
+        """
+        with self._lock:
+            prior = self._priors.get(self.resolution_key(resolution), {}).get(
+                self._key(template_path)
+            )
+            if prior is None or prior["samples"] < self.min_samples:
+                return None
+            return self._padded(prior["bbox"], resolution)
+
+    def _padded(self, bbox, resolution):
+        """
+        返回:
+            tuple: 外扩边距后的窗口 (x, y, 宽, 高)，窗口无效或太大时返回None
+        """
+        width, height = resolution
+        left, top, right, bottom = bbox
+        left = max(0, left - self.padding)
+        top = max(0, top - self.padding)
+        right = min(width, right + self.padding)
+        bottom = min(height, bottom + self.padding)
+        if right <= left or bottom <= top:
+            return None
+        if (right - left) * (bottom - top) > self.max_window_ratio * width * height:
+            return None
+        return (left, top, right - left, bottom - top)
+
+    def record(self, template_path, resolution, source, rect=None, elapsed=0.0):
+        """
+        记录一次查找结果
+
+        参数:
+            template_path: 模板图片路径
+            resolution: 整屏截图的 (宽, 高)
+            source: "window" 在窗口内查找，"fallback" 窗口内没找到后查找整屏，
+                "full" 没有窗口直接查找整屏
+            rect: 找到的模板区域 (左, 上, 右, 下)，没找到时为None
+            elapsed: 本次查找耗时(秒)
+        """
+        if source not in SOURCES:
+            raise ValueError(f"未知的查找来源: {source}")
+        key = self._key(template_path)
+        resolution_key = self.resolution_key(resolution)
+
+        with self._lock:
+            stats = self._stats.setdefault((resolution_key, key), _new_stats())
+            stats[f"{source}_searches"] += 1
+            stats[f"{source}_seconds"] += elapsed
+            if rect is not None:
+                stats[f"{source}_found"] += 1
+            changed = self._update(resolution, key, source, rect, stats)
+            if changed:
+                self._save(resolution_key, key)
+
+    def _update(self, resolution, key, source, rect, stats):
+        """
+        根据查找结果更新历史位置
+
+        返回:
+            bool: 历史位置是否变化（需要保存）
+        """
+        if rect is None:
+            return False
+        templates = self._priors.setdefault(self.resolution_key(resolution), {})
+        prior = templates.get(key)
+        rect = [int(value) for value in rect]
+
+        if prior is None:
+            templates[key] = {"bbox": rect, "samples": 1, "moved": 0}
+            return True
+
+        if source == "window":
+            prior["moved"] = 0
+            prior["samples"] += 1
+            return prior["samples"] == self.min_samples
+
+        if source == "fallback":
+            prior["moved"] += 1
+            if prior["moved"] >= self.relearn_after:
+                # 连续在窗口外找到，认为界面布局变化，丢弃旧位置
+                print(f"模板位置发生变化，重新学习: {key}, 新位置{rect}")
+                stats["relearned"] += 1
+                templates[key] = {"bbox": rect, "samples": 1, "moved": 0}
+                return True
+
+        # 扩大范围以包含新位置
+        left, top, right, bottom = prior["bbox"]
+        bbox = [
+            min(left, rect[0]),
+            min(top, rect[1]),
+            max(right, rect[2]),
+            max(bottom, rect[3]),
+        ]
+        if self._padded(bbox, resolution) is None:
+            if source == "full":
+                # 还没有启用窗口，直接按新位置重新开始
+                templates[key] = {"bbox": rect, "samples": 1, "moved": 0}
+                return True
+            # 位置太分散，窗口没有意义，保留旧窗口，等待连续几次窗口外找到后重新学习
+            return False
+        prior["samples"] += 1
+        changed = bbox != prior["bbox"] or prior["samples"] == self.min_samples
+        prior["bbox"] = bbox
+        return changed
+
+    def forget(self, template_path=None):
+        """
+        丢弃一个模板在所有分辨率下的历史位置，template_path为None时全部丢弃
+        """
+        with self._lock:
+            for resolution_key, templates in self._priors.items():
+                keys = list(templates) if template_path is None else [self._key(template_path)]
+                for key in keys:
+                    if templates.pop(key, None) is not None:
+                        self._save(resolution_key, key)
+
+    def stats(self):
+        """
+        返回:
+            dict: {"分辨率 模板": 统计}，统计包括窗口命中/未命中次数、
+                  窗口外找到次数(fallback_found，持续增加说明界面布局变化)、重新学习次数，
+                  以及窗口查找和整屏查找的平均耗时和加速倍数
+        """
+        with self._lock:
+            result = {}
+            for (resolution_key, key), stats in self._stats.items():
+                row = dict(stats)
+                row["window_hits"] = stats["window_found"]
+                row["window_misses"] = stats["window_searches"] - stats["window_found"]
+                row["window_hit_rate"] = (
+                    stats["window_found"] / stats["window_searches"]
+                    if stats["window_searches"]
+                    else 0.0
+                )
+                window_ms = _mean_ms(stats["window_seconds"], stats["window_searches"])
+                full_ms = _mean_ms(
+                    stats["full_seconds"] + stats["fallback_seconds"],
+                    stats["full_searches"] + stats["fallback_searches"],
+                )
+                row["window_ms_mean"] = window_ms
+                row["full_ms_mean"] = full_ms
+                row["speedup"] = full_ms / window_ms if window_ms > 0 and full_ms > 0 else 0.0
+                result[f"{resolution_key} {key}"] = row
+            return result
+
+    def print_summary(self):
+        """
+        打印各模板的窗口命中率和耗时
+        """
+        rows = self.stats()
+        if not rows:
+            return
+        print("=== 模板位置统计 ===")
+        for name, row in sorted(rows.items()):
+            line = (
+                f"  {name}: 窗口命中{row['window_hits']}/{row['window_searches']}"
+                f"({row['window_hit_rate'] * 100:.0f}%), 窗口外找到{row['fallback_found']}, "
+                f"整屏查找{row['full_searches'] + row['fallback_searches']}次, "
+                f"窗口平均{row['window_ms_mean']:.1f}ms, 整屏平均{row['full_ms_mean']:.1f}ms"
+            )
+            if row["speedup"]:
+                line += f", 加速{row['speedup']:.1f}倍"
+            if row["relearned"]:
+                line += f", 重新学习{row['relearned']}次"
+            print(line)
+
+
+def _new_stats():
+    stats = {"relearned": 0}
+    for source in SOURCES:
+        stats[f"{source}_searches"] = 0
+        stats[f"{source}_found"] = 0
+        stats[f"{source}_seconds"] = 0.0
+    return stats
+
+
+def _mean_ms(seconds, count):
+    return seconds * 1000 / count if count else 0.0
@@ -1,58 +1,444 @@
 import cv2
 import numpy as np
 import os
+import contextlib
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from adb_controller import ADBController
+from feature_matcher import FEATURE_DETECTORS, load_template_features, locate_template_features
+from frame import Frame, as_frame
+from frame_grabber import FrameGrabber
+from match_engines import get_engine
+from nms import find_peaks, suppress
+from polling import PollingPolicy, WaitStats
+from spatial_priors import SpatialPriors
+from template_store import TEMPLATE_STORE
 import time
 from pathlib import Path
 
 
+# TemplateMatcher支持的匹配方式
+MATCH_MODES = ("exhaustive", "pyramid", "features")
+
+# find_templates的查找方式
+BATCH_MODES = ("all", "first", "best")
+
+# pyramid方式下缩小后的模板最短边不小于该值，太小的模板减少缩小层数
+PYRAMID_MIN_TEMPLATE_SIZE = 8
+
+
 class TemplateMatcher:
     """
     子图匹配类，用于在手机屏幕截图中查找指定的模板图片
     依赖于ADBController类获取手机截图
     """
 
-    def __init__(self, adb_controller=None):
+    def __init__(
+        self,
+        adb_controller=None,
+        capture_mode="raw",
+        match_semaphore=None,
+        template_regions=None,
+        match_mode="exhaustive",
+        pyramid_levels=2,
+        spatial_priors=None,
+        match_workers=None,
+        change_detector=None,
+        polling_policy=None,
+        feature_detector="orb",
+        engine="opencv",
+        template_engines=None,
+    ):
         """
         初始化子图匹配器
 
         参数:
             adb_controller: ADBController实例，如果为None则自动创建一个
+            capture_mode: 截图方式，"raw"/"png" 通过exec-out直接读取到内存，
+                "file" 为旧方式（截图保存到设备再pull到本地磁盘）
+            match_semaphore: 限制同时进行模板匹配的信号量（如multiprocessing.Semaphore），
+                多设备并行时用于控制CPU占用，为None时不限制
+            template_regions: 按模板指定的查找区域 {模板路径: [x, y, 宽, 高]}，
+                或保存该字典的JSON文件路径；指定了区域的模板只截取并匹配该区域
+            match_mode: 匹配方式，"exhaustive" 在原图上逐像素匹配，
+                "pyramid" 先在缩小的截图上找出候选位置，再只在候选位置附近按原图精确匹配
+                "features" 用特征点匹配（每帧检测一次特征点，所有模板共用），
+                可以找到缩放或旋转过的模板，适合分辨率与模板截图时不同的设备
+            pyramid_levels: pyramid方式下的缩小层数，每层缩小一半（2表示缩小到1/4）
+            spatial_priors: 模板历史位置(SpatialPriors)，find_template先在历史位置附近查找，
+                没找到时再查找整屏；为None时使用默认缓存文件，为False时不使用
+            match_workers: find_templates并行匹配的线程数，默认为CPU核数(最多8个)
+            change_detector: 画面变化检测(FrameChangeDetector)，匹配区域的画面与上次匹配时相同时
+                直接返回上次的结果，不再匹配；为None时不使用
+            polling_policy: wait_for/wait_until_gone/wait_any默认的轮询节奏(PollingPolicy)，
+                为None时使用默认参数
+            feature_detector: features方式下的特征检测器，"orb"、"akaze" 或 "sift"
+            engine: exhaustive方式下计算匹配得分的引擎(见match_engines)，"opencv"、"fft"、"sad"、
+                "auto"（按模板尺寸计时选择最快的引擎）或register_engine注册的引擎
+            template_engines: 按模板指定的引擎 {模板路径: 引擎名称}，如像素完全一致的小图标使用"sad"
         """
+        if match_mode not in MATCH_MODES:
+            raise ValueError(f"不支持的匹配方式: {match_mode}，可选: {', '.join(MATCH_MODES)}")
+        if feature_detector not in FEATURE_DETECTORS:
+            raise ValueError(
+                f"不支持的特征检测器: {feature_detector}，可选: {', '.join(FEATURE_DETECTORS)}"
+            )
         self.adb = adb_controller if adb_controller else ADBController()
-        self.last_screenshot = None
+        self.capture_mode = capture_mode
+        self.match_semaphore = match_semaphore
+        self.match_mode = match_mode
+        self.pyramid_levels = pyramid_levels
+        self.feature_detector = feature_detector
+        self.engine = get_engine(engine).name
+        self.template_engines = {}
+        for template_path, template_engine in (template_engines or {}).items():
+            self.set_template_engine(template_path, template_engine)
+        if spatial_priors is None:
+            spatial_priors = SpatialPriors()
+        self.spatial_priors = spatial_priors or None
+        self.match_workers = match_workers or min(8, os.cpu_count() or 1)
+        self.change_detector = change_detector
+        self.polling_policy = polling_policy or PollingPolicy()
+        self.wait_stats = WaitStats()
+        self._executor = None
+        self.last_frame = None
         self.last_screenshot_path = None
         self.last_screenshot_time = 0
+        self.last_frame_id = None
+        self.frame_grabber = None
+        self.template_regions = {}
+        # 区域截图连续失败的次数，达到3次后不再尝试，直接截取整屏后裁剪
+        self._region_failures = 0
+        # 内存截图连续失败的次数，达到3次后改为文件截图
+        self._capture_failures = 0
+        if template_regions:
+            self.load_template_regions(template_regions)
 
-    def take_screenshot(
+    def start_frame_grabber(self, buffer_size=3, interval=0.0):
+        """
+        启动后台截图线程，之后take_screenshot直接从环形缓冲区取帧
+
+        参数:
+            buffer_size: 缓冲区保存的帧数
+            interval: 两次截图之间的最小间隔(秒)
+
+        返回:
+            FrameGrabber: 后台截图线程对象
+        """
+        if self.capture_mode not in ("raw", "png"):
+            raise ValueError("后台截图需要raw或png截图方式")
+        if self.frame_grabber is None:
+            self.frame_grabber = FrameGrabber(
+                self._capture_in_memory, buffer_size, interval
+            )
+        self.frame_grabber.start()
+        return self.frame_grabber
+
+    def stop_frame_grabber(self):
+        """
+        停止后台截图线程，恢复按需截图
+        """
+        if self.frame_grabber is not None:
+            self.frame_grabber.stop()
+            self.frame_grabber = None
+
+    def close(self):
+        """
+        停止后台截图线程并关闭find_templates的匹配线程池；长时间运行的进程中不再使用匹配器时调用
+        """
+        self.stop_frame_grabber()
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    @property
+    def last_screenshot(self):
+        """
+        最近一次截图的BGR图像，没有截图时为None
+        """
+        return self.last_frame.bgr if self.last_frame is not None else None
+
+    def take_frame(
         self, force_new=False, save_path=Path(__file__).parent / "tmp_img_save_folder/screenshot.png"
     ):
         """
-        获取手机屏幕截图
+        获取手机屏幕截图，返回Frame（灰度图、金字塔等派生图像按需生成并在同一帧内共用）
 
         参数:
-            force_new: 是否强制获取新截图，否则可能返回缓存的截图(3秒内)
-            save_path: 截图保存路径，默认为临时文件
+            force_new: 是否强制获取新截图，否则可能返回缓存的截图(3秒内)；
+                启用后台截图时返回最近一次输入操作之后的最新帧
+            save_path: 文件截图方式下截图的保存路径
 
         返回:
-            numpy.ndarray: 截图的OpenCV格式图像对象
+            Frame: 截图，失败时返回None
         """
         current_time = time.time()
 
+        if self.frame_grabber is not None and self.frame_grabber.is_running():
+            # 取最近一次输入操作之后的帧，避免点击后拿到旧画面；强制新截图时取当前时刻之后的帧
+            after = self.adb.last_input_time
+            if force_new:
+                after = max(after, current_time)
+            # 最新一帧已在该时刻之后时直接使用，否则等待第一个满足的新帧；
+            # 不取缓冲区中最早满足的帧，那一帧可能已落后好几个截图间隔
+            grabbed = self.frame_grabber.latest()
+            if grabbed is None or grabbed[1] < after:
+                grabbed = self.frame_grabber.get_frame_after(after)
+            if grabbed is not None:
+                self.last_frame_id, self.last_screenshot_time, frame = grabbed
+                frame.frame_id = self.last_frame_id
+                self.last_frame = frame
+                self.last_screenshot_path = None
+                return frame
+            print("等待后台截图超时，改为直接截图")
+
         # 如果强制获取新截图或者缓存已过期(超过3秒)或者没有缓存
         if (
             force_new
             or current_time - self.last_screenshot_time > 3
-            or self.last_screenshot is None
+            or self.last_frame is None
         ):
 
+            if self.capture_mode in ("raw", "png"):
+                try:
+                    self.last_frame = self._capture_in_memory()
+                    self.last_screenshot_path = None
+                    self.last_screenshot_time = current_time
+                    self._capture_failures = 0
+                    return self.last_frame
+                except Exception as e:
+                    # 偶尔失败时只有这一次用文件截图，连续失败才切换截图方式
+                    print(f"内存截图失败，本次改用文件截图: {str(e)}")
+                    self._capture_failures += 1
+                    if self._capture_failures >= 3:
+                        print(f"内存截图连续失败{self._capture_failures}次，之后改用文件截图")
+                        self.capture_mode = "file"
+
             # 使用ADB截图
             screenshot_path = self.adb.screenshot(save_path)
             self.last_screenshot_path = screenshot_path
-            self.last_screenshot = cv2.imread(screenshot_path)
+            image = cv2.imread(screenshot_path)
+            self.last_frame = Frame(image, "bgr", current_time) if image is not None else None
             self.last_screenshot_time = current_time
 
-        return self.last_screenshot
+        return self.last_frame
+
+    def take_screenshot(
+        self, force_new=False, save_path=Path(__file__).parent / "tmp_img_save_folder/screenshot.png"
+    ):
+        """
+        获取手机屏幕截图
+
+        参数:
+            force_new: 是否强制获取新截图，否则可能返回缓存的截图(3秒内)；
+                启用后台截图时返回最近一次输入操作之后的最新帧
+            save_path: 截图保存路径，默认为临时文件
+
+        返回:
+            numpy.ndarray: 截图的OpenCV格式图像对象
+        """
+        frame = self.take_frame(force_new, save_path)
+        return frame.bgr if frame is not None else None
+
+    def preload_templates(self, *directories):
+        """
+        启动时预先解码模板目录中的所有图片
+
+        参数:
+            directories: 模板目录，如 "zhushijie"、"night_world"
+
+        返回:
+            int: 加载的模板数量
+        """
+        return sum(TEMPLATE_STORE.preload(directory) for directory in directories)
+
+    def load_template_regions(self, regions):
+        """
+        设置按模板的查找区域
+
+        参数:
+            regions: {模板路径: [x, y, 宽, 高]}，或保存该字典的JSON文件路径
+        """
+        if isinstance(regions, (str, Path)):
+            with open(regions, "r", encoding="utf-8") as f:
+                regions = json.load(f)
+        for template_path, region in regions.items():
+            self.set_template_region(template_path, region)
+
+    def set_template_region(self, template_path, region):
+        """
+        设置一个模板的查找区域
+
+        参数:
+            template_path: 模板图片路径
+            region: (x, y, 宽, 高)，为None时取消
+        """
+        key = os.path.normpath(str(template_path))
+        if region is None:
+            self.template_regions.pop(key, None)
+        else:
+            self.template_regions[key] = tuple(int(value) for value in region)
+
+    def set_template_engine(self, template_path, engine):
+        """
+        设置一个模板使用的匹配引擎
+
+        参数:
+            template_path: 模板图片路径
+            engine: 引擎名称，为None时取消（使用engine参数指定的引擎）
+        """
+        key = os.path.normpath(str(template_path))
+        if engine is None:
+            self.template_engines.pop(key, None)
+        else:
+            self.template_engines[key] = get_engine(engine).name
+
+    def _engine_for(self, template_path, engine=None):
+        """
+        返回:
+            str: 本次调用指定的引擎，没有时为模板指定的引擎，都没有时为engine参数指定的引擎
+        """
+        if engine is not None:
+            return get_engine(engine).name
+        return self.template_engines.get(os.path.normpath(str(template_path)), self.engine)
+
+    def take_screenshot_region(self, region, force_new=False):
+        """
+        获取屏幕上一个矩形区域的截图
+
+        参数:
+            region: (x, y, 宽, 高)
+            force_new: 是否强制获取新截图
+
+        返回:
+            tuple: (BGR格式的区域图像, (区域左上角x, 区域左上角y))，截图失败时图像为None
+        """
+        frame = self.take_frame_region(region, force_new)
+        x, y = region[:2]
+        if frame is None:
+            return None, (max(0, x), max(0, y))
+        return frame.bgr, frame.offset
+
+    def take_frame_region(self, region, force_new=False):
+        """
+        获取屏幕上一个矩形区域的截图
+        有可用的整屏截图（后台截图或3秒内的缓存）时直接裁剪，
+        否则在raw截图方式下只传输该区域所在的行；其他截图方式截取整屏后裁剪
+
+        参数:
+            region: (x, y, 宽, 高)
+            force_new: 是否强制获取新截图
+
+        返回:
+            Frame: 区域帧，offset为区域左上角在整屏中的坐标，截图失败时返回None
+        """
+        x, y, width, height = region
+        left, top = max(0, x), max(0, y)
+        right, bottom = x + width, y + height
+
+        grabber_running = self.frame_grabber is not None and self.frame_grabber.is_running()
+        cache_valid = (
+            not force_new
+            and self.last_frame is not None
+            and time.time() - self.last_screenshot_time <= 3
+        )
+        if (
+            self.capture_mode == "raw"
+            and self._region_failures < 3
+            and not grabber_running
+            and not cache_valid
+        ):
+            try:
+                captured_at = time.time()
+                image = self.adb.screenshot_region(left, top, right - left, bottom - top)
+                self._region_failures = 0
+                return Frame(image, "rgb", captured_at, offset=(left, top))
+            except Exception as e:
+                print(f"区域截图失败，改用整屏截图: {str(e)}")
+                self._region_failures += 1
+
+        frame = self.take_frame(force_new=force_new)
+        if frame is None:
+            return None
+        return frame.crop(region)
+
+    def _screenshot_for(self, template_path, template, region, force_new):
+        """
+        按模板获取用于匹配的截图：指定了区域（参数或按模板的配置）时只截取该区域
+
+        返回:
+            tuple: (Frame, (偏移x, 偏移y))，失败时Frame为None
+        """
+        if region is None:
+            region = self.template_regions.get(os.path.normpath(str(template_path)))
+        if region is None:
+            frame = self.take_frame(force_new=force_new)
+        else:
+            frame = self.take_frame_region(region, force_new)
+
+        offset = frame.offset if frame is not None else (0, 0)
+        if frame is None:
+            print("错误: 无法获取手机屏幕截图")
+            return None, offset
+        h, w = template.shape[:2]
+        if frame.height < h or frame.width < w:
+            print(f"错误: 查找区域小于模板图片: {template_path}, 区域{region}")
+            return None, offset
+        return frame, offset
+
+    def _match_slot(self):
+        """
+        返回:
+            上下文管理器：设置了match_semaphore时占用一个匹配名额
+        """
+        if self.match_semaphore is None:
+            return contextlib.nullcontext()
+        return self.match_semaphore
+
+    def _locate(self, template_path, screenshot, template, method, engine=None, threshold=None):
+        """
+        按match_mode查找模板的最佳匹配，screenshot为Frame或BGR数组；
+        engine为exhaustive方式（及features方式无法使用时）的匹配引擎；
+        features方式的置信度低于threshold（特征匹配失败）时改用engine逐像素匹配
+
+        返回:
+            tuple: (匹配区域左上角坐标, 置信度)
+        """
+        if self.match_mode == "pyramid":
+            coarse_templates = load_template_pyramid(template_path, self.pyramid_levels)
+            return locate_template_pyramid(screenshot, template, coarse_templates, method)
+        if self.match_mode == "features":
+            return locate_template_by_features(
+                screenshot, template, template_path, self.feature_detector, method, threshold, engine
+            )
+        return locate_template(screenshot, template, method, engine)
+
+    def _locate_all(
+        self, template_path, screenshot, template, method, threshold, max_results, engine=None
+    ):
+        """
+        按match_mode查找模板的所有匹配；features方式不适合查找多个相同目标，按原图逐像素匹配
+
+        返回:
+            list: [(匹配区域左上角坐标, 置信度), ...]，按置信度从高到低排列
+        """
+        if self.match_mode == "pyramid":
+            coarse_templates = load_template_pyramid(template_path, self.pyramid_levels)
+            return locate_all_templates_pyramid(
+                screenshot, template, coarse_templates, method, threshold, max_results
+            )
+        return locate_all_templates(screenshot, template, method, threshold, max_results, engine)
+
+    def _capture_in_memory(self):
+        """
+        通过exec-out截图，颜色转换在第一次使用时进行
+
+        返回:
+            Frame: 截图
+        """
+        captured_at = time.time()
+        image = self.adb.screenshot_array(self.capture_mode)
+        return Frame.from_capture(image, self.capture_mode, captured_at)
 
     def find_template(
         self,
@@ -61,6 +447,8 @@ class TemplateMatcher:
         method=cv2.TM_CCOEFF_NORMED,
         force_new_screenshot=False,
         debug_image=None,
+        region=None,
+        engine=None,
     ):
         """
         在手机屏幕截图中查找模板图片
@@ -70,44 +458,27 @@ class TemplateMatcher:
             threshold: 匹配阈值，0-1之间，越高要求越精确
             method: OpenCV模板匹配的方法
             force_new_screenshot: 是否强制获取新截图
-            debug_image: 调试图像保存路径，如果为None则不保存
+            debug_image: 调试图像保存路径，如果为None则不保存（指定区域时只保存该区域）
+            region: 查找区域 (x, y, 宽, 高)，为None时使用按模板的配置，没有配置时查找整个屏幕
+            engine: 本次使用的匹配引擎，为None时使用按模板的配置或engine参数
 
         返回:
             成功时返回元组 (center_x, center_y, confidence)，表示匹配位置的中心点坐标和置信度
             失败时返回 None
         """
-        if not os.path.exists(template_path):
-            print(f"错误: 模板图片不存在: {template_path}")
-            return None
-
-        # 读取模板图片
-        template = cv2.imread(template_path)
+        template = load_template(template_path)
         if template is None:
-            print(f"错误: 无法读取模板图片: {template_path}")
-            return None
-
-        # 获取手机屏幕截图
-        screenshot = self.take_screenshot(force_new=force_new_screenshot)
-        if screenshot is None:
-            print("错误: 无法获取手机屏幕截图")
             return None
 
         # 获取模板尺寸
         h, w = template.shape[:2]
 
-        # 执行模板匹配
-        result = cv2.matchTemplate(screenshot, template, method)
-
-        # 获取最佳匹配位置和置信度
-        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-
-        # 根据所选方法确定最佳匹配位置
-        if method in [cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED]:
-            confidence = 1 - min_val  # 这些方法是越小越好
-            match_loc = min_loc
-        else:
-            confidence = max_val  # 其他方法是越大越好
-            match_loc = max_loc
+        attempt = self._search_template(
+            template_path, template, threshold, method, force_new_screenshot, region, engine
+        )
+        if attempt is None:
+            return None
+        screenshot, offset, match_loc, confidence, _ = attempt
 
         # 如果置信度低于阈值，认为匹配失败
         if confidence < threshold:
@@ -118,38 +489,152 @@ class TemplateMatcher:
             return None
 
         # 计算匹配区域的中心点
-        center_x = match_loc[0] + w // 2
-        center_y = match_loc[1] + h // 2
+        center_x = offset[0] + match_loc[0] + w // 2
+        center_y = offset[1] + match_loc[1] + h // 2
 
         # 如果需要，保存调试图像
         if debug_image:
-            debug_img = screenshot.copy()
-            # 绘制矩形框和中心点
-            cv2.rectangle(
-                debug_img,
-                match_loc,
-                (match_loc[0] + w, match_loc[1] + h),
-                (0, 255, 0),
-                2,
-            )
-            cv2.circle(debug_img, (center_x, center_y), 5, (0, 0, 255), -1)
-            cv2.putText(
-                debug_img,
-                f"Conf: {confidence:.4f}",
-                (match_loc[0], match_loc[1] - 10),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                (0, 255, 0),
-                2,
-            )
+            debug_img = screenshot.bgr.copy()
+            draw_match(debug_img, match_loc, w, h, f"Conf: {confidence:.4f}")
             cv2.imwrite(debug_image, debug_img)
             print(f"调试图像已保存到: {debug_image}")
 
         print(f"模板匹配成功: 中心点=({center_x}, {center_y}), 置信度={confidence:.4f}")
         return (center_x, center_y, confidence)
 
+    def _search_template(
+        self, template_path, template, threshold, method, force_new, region, engine=None
+    ):
+        """
+        截图并查找模板的最佳匹配：没有指定区域时先在模板历史位置附近查找，没找到再查找整屏
+
+        返回:
+            tuple: 与_match_in相同，截图失败时返回None
+        """
+        h, w = template.shape[:2]
+
+        # 没有指定区域时，先在模板历史位置附近查找
+        resolution, window = self._prior_window(template_path, region)
+        attempt = None
+        if window is not None:
+            attempt = self._match_in(
+                template_path, template, window, force_new, method, engine, threshold
+            )
+            found = attempt is not None and attempt[3] >= threshold
+            self._record_prior(template_path, resolution, "window", attempt, found, w, h)
+            if not found:
+                attempt = None
+
+        if attempt is None:
+            attempt = self._match_in(
+                template_path, template, region, force_new, method, engine, threshold
+            )
+            if attempt is None:
+                return None
+            if resolution is not None:
+                self._record_prior(
+                    template_path,
+                    resolution,
+                    "full" if window is None else "fallback",
+                    attempt,
+                    attempt[3] >= threshold,
+                    w,
+                    h,
+                )
+
+        return attempt
+
+    def _match_in(
+        self, template_path, template, region, force_new, method, engine=None, threshold=None
+    ):
+        """
+        截图（或截取区域）并查找模板的最佳匹配
+
+        返回:
+            tuple: (Frame, 偏移, 匹配区域左上角坐标, 置信度, 耗时秒数)，截图失败时返回None
+        """
+        start_time = time.perf_counter()
+        screenshot, offset = self._screenshot_for(template_path, template, region, force_new)
+        if screenshot is None:
+            return None
+        engine = self._engine_for(template_path, engine)
+        match_loc, confidence = self._locate_unless_unchanged(
+            ("best", template_path, method, engine, threshold),
+            screenshot,
+            lambda: self._locate(template_path, screenshot, template, method, engine, threshold),
+        )
+        return screenshot, offset, match_loc, confidence, time.perf_counter() - start_time
+
+    def _locate_unless_unchanged(self, key, frame, locate):
+        """
+        执行匹配；启用画面变化检测且该区域的画面与上次匹配时相同时，直接返回上次的结果
+
+        参数:
+            key: 匹配的标识，与截图区域一起区分缓存的结果
+            frame: 匹配使用的截图（或区域截图）
+            locate: 执行匹配的函数
+        """
+        if self.change_detector is None:
+            with self._match_slot():
+                return locate()
+        key = key + (
+            frame.offset,
+            frame.shape[:2],
+            self.match_mode,
+            self.pyramid_levels,
+            self.feature_detector,
+        )
+        unchanged, result, signature = self.change_detector.lookup(key, frame)
+        if unchanged:
+            return result
+        with self._match_slot():
+            result = locate()
+        self.change_detector.store(key, signature, result)
+        return result
+
+    def _prior_window(self, template_path, region):
+        """
+        获取模板历史位置的查找窗口；指定了区域（参数或按模板的配置）时不使用历史位置
+
+        返回:
+            tuple: (整屏分辨率, 查找窗口)，不使用历史位置时分辨率为None，没有窗口时窗口为None
+        """
+        if self.spatial_priors is None or region is not None:
+            return None, None
+        if os.path.normpath(str(template_path)) in self.template_regions:
+            return None, None
+        try:
+            profile = self.adb.get_profile()
+        except Exception as e:
+            print(f"获取设备分辨率失败，不使用模板历史位置: {str(e)}")
+            return None, None
+        resolution = (profile.raw_width, profile.raw_height)
+        if not all(resolution):
+            resolution = profile.screen_size
+        if not all(resolution):
+            return None, None
+        return resolution, self.spatial_priors.window(template_path, resolution)
+
+    def _record_prior(self, template_path, resolution, source, attempt, found, w, h):
+        """
+        把查找结果记录到模板历史位置
+        """
+        rect = None
+        if found:
+            _, offset, match_loc, _, _ = attempt
+            left = offset[0] + match_loc[0]
+            top = offset[1] + match_loc[1]
+            rect = (left, top, left + w, top + h)
+        elapsed = attempt[4] if attempt is not None else 0.0
+        self.spatial_priors.record(template_path, resolution, source, rect, elapsed)
+
     def find_and_tap(
-        self, template_path, threshold=0.8, force_new_screenshot=False, debug_image=None
+        self,
+        template_path,
+        threshold=0.8,
+        force_new_screenshot=False,
+        debug_image=None,
+        region=None,
     ):
         """
         查找模板图片并点击其中心点
@@ -159,6 +644,7 @@ class TemplateMatcher:
             threshold: 匹配阈值
             force_new_screenshot: 是否强制获取新截图
             debug_image: 调试图像保存路径
+            region: 查找区域 (x, y, 宽, 高)，见find_template
 
         返回:
             成功时返回 True，失败时返回 False
@@ -168,6 +654,7 @@ class TemplateMatcher:
             threshold,
             force_new_screenshot=force_new_screenshot,
             debug_image=debug_image,
+            region=region,
         )
 
         if result:
@@ -178,6 +665,324 @@ class TemplateMatcher:
         else:
             return False
 
+    def wait_for(
+        self,
+        template_path,
+        timeout=10,
+        threshold=0.8,
+        region=None,
+        method=cv2.TM_CCOEFF_NORMED,
+        policy=None,
+    ):
+        """
+        等待模板出现，出现后立即返回；每次都获取新截图，查找间隔由policy决定
+
+        参数:
+            template_path: 模板图片路径
+            timeout: 最长等待时间(秒)
+            threshold: 匹配阈值
+            region: 查找区域 (x, y, 宽, 高)，见find_template
+            method: OpenCV模板匹配的方法
+            policy: 轮询节奏(PollingPolicy)，为None时使用polling_policy
+
+        返回:
+            成功时返回元组 (center_x, center_y, confidence)，超时返回None
+        """
+        template = load_template(template_path)
+        if template is None:
+            return None
+        h, w = template.shape[:2]
+
+        def check():
+            attempt = self._search_template(template_path, template, threshold, method, True, region)
+            if attempt is None or attempt[3] < threshold:
+                return False, None
+            _, offset, match_loc, confidence, _ = attempt
+            center_x = offset[0] + match_loc[0] + w // 2
+            center_y = offset[1] + match_loc[1] + h // 2
+            return True, (center_x, center_y, confidence)
+
+        found, result, elapsed = self._wait("wait_for", template_path, check, timeout, policy)
+        if found:
+            print(f"等待到模板: {template_path}, 用时{elapsed:.1f}秒, 中心点=({result[0]}, {result[1]})")
+        else:
+            print(f"等待模板出现超时({timeout}秒): {template_path}")
+        return result
+
+    def wait_until_gone(
+        self,
+        template_path,
+        timeout=10,
+        threshold=0.8,
+        region=None,
+        method=cv2.TM_CCOEFF_NORMED,
+        policy=None,
+    ):
+        """
+        等待模板消失（如点击按钮后等待界面切换），消失后立即返回
+
+        参数:
+            与wait_for相同
+
+        返回:
+            bool: 超时前模板是否已经消失
+        """
+        template = load_template(template_path)
+        if template is None:
+            return True
+
+        def check():
+            attempt = self._search_template(template_path, template, threshold, method, True, region)
+            return attempt is not None and attempt[3] < threshold, None
+
+        gone, _, elapsed = self._wait("wait_until_gone", template_path, check, timeout, policy)
+        if gone:
+            print(f"模板已消失: {template_path}, 用时{elapsed:.1f}秒")
+        else:
+            print(f"等待模板消失超时({timeout}秒): {template_path}")
+        return gone
+
+    def wait_any(
+        self,
+        template_paths,
+        timeout=10,
+        threshold=0.8,
+        method=cv2.TM_CCOEFF_NORMED,
+        policy=None,
+    ):
+        """
+        等待多个模板中的任意一个出现；每次截一张图并行查找所有模板，见find_templates
+
+        参数:
+            template_paths: 模板图片路径列表
+            其余参数与wait_for相同
+
+        返回:
+            tuple: (模板路径, (center_x, center_y, confidence))，超时返回 (None, None)
+        """
+        template_paths = list(template_paths)
+
+        def check():
+            frame = self.take_frame(force_new=True)
+            if frame is None:
+                return False, (None, None)
+            results = self._find_all_in_frame(template_paths, frame, threshold, method, True)
+            for template_path, result in results.items():
+                if result is not None:
+                    return True, (template_path, result)
+            return False, (None, None)
+
+        name = " | ".join(sorted(str(path) for path in template_paths))
+        found, result, elapsed = self._wait("wait_any", name, check, timeout, policy)
+        if found:
+            print(f"等待到模板: {result[0]}, 用时{elapsed:.1f}秒")
+        else:
+            print(f"等待 {len(template_paths)} 个模板出现超时({timeout}秒)")
+        return result
+
+    def _wait(self, kind, name, check, timeout, policy):
+        """
+        按轮询节奏反复执行check，直到条件满足或超时；超时前最后一刻还会再检查一次
+
+        参数:
+            kind: 等待类型，用于统计
+            name: 等待的模板，用于统计
+            check: 返回 (条件是否满足, 结果) 的函数
+            timeout: 最长等待时间(秒)
+            policy: 轮询节奏，为None时使用polling_policy
+
+        返回:
+            tuple: (条件是否满足, 最后一次check的结果, 等待秒数)
+        """
+        policy = policy or self.polling_policy
+        intervals = policy.intervals()
+        start_time = time.monotonic()
+        deadline = start_time + timeout
+        polls = 0
+        poll_seconds = 0.0
+        while True:
+            poll_start = time.monotonic()
+            done, result = check()
+            now = time.monotonic()
+            polls += 1
+            poll_seconds += now - poll_start
+            if done or now >= deadline:
+                break
+            delay = policy.delay(next(intervals), now - poll_start)
+            time.sleep(min(delay, deadline - now))
+
+        elapsed = time.monotonic() - start_time
+        self.wait_stats.record(kind, name, done, elapsed, polls, poll_seconds)
+        return done, result, elapsed
+
+    def find_templates(
+        self,
+        template_paths,
+        threshold=0.8,
+        mode="all",
+        method=cv2.TM_CCOEFF_NORMED,
+        force_new_screenshot=False,
+        engine=None,
+    ):
+        """
+        只截一次图，用线程池并行查找多个模板（matchTemplate执行时会释放GIL）
+
+        参数:
+            template_paths: 模板图片路径列表
+            threshold: 匹配阈值
+            mode: "all" 查找全部模板；"first" 任意一个模板找到后立即返回，不再等待其余模板；
+                "best" 查找全部模板，只保留置信度最高的一个
+            method: OpenCV模板匹配的方法
+            force_new_screenshot: 是否强制获取新截图
+            engine: 本次所有模板使用的匹配引擎，为None时各模板使用按模板的配置或engine参数
+
+        返回:
+            dict: {模板路径: (center_x, center_y, confidence)}，未找到、未查找或未被选中的模板为None
+        """
+        if mode not in BATCH_MODES:
+            raise ValueError(f"不支持的查找方式: {mode}，可选: {', '.join(BATCH_MODES)}")
+        template_paths = list(template_paths)
+        results = {template_path: None for template_path in template_paths}
+
+        frame = self.take_frame(force_new=force_new_screenshot)
+        if frame is None:
+            print("错误: 无法获取手机屏幕截图")
+            return results
+        results.update(
+            self._find_all_in_frame(
+                template_paths, frame, threshold, method, mode == "first", engine
+            )
+        )
+
+        found = {path: result for path, result in results.items() if result is not None}
+        if mode == "best" and found:
+            best_path = max(found, key=lambda path: found[path][2])
+            results = {path: None for path in template_paths}
+            results[best_path] = found[best_path]
+            found = {best_path: found[best_path]}
+
+        for template_path, (center_x, center_y, confidence) in found.items():
+            print(
+                f"模板匹配成功: {template_path}, 中心点=({center_x}, {center_y}), 置信度={confidence:.4f}"
+            )
+        if not found:
+            print(f"{len(template_paths)} 个模板均未找到匹配")
+        return results
+
+    def _find_all_in_frame(
+        self, template_paths, frame, threshold, method, first=False, engine=None
+    ):
+        """
+        在同一张截图中并行查找多个模板
+
+        参数:
+            first: 是否任意一个模板找到后立即返回，不再等待其余模板
+
+        返回:
+            dict: {模板路径: (center_x, center_y, confidence)}，未找到的模板为None，
+                  first为True时未查找的模板不在结果中
+        """
+        resolution = (frame.width, frame.height)
+        results = {}
+        executor = self._batch_executor()
+        futures = {
+            executor.submit(
+                self._find_in_frame, template_path, frame, threshold, method, resolution, engine
+            ): template_path
+            for template_path in template_paths
+        }
+        try:
+            for future in as_completed(futures):
+                template_path = futures[future]
+                results[template_path] = future.result()
+                if first and results[template_path] is not None:
+                    break
+        finally:
+            # first方式下取消还没开始的匹配
+            for future in futures:
+                future.cancel()
+        return results
+
+    def _batch_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.match_workers, thread_name_prefix="template-match"
+            )
+        return self._executor
+
+    def _find_in_frame(self, template_path, frame, threshold, method, resolution, engine=None):
+        """
+        在给定的整屏截图中查找一个模板：指定了区域时只匹配该区域，
+        否则先匹配历史位置窗口，没找到再匹配整屏
+
+        返回:
+            tuple: (center_x, center_y, confidence)，未找到时返回None
+        """
+        template = load_template(template_path)
+        if template is None:
+            return None
+        h, w = template.shape[:2]
+
+        region = self.template_regions.get(os.path.normpath(str(template_path)))
+        window = None
+        if region is None and self.spatial_priors is not None:
+            window = self.spatial_priors.window(template_path, resolution)
+
+        attempt = None
+        if window is not None:
+            attempt = self._match_frame(
+                template_path, template, frame, window, method, engine, threshold
+            )
+            found = attempt is not None and attempt[3] >= threshold
+            self._record_prior(template_path, resolution, "window", attempt, found, w, h)
+            if not found:
+                attempt = None
+
+        if attempt is None:
+            attempt = self._match_frame(
+                template_path, template, frame, region, method, engine, threshold
+            )
+            if attempt is None:
+                return None
+            if region is None and self.spatial_priors is not None:
+                self._record_prior(
+                    template_path,
+                    resolution,
+                    "full" if window is None else "fallback",
+                    attempt,
+                    attempt[3] >= threshold,
+                    w,
+                    h,
+                )
+
+        _, offset, match_loc, confidence, _ = attempt
+        if confidence < threshold:
+            return None
+        return (offset[0] + match_loc[0] + w // 2, offset[1] + match_loc[1] + h // 2, confidence)
+
+    def _match_frame(
+        self, template_path, template, frame, region, method, engine=None, threshold=None
+    ):
+        """
+        在已有截图（或其中的区域）中查找模板的最佳匹配，不截图
+
+        返回:
+            tuple: 与_match_in相同，区域小于模板时返回None
+        """
+        start_time = time.perf_counter()
+        if region is not None:
+            frame = frame.crop(region)
+        h, w = template.shape[:2]
+        if frame.height < h or frame.width < w:
+            return None
+        engine = self._engine_for(template_path, engine)
+        match_loc, confidence = self._locate_unless_unchanged(
+            ("best", template_path, method, engine, threshold),
+            frame,
+            lambda: self._locate(template_path, frame, template, method, engine, threshold),
+        )
+        return frame, frame.offset, match_loc, confidence, time.perf_counter() - start_time
+
     def find_all_templates(
         self,
         template_path,
@@ -186,6 +991,8 @@ class TemplateMatcher:
         max_results=10,
         force_new_screenshot=False,
         debug_image=None,
+        region=None,
+        engine=None,
     ):
         """
         在屏幕中查找所有匹配的模板实例
@@ -197,88 +1004,49 @@ class TemplateMatcher:
             max_results: 最大结果数量
             force_new_screenshot: 是否强制获取新截图
             debug_image: 调试图像保存路径
+            region: 查找区域 (x, y, 宽, 高)，见find_template
+            engine: 本次使用的匹配引擎，见find_template
 
         返回:
             列表，包含所有匹配的中心点坐标和置信度 [(x1, y1, conf1), (x2, y2, conf2), ...]
         """
-        if not os.path.exists(template_path):
-            print(f"错误: 模板图片不存在: {template_path}")
-            return []
-
-        # 读取模板图片
-        template = cv2.imread(template_path)
+        template = load_template(template_path)
         if template is None:
-            print(f"错误: 无法读取模板图片: {template_path}")
             return []
 
         # 获取手机屏幕截图
-        screenshot = self.take_screenshot(force_new=force_new_screenshot)
+        screenshot, offset = self._screenshot_for(
+            template_path, template, region, force_new_screenshot
+        )
         if screenshot is None:
-            print("错误: 无法获取手机屏幕截图")
             return []
 
         # 获取模板尺寸
         h, w = template.shape[:2]
 
-        # 执行模板匹配
-        result = cv2.matchTemplate(screenshot, template, method)
-
         # 准备调试图像
-        debug_img = screenshot.copy() if debug_image else None
-
-        matches = []
+        debug_img = screenshot.bgr.copy() if debug_image else None
 
-        # 迭代查找所有匹配
-        for _ in range(max_results):
-            # 获取最佳匹配位置
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-
-            # 根据所选方法确定最佳匹配位置和置信度
-            if method in [cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED]:
-                confidence = 1 - min_val  # 这些方法是越小越好
-                match_loc = min_loc
-            else:
-                confidence = max_val  # 其他方法是越大越好
-                match_loc = max_loc
-
-            # 如果置信度低于阈值，结束搜索
-            if confidence < threshold:
-                break
+        engine = self._engine_for(template_path, engine)
+        located = self._locate_unless_unchanged(
+            ("all", template_path, method, threshold, max_results, engine),
+            screenshot,
+            lambda: self._locate_all(
+                template_path, screenshot, template, method, threshold, max_results, engine
+            ),
+        )
 
+        matches = []
+        for match_loc, confidence in located:
             # 计算匹配区域的中心点
-            center_x = match_loc[0] + w // 2
-            center_y = match_loc[1] + h // 2
-
-            # 添加到结果列表
+            center_x = offset[0] + match_loc[0] + w // 2
+            center_y = offset[1] + match_loc[1] + h // 2
             matches.append((center_x, center_y, confidence))
 
-            # 在结果图像中将已找到的区域填充，避免重复匹配
-            cv2.rectangle(
-                result,
-                (match_loc[0] - w // 2, match_loc[1] - h // 2),
-                (match_loc[0] + w // 2, match_loc[1] + h // 2),
-                0,
-                -1,
-            )  # 将该区域填充为0
-
             # 如果需要，在调试图像上绘制匹配区域
             if debug_img is not None:
-                cv2.rectangle(
-                    debug_img,
-                    match_loc,
-                    (match_loc[0] + w, match_loc[1] + h),
-                    (0, 255, 0),
-                    2,
-                )
-                cv2.circle(debug_img, (center_x, center_y), 5, (0, 0, 255), -1)
-                cv2.putText(
-                    debug_img,
-                    f"{len(matches)}: {confidence:.4f}",
-                    (match_loc[0], match_loc[1] - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.5,
-                    (0, 255, 0),
-                    2,
+                draw_match(
+                    debug_img, match_loc, w, h, f"{len(matches)}: {confidence:.4f}"
                 )
 
         # 如果需要，保存调试图像
@@ -294,6 +1062,291 @@ class TemplateMatcher:
         return matches
 
 
+def load_template(template_path):
+    """
+    读取模板图片（经过TEMPLATE_STORE缓存，每个文件只解码一次，文件修改后自动重新读取）
+
+    返回:
+        numpy.ndarray: BGR格式的只读模板，文件不存在或无法读取时返回None
+    """
+    if not os.path.exists(template_path):
+        print(f"错误: 模板图片不存在: {template_path}")
+        return None
+
+    template = TEMPLATE_STORE.color(template_path)
+    if template is None:
+        print(f"错误: 无法读取模板图片: {template_path}")
+    return template
+
+
+def to_bgr(image, capture_mode="raw"):
+    """
+    将ADBController.screenshot_array的输出转换为OpenCV使用的BGR格式
+    """
+    if capture_mode == "png":
+        return image
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_RGBA2BGR)
+    return cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+
+
+def locate_template(screenshot, template, method=cv2.TM_CCOEFF_NORMED, engine=None):
+    """
+    在截图（Frame或BGR数组）中查找模板的最佳匹配
+
+    参数:
+        engine: 匹配引擎名称或实例(见match_engines)，为None时使用cv2.matchTemplate
+
+    返回:
+        tuple: (匹配区域左上角坐标, 置信度)，SQDIFF方法的置信度为 1 - 结果
+    """
+    return get_engine(engine).locate(as_frame(screenshot), template, method)
+
+
+def locate_all_templates(
+    screenshot, template, method=cv2.TM_CCOEFF_NORMED, threshold=0.8, max_results=10, engine=None
+):
+    """
+    在截图（Frame或BGR数组）中查找模板的所有匹配
+
+    参数:
+        engine: 匹配引擎名称或实例(见match_engines)，为None时使用cv2.matchTemplate
+
+    返回:
+        list: [(匹配区域左上角坐标, 置信度), ...]，按置信度从高到低排列
+    """
+    h, w = template.shape[:2]
+    # 引擎的得分统一为越大越好
+    result = get_engine(engine).score_map(as_frame(screenshot), template, method, threshold)
+    return find_peaks(result, threshold, (w, h), max_results)
+
+
+def load_template_pyramid(template_path, levels=2):
+    """
+    获取模板逐层缩小一半后的图像（经过TEMPLATE_STORE缓存，模板文件修改后自动重新生成）
+
+    参数:
+        template_path: 模板图片路径
+        levels: 缩小层数
+
+    返回:
+        list: [1/2模板, 1/4模板, ...]，模板无法读取时返回None
+    """
+
+    def build(entry):
+        pyramid = []
+        image = entry.color
+        for _ in range(levels):
+            image = cv2.pyrDown(image)
+            image.flags.writeable = False
+            pyramid.append(image)
+        return pyramid
+
+    return TEMPLATE_STORE.derived(template_path, ("pyramid", levels), build)
+
+
+def _coarse_level(frame, template, coarse_templates):
+    """
+    选择可用的最粗一层：缩小后的模板不能太小，也不能比缩小后的截图大
+    截图的各层取自Frame的缓存，同一帧上的多次查找只缩小一次
+
+    返回:
+        tuple: (层数, 缩小后的截图, 缩小后的模板)，没有可用的层时层数为0
+    """
+    level = 0
+    for coarse in coarse_templates or []:
+        if min(coarse.shape[:2]) < PYRAMID_MIN_TEMPLATE_SIZE:
+            break
+        image = frame.pyramid(level + 1)
+        if image.shape[0] < coarse.shape[0] or image.shape[1] < coarse.shape[1]:
+            break
+        level += 1
+    if level == 0:
+        return 0, frame.bgr, template
+    return level, frame.pyramid(level), coarse_templates[level - 1]
+
+
+def _coarse_peaks(image, coarse_template, method, count):
+    """
+    在缩小的截图上找出得分最高的若干个位置，相邻位置按模板大小去重
+
+    返回:
+        list: [(x, y), ...]，缩小后截图中的左上角坐标
+    """
+    h, w = coarse_template.shape[:2]
+    result = cv2.matchTemplate(image, coarse_template, method)
+    # 统一为越大越好
+    if method in [cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED]:
+        result = -result
+
+    peaks = []
+    for _ in range(count):
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if max_val <= -1e30:
+            break
+        peaks.append(max_loc)
+        cv2.rectangle(
+            result,
+            (max_loc[0] - w // 2, max_loc[1] - h // 2),
+            (max_loc[0] + w // 2, max_loc[1] + h // 2),
+            -1e31,
+            -1,
+        )
+    return peaks
+
+
+def _refine(screenshot, template, method, x, y, margin):
+    """
+    在原图中候选位置附近的小窗口内精确匹配
+
+    返回:
+        tuple: (匹配区域左上角坐标, 置信度)
+    """
+    h, w = template.shape[:2]
+    left, top = max(0, x - margin), max(0, y - margin)
+    right = min(screenshot.shape[1], x + margin + w)
+    bottom = min(screenshot.shape[0], y + margin + h)
+    match_loc, confidence = locate_template(
+        screenshot[top:bottom, left:right], template, method
+    )
+    return (left + match_loc[0], top + match_loc[1]), confidence
+
+
+def locate_template_pyramid(
+    screenshot, template, coarse_templates, method=cv2.TM_CCOEFF_NORMED, candidates=3
+):
+    """
+    由粗到细查找模板的最佳匹配：先在缩小的截图上找出几个候选位置，
+    再在原图中每个候选位置附近精确匹配。返回的置信度与locate_template在同一位置的得分相同
+
+    参数:
+        screenshot: Frame或BGR格式的截图
+        template: 原始模板
+        coarse_templates: load_template_pyramid的返回值
+        method: OpenCV模板匹配的方法
+        candidates: 精确匹配的候选位置数量
+
+    返回:
+        tuple: (匹配区域左上角坐标, 置信度)
+    """
+    frame = as_frame(screenshot)
+    level, coarse_image, coarse_template = _coarse_level(frame, template, coarse_templates)
+    if level == 0:
+        return locate_template(frame, template, method)
+
+    scale = 2**level
+    best = None
+    for x, y in _coarse_peaks(coarse_image, coarse_template, method, candidates):
+        match_loc, confidence = _refine(
+            frame.bgr, template, method, x * scale, y * scale, 2 * scale
+        )
+        if best is None or confidence > best[1]:
+            best = (match_loc, confidence)
+    return best
+
+
+def locate_template_by_features(
+    screenshot,
+    template,
+    template_path,
+    detector="orb",
+    method=cv2.TM_CCOEFF_NORMED,
+    threshold=None,
+    engine=None,
+):
+    """
+    用特征匹配查找模板的最佳匹配（TemplateMatcher的features方式）；
+    模板特征点太少（纯色、很小的图标），或特征匹配的置信度低于阈值（内点太少、
+    ORB在原尺寸的小模板上匹配不上等）时，按原图逐像素匹配，原尺寸存在的模板不会漏掉
+
+    参数:
+        screenshot: Frame或BGR格式的截图
+        template: 原始模板
+        template_path: 模板路径，用于缓存模板的特征点
+        detector: 特征检测器名称
+        method: 逐像素匹配的方法
+        threshold: 特征匹配的置信度低于该值时改为逐像素匹配，为None时只在模板特征点太少时改用
+        engine: 逐像素匹配的引擎
+
+    返回:
+        tuple: (匹配区域左上角坐标, 置信度)
+    """
+    template_features = load_template_features(template_path, detector)
+    if template_features is not None:
+        match_loc, confidence, _ = locate_template_features(
+            screenshot, template, template_features, detector
+        )
+        if threshold is None or confidence >= threshold:
+            return match_loc, confidence
+    return locate_template(screenshot, template, method, engine)
+
+
+def locate_all_templates_pyramid(
+    screenshot,
+    template,
+    coarse_templates,
+    method=cv2.TM_CCOEFF_NORMED,
+    threshold=0.8,
+    max_results=10,
+):
+    """
+    由粗到细查找模板的所有匹配，结果格式与locate_all_templates相同
+
+    返回:
+        list: [(匹配区域左上角坐标, 置信度), ...]，按置信度从高到低排列
+    """
+    frame = as_frame(screenshot)
+    level, coarse_image, coarse_template = _coarse_level(frame, template, coarse_templates)
+    if level == 0:
+        return locate_all_templates(frame, template, method, threshold, max_results)
+
+    scale = 2**level
+    h, w = template.shape[:2]
+    refined = []
+    # 多取一些候选位置，缩小后得分略低的目标在原图上仍可能超过阈值
+    for x, y in _coarse_peaks(coarse_image, coarse_template, method, max_results * 2):
+        match_loc, confidence = _refine(
+            frame.bgr, template, method, x * scale, y * scale, 2 * scale
+        )
+        if confidence >= threshold:
+            refined.append((match_loc, confidence))
+    refined.sort(key=lambda item: item[1], reverse=True)
+
+    # 与locate_all_templates相同的非极大值抑制
+    keep = suppress(
+        [match_loc[0] for match_loc, _ in refined],
+        [match_loc[1] for match_loc, _ in refined],
+        w,
+        h,
+        max_results=max_results,
+    )
+    return [refined[i] for i in keep]
+
+
+def draw_match(image, match_loc, w, h, label):
+    """
+    在调试图像上绘制匹配框、中心点和标签
+    """
+    center = (match_loc[0] + w // 2, match_loc[1] + h // 2)
+    cv2.rectangle(
+        image,
+        match_loc,
+        (match_loc[0] + w, match_loc[1] + h),
+        (0, 255, 0),
+        2,
+    )
+    cv2.circle(image, center, 5, (0, 0, 255), -1)
+    cv2.putText(
+        image,
+        label,
+        (match_loc[0], match_loc[1] - 10),
+        cv2.FONT_HERSHEY_SIMPLEX,
+        0.5,
+        (0, 255, 0),
+        2,
+    )
+
+
 # 使用示例
 if __name__ == "__main__":
     try:
@@ -0,0 +1,233 @@
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import cv2
+
+
+class TemplateEntry:
+    """
+    一个已解码的模板：彩色图、灰度图以及按需生成的派生数据（如缩放后的模板）
+    缓存中的数组都设为只读，避免调用方意外修改共享的数据
+    """
+
+    def __init__(self, path, stat, color):
+        self.path = path
+        self.mtime_ns = stat.st_mtime_ns
+        self.size = stat.st_size
+        self.color = color
+        self._gray = None
+        self.derived = {}
+        self.nbytes = color.nbytes
+
+    @property
+    def gray(self):
+        if self._gray is None:
+            gray = cv2.cvtColor(self.color, cv2.COLOR_BGR2GRAY)
+            gray.flags.writeable = False
+            self._gray = gray
+            self.nbytes += gray.nbytes
+        return self._gray
+
+    def matches(self, stat):
+        return stat.st_mtime_ns == self.mtime_ns and stat.st_size == self.size
+
+
+class TemplateStore:
+    """
+    模板图片缓存，TemplateMatcher和image_matcher共用
+    每个模板只解码一次；每次取用时检查文件修改时间，文件变化后自动重新读取；
+    总内存超过上限时按最近最少使用的顺序淘汰
+
+    使用示例:
+        TEMPLATE_STORE.preload("zhushijie")
+        template = TEMPLATE_STORE.color("./zhushijie/jin-gong.png")
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        """
+        参数:
+            max_bytes: 缓存占用内存的上限(字节)
+        """
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(path):
+        return os.path.abspath(str(path))
+
+    def get(self, path):
+        """
+        获取已解码的模板
+
+        参数:
+            path: 模板图片路径
+
+        返回:
+            TemplateEntry: 模板，文件不存在或无法读取时返回None
+        """
+        key = self._key(path)
+        try:
+            stat = os.stat(key)
+        except OSError:
+            self.invalidate(key)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry.matches(stat):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry
+                # 文件已修改，丢弃旧的解码结果
+                self._remove(key)
+                self.reloads += 1
+            else:
+                self.misses += 1
+
+        color = cv2.imread(key)
+        if color is None:
+            return None
+        color.flags.writeable = False
+        entry = TemplateEntry(key, stat, color)
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.total_bytes += entry.nbytes
+            self._evict()
+        return entry
+
+    def color(self, path):
+        """
+        返回:
+            numpy.ndarray: BGR格式的模板（只读），无法读取时返回None
+        """
+        entry = self.get(path)
+        return entry.color if entry is not None else None
+
+    def gray(self, path):
+        """
+        返回:
+            numpy.ndarray: 灰度模板（只读），无法读取时返回None
+        """
+        entry = self.get(path)
+        if entry is None:
+            return None
+        with self._lock:
+            before = entry.nbytes
+            gray = entry.gray
+            self._account(entry, before)
+        return gray
+
+    def derived(self, path, name, factory):
+        """
+        获取模板的派生数据，第一次使用时调用factory(entry)生成并缓存，模板文件变化后重新生成
+
+        参数:
+            path: 模板图片路径
+            name: 派生数据的名称，同一模板下唯一（如包含缩放参数的元组）
+            factory: 生成函数，参数为TemplateEntry，返回numpy数组或数组列表
+
+        返回:
+            factory的返回值，模板无法读取时返回None
+        """
+        entry = self.get(path)
+        if entry is None:
+            return None
+        with self._lock:
+            if name in entry.derived:
+                return entry.derived[name]
+        value = factory(entry)
+        with self._lock:
+            if name not in entry.derived:
+                before = entry.nbytes
+                entry.derived[name] = value
+                entry.nbytes += _nbytes(value)
+                self._account(entry, before)
+            return entry.derived[name]
+
+    def _account(self, entry, before):
+        # 条目仍在缓存中时才计入总量（可能已被其他线程淘汰或替换）
+        if self._entries.get(entry.path) is entry:
+            self.total_bytes += entry.nbytes - before
+            self._evict()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.total_bytes -= entry.nbytes
+
+    def _evict(self):
+        # 至少保留最近使用的一个模板
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def invalidate(self, path=None):
+        """
+        丢弃一个模板的缓存，path为None时清空全部
+        """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self.total_bytes = 0
+                return
+            key = self._key(path)
+            if key in self._entries:
+                self._remove(key)
+
+    def preload(self, directory, patterns=("*.png", "*.jpg"), gray=False):
+        """
+        预先解码目录中的所有模板图片（包含子目录），用于启动时加载，避免第一次查找时读取文件
+
+        参数:
+            directory: 模板目录，如 "zhushijie"
+            patterns: 文件名匹配模式
+            gray: 是否同时生成灰度图
+
+        返回:
+            int: 成功加载的模板数量
+        """
+        count = 0
+        directory = Path(directory)
+        for pattern in patterns:
+            for path in sorted(directory.rglob(pattern)):
+                if (self.gray(path) if gray else self.color(path)) is not None:
+                    count += 1
+        print(f"预加载模板: {directory}, {count}个, 缓存占用{self.total_bytes / 1024:.0f}KB")
+        return count
+
+    def stats(self):
+        """
+        返回:
+            dict: 模板数量、占用字节数和命中/未命中/重新读取/淘汰次数
+        """
+        with self._lock:
+            return {
+                "templates": len(self._entries),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+            }
+
+
+def _nbytes(value):
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(item) for item in value)
+    return getattr(value, "nbytes", 0)
+
+
+# 进程内共用的模板缓存
+TEMPLATE_STORE = TemplateStore()